@@ -2,22 +2,65 @@
 # 5. 統計 API 端點 - app/api/endpoints/analytics.py
 # ================================
 
+import time
 from datetime import datetime, date, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from core.database import get_db
-from core.services.analytics_service import AnalyticsService
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import Config
+from core.database import get_async_db
+from core.services.analytics_service import AnalyticsService, truncate_to_bucket
+from core.utils.ttl_cache import TTLCache, CacheEntry
+from typing import Optional, Hashable, Awaitable, Callable, Any, Dict, Tuple
 
 router = APIRouter()
 
-@router.get("/traffic")
-async def get_traffic_stats(
-    start: str = Query(..., description="開始日期 YYYY-MM-DD"),
-    end: str = Query(..., description="結束日期 YYYY-MM-DD"),
-    db: Session = Depends(get_db)
-):
-    """獲取流量統計"""
+# 每個 worker 一份結果快取，鍵為正規化後的查詢參數
+analytics_cache = TTLCache(max_entries=Config.ANALYTICS_CACHE_MAX_ENTRIES)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """檢查 If-None-Match 是否符合目前的 ETag"""
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+async def cached_response(
+    request: Request,
+    key: Hashable,
+    ttl: int,
+    compute: Callable[[], Awaitable[Any]],
+    present: Optional[Callable[[Any], Tuple[Any, Dict[str, str]]]] = None
+) -> Response:
+    """從快取返回結果（必要時重新計算），並處理 ETag / 304
+
+    present 可將快取值拆成回應內容與額外標頭，例如分頁游標
+    """
+    entry: Optional[CacheEntry] = analytics_cache.get(key)
+    if entry is None:
+        entry = analytics_cache.set(key, await compute(), ttl)
+
+    # 統計資料僅供管理介面，不讓共用快取保存；命中快取時只給剩餘的有效時間
+    remaining = entry.remaining_seconds(time.monotonic())
+    max_age = ttl if remaining is None else remaining
+    headers = {'ETag': entry.etag, 'Cache-Control': f'private, max-age={max_age}'}
+
+    content = entry.value
+    if present is not None:
+        content, extra_headers = present(entry.value)
+        headers.update(extra_headers)
+
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
+def analytics_ttl(past_range: bool) -> int:
+    """快取秒數：已結束的範圍以小時計，包含今天的範圍只快取數十秒"""
+    return Config.ANALYTICS_PAST_RANGE_TTL_SECONDS if past_range else Config.ANALYTICS_CACHE_TTL_SECONDS
+
+def parse_date_range(start: str, end: str) -> tuple:
+    """解析並驗證 YYYY-MM-DD 日期範圍"""
     try:
         start_date = datetime.strptime(start, "%Y-%m-%d").date()
         end_date = datetime.strptime(end, "%Y-%m-%d").date()
@@ -26,24 +69,152 @@ async def get_traffic_stats(
     
     if start_date > end_date:
         raise HTTPException(status_code=400, detail="開始日期不能晚於結束日期")
+    return start_date, end_date
+
+def parse_local_datetime(value: str) -> datetime:
+    """解析 ISO 時間；帶時區偏移的輸入轉為伺服器本地時間（記錄時間皆為不含時區的本地時間）"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="時間格式錯誤，請使用 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+def parse_time_range(start: str, end: str) -> tuple:
+    """解析並驗證 [start, end) 時間範圍"""
+    range_start = parse_local_datetime(start)
+    range_end = parse_local_datetime(end)
+    if range_start >= range_end:
+        raise HTTPException(status_code=400, detail="開始時間必須早於結束時間")
+    return range_start, range_end
+
+@router.get("/traffic")
+async def get_traffic_stats(
+    request: Request,
+    start: str = Query(..., description="開始日期 YYYY-MM-DD"),
+    end: str = Query(..., description="結束日期 YYYY-MM-DD"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """獲取流量統計"""
+    start_date, end_date = parse_date_range(start, end)
+    
+    # 已結束的日期範圍結果很少變動，快取較久
+    ttl = analytics_ttl(end_date < date.today())
+
+    analytics = AnalyticsService(db)
+    return await cached_response(
+        request,
+        ('traffic', start_date.isoformat(), end_date.isoformat()),
+        ttl,
+        lambda: analytics.get_traffic_stats(start_date, end_date)
+    )
+
+@router.get("/traffic/unique-clients")
+async def get_unique_clients(
+    request: Request,
+    start: str = Query(..., description="開始日期 YYYY-MM-DD"),
+    end: str = Query(..., description="結束日期 YYYY-MM-DD"),
+    exact: bool = Query(False, description="精確計算（稽核用，較慢）"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """獲取日期範圍內的不重複客戶端數（HyperLogLog 估計，誤差約 ±0.81%）"""
+    start_date, end_date = parse_date_range(start, end)
+    ttl = analytics_ttl(end_date < date.today())
+
+    analytics = AnalyticsService(db)
+    return await cached_response(
+        request,
+        ('unique_clients', start_date.isoformat(), end_date.isoformat(), exact),
+        ttl,
+        lambda: analytics.get_unique_clients(start_date, end_date, exact)
+    )
+
+@router.get("/traffic/buckets")
+async def get_bucketed_traffic(
+    request: Request,
+    start: str = Query(..., description="開始時間 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM"),
+    end: str = Query(..., description="結束時間（不含） YYYY-MM-DD 或 YYYY-MM-DDTHH:MM"),
+    granularity: str = Query('hour', pattern='^(minute|hour|day)$', description="分桶粒度"),
+    group_by: Optional[str] = Query(None, description="分組維度，逗號分隔：endpoint,model_used,success"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """依時間分桶並分組的流量與延遲統計"""
+    range_start, range_end = parse_time_range(start, end)
+
+    dimensions = tuple(sorted({item.strip() for item in (group_by or '').split(',') if item.strip()}))
     
+    # 結束於今天之前的範圍很少變動
+    today_start = datetime.combine(date.today(), datetime.min.time())
+    ttl = analytics_ttl(range_end <= today_start)
+
     analytics = AnalyticsService(db)
-    return analytics.get_traffic_stats(start_date, end_date)
+    try:
+        return await cached_response(
+            request,
+            # 同一時間桶內的不同起點結果相同，以取整後的範圍作為快取鍵
+            ('buckets', truncate_to_bucket(range_start, granularity).isoformat(), range_end.isoformat(), granularity, dimensions),
+            ttl,
+            lambda: analytics.get_bucketed_stats(
+                range_start, range_end, granularity, dimensions, Config.ANALYTICS_MAX_BUCKET_ROWS
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/errors")
 async def get_recent_errors(
+    request: Request,
     limit: int = Query(50, ge=1, le=1000, description="返回記錄數量"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="上一頁回應標頭 X-Next-Cursor 的值"),
+    endpoint: Optional[str] = Query(None, description="只返回指定端點的錯誤"),
+    error_prefix: Optional[str] = Query(None, min_length=1, description="錯誤訊息前綴"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """獲取最近的錯誤記錄"""
+    """獲取錯誤記錄（由新到舊；下一頁游標放在 X-Next-Cursor 標頭）"""
     analytics = AnalyticsService(db)
-    return analytics.get_recent_errors(limit)
+
+    def present(page: Dict[str, Any]) -> Tuple[Any, Dict[str, str]]:
+        headers = {'X-Next-Cursor': page['next_cursor']} if page['next_cursor'] else {}
+        return page['errors'], headers
+
+    try:
+        return await cached_response(
+            request,
+            ('errors', limit, cursor, endpoint, error_prefix),
+            Config.ANALYTICS_CACHE_TTL_SECONDS,
+            lambda: analytics.get_recent_errors(limit, cursor, endpoint, error_prefix),
+            present
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/models")
 async def get_model_usage(
+    request: Request,
     days: int = Query(30, ge=1, le=365, description="統計天數"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """獲取模型使用統計"""
     analytics = AnalyticsService(db)
-    return analytics.get_model_usage_stats(days)
\ No newline at end of file
+    return await cached_response(
+        request,
+        ('models', days),
+        Config.ANALYTICS_CACHE_TTL_SECONDS,
+        lambda: analytics.get_model_usage_stats(days)
+    )
+
+@router.get("/models/daily")
+async def get_daily_endpoint_usage(
+    request: Request,
+    days: int = Query(30, ge=1, le=365, description="統計天數（含今天）"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """每日、每個端點的 token 數、輸出速度與估算成本"""
+    analytics = AnalyticsService(db)
+    return await cached_response(
+        request,
+        ('models_daily', days),
+        Config.ANALYTICS_CACHE_TTL_SECONDS,
+        lambda: analytics.get_daily_endpoint_usage(days)
+    )
@@ -0,0 +1,42 @@
+# ================================
+# 13. app/api/endpoints/export.py - 記錄匯出端點
+# ================================
+
+from typing import Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import Config
+from app.api.endpoints.analytics import parse_time_range
+from core.services.log_export import stream_usage_logs, EXPORT_FORMATS
+
+router = APIRouter()
+
+@router.get("/logs/export")
+async def export_usage_logs(
+    request: Request,
+    start: str = Query(..., description="開始時間 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM"),
+    end: str = Query(..., description="結束時間（不含） YYYY-MM-DD 或 YYYY-MM-DDTHH:MM"),
+    endpoint: Optional[str] = Query(None, description="只匯出指定端點"),
+    format: str = Query('ndjson', pattern='^(ndjson|csv)$', description="匯出格式"),
+):
+    """串流匯出 API 使用記錄（稽核用）"""
+    range_start, range_end = parse_time_range(start, end)
+
+    filename = f"api_usage_logs_{range_start:%Y%m%d%H%M}_{range_end:%Y%m%d%H%M}.{format}"
+    return StreamingResponse(
+        stream_usage_logs(
+            range_start,
+            range_end,
+            fmt=format,
+            endpoint=endpoint,
+            fetch_size=Config.EXPORT_FETCH_SIZE,
+            is_disconnected=request.is_disconnected
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -0,0 +1,98 @@
+# ================================
+# 15. app/api/endpoints/jobs.py - 背景工作端點
+# ================================
+
+import asyncio
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from core.services.job_queue import get_job_runner
+
+router = APIRouter()
+
+def job_links(job_id: str) -> dict:
+    return {
+        'status_url': f"/backend/jobs/{job_id}",
+        'events_url': f"/backend/jobs/{job_id}/events",
+    }
+
+def job_origin(request: Request) -> dict:
+    """建立工作的請求來源，工作結束寫入使用記錄時使用"""
+    client_ip = getattr(request.state, 'client_ip', None)
+    return {
+        'ip': client_ip or (request.client.host if request.client else None),
+        'user_agent': request.headers.get('user-agent'),
+        'endpoint': request.url.path,
+    }
+
+async def follow_job(job_id: str, after_seq: int = 0):
+    """轉送工作事件直到工作結束（用量由工作本身記錄，與連線無關）"""
+    async for frame in get_job_runner().subscribe(job_id, after_seq):
+        yield frame
+
+def stream_job_response(job_id: str, trace_id: Optional[str] = None, after_seq: int = 0) -> StreamingResponse:
+    headers = {
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'Content-Type': 'text/event-stream; charset=utf-8',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Cache-Control',
+        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+        'X-Accel-Buffering': 'no',
+        'X-Job-Id': job_id,
+    }
+    if trace_id:
+        headers['X-Trace-Id'] = trace_id
+    return StreamingResponse(
+        follow_job(job_id, after_seq),
+        media_type='text/event-stream',
+        headers=headers
+    )
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+async def _get_job_or_404(job_id: str) -> dict:
+    job = await asyncio.to_thread(get_job_runner().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="找不到此工作（可能已超過保留時間）")
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """查詢工作狀態與進度（輪詢用）"""
+    job = await _get_job_or_404(job_id)
+    return {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'message': job['message'],
+        'error': job['error'],
+        'queue_position': job.get('queue_position'),
+        'last_event_id': job['last_seq'],
+        'trace_id': job['payload'].get('trace_id'),
+        'usage': job['usage'],
+        'created_at': _isoformat(job['created_at']),
+        'started_at': _isoformat(job['started_at']),
+        'finished_at': _isoformat(job['finished_at']),
+        **job_links(job['id']),
+    }
+
+@router.get("/jobs/{job_id}/events")
+async def subscribe_job_events(
+    job_id: str,
+    after: int = Query(0, ge=0, description="只送出序號大於此值的事件（重新訂閱時帶入最後收到的序號）"),
+    last_event_id: Optional[str] = Header(None, alias='Last-Event-ID')
+):
+    """
+    訂閱工作的 SSE 事件；工作已結束時送出剩餘事件後關閉
+
+    轉錄、報告與處遇計畫串流的回應標頭 X-Job-Id 即為此處的 job_id。
+    EventSource 自動重連時帶的 Last-Event-ID 與 after 取較大者。
+    """
+    job = await _get_job_or_404(job_id)
+    if last_event_id and last_event_id.strip().isdigit():
+        after = max(after, int(last_event_id))
+    return stream_job_response(job['id'], job['payload'].get('trace_id'), after)
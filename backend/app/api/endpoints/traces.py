@@ -0,0 +1,36 @@
+# ================================
+# 14. app/api/endpoints/traces.py - 追蹤檢視端點
+# ================================
+
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from core.utils.tracing import get_exporter
+
+router = APIRouter()
+
+def build_span_tree(spans: list) -> list:
+    """將平面區段列表依 parent_id 組成樹狀結構"""
+    nodes = {item['span_id']: {**item, 'children': []} for item in spans}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent['children'].append(node)
+    return roots
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(50, ge=1, le=500, description="返回追蹤數量")
+):
+    """本 worker 最近完成的追蹤"""
+    return get_exporter().recent(limit)
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """單一追蹤的區段樹（回應標頭 X-Trace-Id 或 SSE 首個事件的 trace_id）"""
+    trace = await asyncio.to_thread(get_exporter().get, trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="找不到此追蹤（可能由其他 worker 處理且未設定 TRACE_EXPORT_PATH）")
+    return {**{key: value for key, value in trace.items() if key != 'spans'}, 'spans': build_span_tree(trace['spans'])}
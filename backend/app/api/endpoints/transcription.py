@@ -7,8 +7,8 @@ import math
 import asyncio
 import logging
 from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse
 
 from app.config import Config
 from app.dependencies import get_openai_client
@@ -18,6 +18,9 @@ from core.audio.processor import AudioProcessor
 from core.audio.splitter import AudioSplitter
 from core.audio.transcriber import AudioTranscriber
 from core.utils.text_converter import text_converter
+from core.utils.tracing import span, new_trace_id
+from core.services.job_queue import register_job_handler, get_job_runner
+from .jobs import job_links, job_origin, stream_job_response
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +32,18 @@ class TranscriptionService:
     def __init__(self, openai_client):
         self.transcriber = AudioTranscriber(openai_client)
     
-    async def process_audio_smart(self, file_path: str):
-        """智能音頻處理 - 主要邏輯"""
+    async def process_audio_smart(self, file_path: str, trace_id: str = None):
+        """智能音頻處理 - 主要邏輯
+
+        trace_id 為請求的追蹤 ID，探測、分割、轉錄批次、重試與結果合併
+        都記錄為其下的追蹤區段
+        """
+        with span('transcription.process', trace_id=trace_id, bytes=os.path.getsize(file_path)) as process_span:
+            async for chunk in self._process_audio(file_path, process_span):
+                yield chunk
+
+    async def _process_audio(self, file_path: str, process_span):
+        """process_audio_smart 的主體"""
         temp_files = []
         
         try:
@@ -44,6 +57,7 @@ class TranscriptionService:
             audio_info = await AudioProcessor.get_audio_info(file_path)
             duration_minutes = audio_info.get('duration_min', 0)
             
+            process_span.set_attribute('duration_minutes', round(duration_minutes, 2))
             if duration_minutes > 0:
                 yield send_sse_data('progress', progress=10, 
                                   message=f'音頻長度: {duration_minutes:.1f} 分鐘')
@@ -118,6 +132,8 @@ class TranscriptionService:
             
             # 根據分段數量調整並發策略
             batch_size, delay_between_batches = self._get_batch_strategy(len(valid_chunks))
+            process_span.set_attribute('chunks', len(valid_chunks))
+            process_span.set_attribute('batch_size', batch_size)
             
             logger.info(f"🎯 轉換策略: 批次大小={batch_size}, 延遲={delay_between_batches}秒")
             
@@ -141,16 +157,20 @@ class TranscriptionService:
                     for chunk_path, chunk_idx in batch_chunks
                 ]
                 
-                try:
-                    max_timeout = max(120, max(os.path.getsize(cp) for cp, _ in batch_chunks) / 1024 / 1024 * 30)
-                    
-                    batch_results = await asyncio.wait_for(
-                        asyncio.gather(*tasks, return_exceptions=True),
-                        timeout=max_timeout
-                    )
-                except asyncio.TimeoutError:
-                    logger.error(f"❌ 批次 {i//batch_size + 1} 超時")
-                    batch_results = [Exception("轉換超時") for _ in batch_chunks]
+                with span('transcription.batch', batch=i // batch_size + 1,
+                          chunk_indexes=[idx for _, idx in batch_chunks]) as batch_span:
+                    try:
+                        max_timeout = max(120, max(os.path.getsize(cp) for cp, _ in batch_chunks) / 1024 / 1024 * 30)
+                        batch_span.set_attribute('timeout_seconds', max_timeout)
+                        
+                        batch_results = await asyncio.wait_for(
+                            asyncio.gather(*tasks, return_exceptions=True),
+                            timeout=max_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        logger.error(f"❌ 批次 {i//batch_size + 1} 超時")
+                        batch_span.set_error("轉換超時")
+                        batch_results = [Exception("轉換超時") for _ in batch_chunks]
                 
                 # 處理結果
                 for result in batch_results:
@@ -181,14 +201,17 @@ class TranscriptionService:
                 if i + batch_size < total_chunks:
                     yield send_sse_data('progress', progress=int(progress), 
                                       message=f'暫停 {delay_between_batches} 秒，避免 API 限制...')
-                    await asyncio.sleep(delay_between_batches)
+                    with span('transcription.batch_sleep', seconds=delay_between_batches):
+                        await asyncio.sleep(delay_between_batches)
             
             # 7. 合併和輸出結果
+            process_span.set_attribute('failed_chunks', failed_chunks)
             async for chunk in self._finalize_results(results, chunks, total_chunks, failed_chunks, duration_minutes):
                 yield chunk
                 
         except Exception as e:
             logger.error(f"智能音頻處理失敗: {str(e)}", exc_info=True)
+            process_span.set_error(e)
             yield send_sse_data('error', 
                               error=f'處理失敗: {str(e)}',
                               error_type=type(e).__name__)
@@ -202,12 +225,20 @@ class TranscriptionService:
         if chunk_count > 5:
             return 1, 5  # 大量分段時串行處理
         elif chunk_count > 3:
-            return 2, 3
+            return min(2, Config.MAX_CONCURRENT_TRANSCRIPTIONS), 3
         else:
-            return min(2, Config.MAX_CONCURRENT_TRANSCRIPTIONS), 2
+            return Config.MAX_CONCURRENT_TRANSCRIPTIONS, 2
     
     async def _finalize_results(self, results, chunks, total_chunks, failed_chunks, duration_minutes):
         """最終化結果"""
+        with span('transcription.finalize', total_chunks=total_chunks, failed_chunks=failed_chunks) as finalize_span:
+            async for chunk in self._finalize_results_stream(
+                results, chunks, total_chunks, failed_chunks, duration_minutes, finalize_span
+            ):
+                yield chunk
+
+    async def _finalize_results_stream(self, results, chunks, total_chunks, failed_chunks, duration_minutes, finalize_span):
+        """合併、轉換並串流送出結果"""
         yield send_sse_data('progress', progress=90, message='合併轉換結果...')
         
         final_transcript = ""
@@ -225,13 +256,16 @@ class TranscriptionService:
         final_transcript = " ".join(final_transcript.split())
 
         yield send_sse_data('progress', progress=92, message='轉換為繁體中文...')
-        final_transcript = text_converter.to_traditional(final_transcript)
+        with span('opencc.convert', characters=len(final_transcript)):
+            final_transcript = text_converter.to_traditional(final_transcript)
         logger.info(f"✅ 已轉換為繁體中文，共 {len(final_transcript)} 字")
         
         success_rate = (successful_chunks / total_chunks) * 100
         
         # 串流發送結果
         sentences = self._split_into_sentences(final_transcript)
+        finalize_span.set_attribute('characters', len(final_transcript))
+        finalize_span.set_attribute('sentences', len(sentences))
         
         yield send_sse_data('progress', progress=95, 
                           message=f'開始發送結果... (共 {len(sentences)} 句)')
@@ -271,12 +305,46 @@ class TranscriptionService:
         return sentences
 
 
+async def transcription_job(payload: dict):
+    """背景轉錄工作：payload 含上傳暫存檔路徑與追蹤 ID（暫存檔由工作佇列清理）"""
+    service = TranscriptionService(get_openai_client())
+    trace_id = payload['trace_id']
+    try:
+        yield send_sse_data('progress', progress=0, message='正在分析音頻文件...', trace_id=trace_id)
+        
+        # 使用智能處理函數
+        async for chunk in service.process_audio_smart(payload['file_path'], trace_id=trace_id):
+            yield chunk
+            
+    except Exception as e:
+        logger.error(f"處理錯誤: {str(e)}", exc_info=True)
+        
+        # 提供更詳細的錯誤信息
+        error_message = str(e)
+        if "502" in error_message or "Bad Gateway" in error_message:
+            error_message = "OpenAI 服務暫時不可用，請稍後再試"
+        elif "timeout" in error_message.lower():
+            error_message = "請求超時，檔案可能過大，建議分段上傳"
+        elif "413" in error_message or "too large" in error_message.lower():
+            error_message = "檔案過大，請壓縮後再試或分段上傳"
+        
+        yield send_sse_data('error', error=error_message)
+
+register_job_handler('transcription', transcription_job)
+
 @router.post("/transcribe")
 async def transcribe_audio_smart(
-    audio: UploadFile = File(...),
-    openai_client = Depends(get_openai_client)
+    request: Request,
+    audio: UploadFile = File(...)
 ):
-    """智能音頻轉文字 API - 修復版本"""
+    """
+    智能音頻轉文字 API
+
+    上傳檔案後排入背景工作佇列並返回 202 與 job_id，進度由
+    /jobs/{job_id}/events 訂閱、/jobs/{job_id} 輪詢。
+    Accept 為 text/event-stream 的客戶端則直接在此回應中串流工作事件；
+    中途斷線不會中斷轉錄，可用 X-Job-Id 重新訂閱。
+    """
     
     # 🔑 修復：先讀取內容進行驗證，然後重置指針
     content = await audio.read()
@@ -294,44 +362,25 @@ async def transcribe_audio_smart(
     file_extension = audio.filename.split('.')[-1].lower()
     temp_file_path = await save_upload_file(audio, suffix=f".{file_extension}")
     
-    # 創建轉錄服務
-    service = TranscriptionService(openai_client)
+    trace_id = new_trace_id()
+    try:
+        job_id = await get_job_runner().enqueue('transcription', {
+            'file_path': temp_file_path,
+            'filename': audio.filename,
+            'file_size': file_size,
+            'trace_id': trace_id,
+            'origin': job_origin(request),
+        }, files=[temp_file_path])
+    except Exception:
+        cleanup_files([temp_file_path])
+        raise
+    logger.info(f"🗂️ 轉錄工作已排入佇列: {job_id}")
     
-    async def generate_response():
-        try:
-            yield send_sse_data('progress', progress=0, message='正在分析音頻文件...')
-            
-            # 使用智能處理函數
-            async for chunk in service.process_audio_smart(temp_file_path):
-                yield chunk
-                
-        except Exception as e:
-            logger.error(f"處理錯誤: {str(e)}", exc_info=True)
-            
-            # 提供更詳細的錯誤信息
-            error_message = str(e)
-            if "502" in error_message or "Bad Gateway" in error_message:
-                error_message = "OpenAI 服務暫時不可用，請稍後再試"
-            elif "timeout" in error_message.lower():
-                error_message = "請求超時，檔案可能過大，建議分段上傳"
-            elif "413" in error_message or "too large" in error_message.lower():
-                error_message = "檔案過大，請壓縮後再試或分段上傳"
-            
-            yield send_sse_data('error', error=error_message)
-            
-        finally:
-            cleanup_files([temp_file_path])
+    if 'text/event-stream' in request.headers.get('accept', ''):
+        return stream_job_response(job_id, trace_id)
     
-    return StreamingResponse(
-        generate_response(),
-        media_type='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'Connection': 'keep-alive',
-            'Content-Type': 'text/event-stream; charset=utf-8',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Cache-Control',
-            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-            'X-Accel-Buffering': 'no'
-        }
+    return JSONResponse(
+        status_code=202,
+        content={'job_id': job_id, 'status': 'queued', 'trace_id': trace_id, **job_links(job_id)},
+        headers={'X-Job-Id': job_id, 'X-Trace-Id': trace_id}
     )
@@ -5,10 +5,12 @@
 import logging
 from typing import List
 from fastapi import APIRouter, Request, HTTPException, Depends
-from fastapi.responses import StreamingResponse
 
 from app.dependencies import get_claude_client
 from core.utils.sse import send_sse_data
+from core.utils.json_codec import get_request_json
+from core.services.job_queue import get_job_runner
+from .jobs import job_origin, stream_job_response
 from core.treatmentplan.generator import TreatmentPlanGenerator
 
 logger = logging.getLogger(__name__)
@@ -22,7 +24,7 @@ async def generate_treatment_plan(
 ):
     """生成記錄初稿 API"""
     try:
-        data = await request.json()
+        data = await get_request_json(request) or {}
         
         report = data.get('reportDraft', '').strip()
         if not report:
@@ -33,21 +35,11 @@ async def generate_treatment_plan(
         # 創建報告生成器
         generator = TreatmentPlanGenerator(claude_client)
         
-        async def generate_response():
-            async for chunk in generator.generate_treatment_plan_streaming(
-                report, selected_service_domains
-            ):
-                yield chunk
-        
-        return StreamingResponse(
-            generate_response(),
-            media_type='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'Access-Control-Allow-Origin': '*',
-            }
-        )
+        # 在背景執行生成，客戶端斷線後可用 X-Job-Id 與 Last-Event-ID 重新連線補送；用量於工作結束時寫入
+        job_id = await get_job_runner().start_stream('treatment_plan', generator.generate_treatment_plan_streaming(
+            report, selected_service_domains
+        ), payload={'origin': job_origin(request)})
+        return stream_job_response(job_id)
         
     except Exception as e:
         logger.error(f"API 處理錯誤: {str(e)}")
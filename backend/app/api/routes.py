@@ -3,7 +3,7 @@
 # ================================
 
 from fastapi import APIRouter
-from .endpoints import transcription, report, treatment_plan, analytics
+from .endpoints import transcription, report, treatment_plan, analytics, export, traces, jobs
 
 api_router = APIRouter()
 
@@ -12,4 +12,7 @@ api_router.include_router(transcription.router, tags=["transcription"])
 api_router.include_router(report.router, tags=["report"])
 api_router.include_router(treatment_plan.router, tags=["treatment_plan"])
 api_router.include_router(analytics.router, tags=["analytics"])  # 🔑 新增
+api_router.include_router(export.router, tags=["export"])
+api_router.include_router(traces.router, tags=["traces"])
+api_router.include_router(jobs.router, tags=["jobs"])
 # api_router.include_router(health.router, tags=["health"])
\ No newline at end of file
@@ -3,6 +3,8 @@
 # ================================
 
 import os
+import json
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,11 +19,88 @@ class Config:
     MAX_CHUNK_SIZE = 15 * 1024 * 1024  # 15MB
     MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
     MAX_SEGMENT_MINUTES = 8
-    MAX_CONCURRENT_TRANSCRIPTIONS = 2
+    MAX_CONCURRENT_TRANSCRIPTIONS = int(os.getenv('MAX_CONCURRENT_TRANSCRIPTIONS', 2))
     
     # Supported Formats
     SUPPORTED_FORMATS = {'mp3', 'mp4', 'm4a', 'wav', 'webm', 'ogg', 'flac', 'aac'}
     
+    # Usage Log Payload Policy
+    PAYLOAD_STORE_FULL = os.getenv('PAYLOAD_STORE_FULL', 'false').lower() in ('1', 'true', 'yes')
+    PAYLOAD_RETENTION_DAYS = int(os.getenv('PAYLOAD_RETENTION_DAYS', 30))
+    PAYLOAD_MAX_SECTION_ITEMS = 50
+
+    # Analytics Rollups
+    ROLLUP_REFRESH_SECONDS = int(os.getenv('ROLLUP_REFRESH_SECONDS', 300))
+
+    # Usage Log Partitions
+    LOG_PARTITION_MONTHS_AHEAD = int(os.getenv('LOG_PARTITION_MONTHS_AHEAD', 3))
+    LOG_RETENTION_MONTHS = int(os.getenv('LOG_RETENTION_MONTHS', 12))  # 0 表示永久保留
+    LOG_RETENTION_MODE = os.getenv('LOG_RETENTION_MODE', 'detach')  # detach 或 drop
+
+    # Analytics Response Cache
+    ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv('ANALYTICS_CACHE_TTL_SECONDS', 30))
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYTICS_CACHE_MAX_ENTRIES', 256))
+    # 已結束的範圍：延遲寫入的記錄、重新彙總或歸檔仍可能改變結果，不能永久快取
+    ANALYTICS_PAST_RANGE_TTL_SECONDS = int(os.getenv('ANALYTICS_PAST_RANGE_TTL_SECONDS', 6 * 3600))
+
+    # Bucketed Analytics
+    ANALYTICS_MAX_BUCKET_ROWS = int(os.getenv('ANALYTICS_MAX_BUCKET_ROWS', 5000))
+
+    # Usage Log Export
+    EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 1000))
+
+    # Columnar Archive（選用，需安裝 duckdb；未設定目錄則停用）
+    COLUMNAR_ARCHIVE_DIR = os.getenv('COLUMNAR_ARCHIVE_DIR')
+    COLUMNAR_HOT_DAYS = int(os.getenv('COLUMNAR_HOT_DAYS', 7))
+    COLUMNAR_OFFLOAD_SECONDS = int(os.getenv('COLUMNAR_OFFLOAD_SECONDS', 3600))
+
+    # Tracing（未設定 TRACE_EXPORT_PATH 時只保留在各 worker 記憶體）
+    TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH')
+    TRACE_MAX_TRACES = int(os.getenv('TRACE_MAX_TRACES', 200))
+    TRACE_EXPORT_MAX_BYTES = int(os.getenv('TRACE_EXPORT_MAX_BYTES', 50 * 1024 * 1024))
+    TRACE_EXPORT_BACKUPS = int(os.getenv('TRACE_EXPORT_BACKUPS', 3))
+
+    # Usage Accounting：覆寫 / 新增模型價格，例如 {"claude-sonnet-4": {"input": 3, "output": 15}}
+    # token 價格為每百萬 token 美元，轉錄為每分鐘美元（audio_per_minute）
+    MODEL_PRICING = json.loads(os.getenv('MODEL_PRICING_JSON', '{}'))
+
+    # Upstream Limits：同一主機所有 worker 共用（檔案鎖），0 表示不限制
+    # 每分鐘次數預設關閉，依帳號的速率限制層級自行設定
+    UPSTREAM_LIMIT_DIR = os.getenv('UPSTREAM_LIMIT_DIR', os.path.join(tempfile.gettempdir(), 'social_work_limits'))
+    UPSTREAM_LIMITS = {
+        'whisper': {
+            'max_concurrent': int(os.getenv('WHISPER_MAX_CONCURRENT', 4)),
+            'requests_per_minute': float(os.getenv('WHISPER_REQUESTS_PER_MINUTE', 0)),
+        },
+        'claude': {
+            'max_concurrent': int(os.getenv('CLAUDE_MAX_CONCURRENT', 4)),
+            'requests_per_minute': float(os.getenv('CLAUDE_REQUESTS_PER_MINUTE', 0)),
+        },
+    }
+
+    # Upstream HTTP Pools：連線數預設與上方並發上限相同
+    HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # 需安裝 h2
+    HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('HTTP_KEEPALIVE_EXPIRY_SECONDS', 60))
+    HTTP_WARMUP_CONNECTIONS = int(os.getenv('HTTP_WARMUP_CONNECTIONS', 1))  # 0 表示不預熱
+
+    # Background Jobs：同一主機的所有 worker 共用 SQLite 佇列
+    JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'social_work_jobs.sqlite3'))
+    JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', 1))  # 每個 worker 行程
+    JOB_MAX_RUNNING = int(os.getenv('JOB_MAX_RUNNING', 2))  # 全主機同時執行上限
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv('JOB_POLL_INTERVAL_SECONDS', 0.5))
+    JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 120))
+    JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', 24))
+
+    # SSE Replay：報告 / 處遇計畫串流結束後保留事件的秒數，與每個串流保留的 progress 事件數
+    STREAM_REPLAY_GRACE_SECONDS = int(os.getenv('STREAM_REPLAY_GRACE_SECONDS', 300))
+    STREAM_REPLAY_PROGRESS_EVENTS = int(os.getenv('STREAM_REPLAY_PROGRESS_EVENTS', 50))
+    # 工作事件批次寫入 SQLite 的間隔（秒）；本行程的訂閱者不受影響，其他 worker 的訂閱者最多延遲此秒數
+    JOB_EVENT_FLUSH_SECONDS = float(os.getenv('JOB_EVENT_FLUSH_SECONDS', 0.5))
+
+    # Event Loop Monitor（0 表示停用）
+    LOOP_MONITOR_INTERVAL_SECONDS = float(os.getenv('LOOP_MONITOR_INTERVAL_SECONDS', 0.1))
+    LOOP_STALL_THRESHOLD_SECONDS = float(os.getenv('LOOP_STALL_THRESHOLD_SECONDS', 0.1))
+
     # App Settings
     APP_NAME = "Social Work Report Generator"
     APP_VERSION = "2.0.0"
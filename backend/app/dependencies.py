@@ -2,19 +2,44 @@
 # 2. app/dependencies.py - 依賴注入
 # ================================
 
+import asyncio
 from openai import AsyncOpenAI
 import anthropic
 from .config import Config
+from core.utils.http_clients import build_http_client, pool_size, warm_up
 
 # 驗證配置
 Config.validate()
 
-# 創建 API 客戶端
-openai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
-claude_client = anthropic.Anthropic(api_key=Config.CLAUDE_API_KEY)
+# 創建 API 客戶端（各自使用調校過的共用連線池）
+openai_http_client = build_http_client(
+    'openai',
+    pool_size(Config.UPSTREAM_LIMITS['whisper']['max_concurrent']),
+    Config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    Config.HTTP2_ENABLED
+)
+claude_http_client = build_http_client(
+    'anthropic',
+    pool_size(Config.UPSTREAM_LIMITS['claude']['max_concurrent']),
+    Config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    Config.HTTP2_ENABLED
+)
+openai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY, http_client=openai_http_client)
+claude_client = anthropic.AsyncAnthropic(api_key=Config.CLAUDE_API_KEY, http_client=claude_http_client)
 
 def get_openai_client():
     return openai_client
 
 def get_claude_client():
-    return claude_client
\ No newline at end of file
+    return claude_client
+
+async def warm_up_clients():
+    """啟動時預先建立上游連線"""
+    await asyncio.gather(
+        warm_up('openai', openai_http_client, openai_client.base_url, Config.HTTP_WARMUP_CONNECTIONS),
+        warm_up('anthropic', claude_http_client, claude_client.base_url, Config.HTTP_WARMUP_CONNECTIONS)
+    )
+
+async def close_clients():
+    await openai_client.close()
+    await claude_client.close()
@@ -5,13 +5,27 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 import logging
 import os
+import asyncio
+from functools import partial
 from .config import Config
 from .api.routes import api_router
-from core.middleware.logging_middleware import ApiLoggingMiddleware
-from core.database import create_tables
+from .dependencies import warm_up_clients, close_clients
+from core.middleware.logging_middleware import ApiLoggingMiddleware, log_job_usage
+from core.database import create_tables, async_engine
+from core.services.maintenance import (
+    start_maintenance_jobs, stop_maintenance_jobs, purge_payloads_job, refresh_rollups_job,
+    partition_maintenance_job, columnar_offload_job, purge_jobs_job
+)
+from core.services.job_queue import configure_job_queue
+from core.services.columnar_store import configure_columnar_store
+from core.utils.metrics import render_metrics, mark_worker_dead
+from core.utils.tracing import configure_tracing, get_exporter
+from core.utils.loop_monitor import start_loop_monitor
+from core.utils.usage import configure_pricing
+from core.utils.upstream_limits import configure_upstream_limits
 
 # 設置日誌
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +38,11 @@ app = FastAPI(
 )
 
 # 🔑 添加 API 記錄中間件
-app.add_middleware(ApiLoggingMiddleware)
+app.add_middleware(
+    ApiLoggingMiddleware,
+    store_full_payloads=Config.PAYLOAD_STORE_FULL,
+    max_section_items=Config.PAYLOAD_MAX_SECTION_ITEMS
+)
 
 # 添加 CORS 中間件
 app.add_middleware(
@@ -33,6 +51,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Trace-Id", "X-Job-Id"],  # 錯誤記錄分頁游標、轉錄追蹤 ID、背景工作 ID
 )
 
 # 包含 API 路由
@@ -47,8 +66,66 @@ app.mount("/assets", StaticFiles(directory=os.path.join(frontend_dist_path, "ass
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    configure_tracing(Config.TRACE_MAX_TRACES, Config.TRACE_EXPORT_PATH,
+                      Config.TRACE_EXPORT_MAX_BYTES, Config.TRACE_EXPORT_BACKUPS)
+    configure_pricing(Config.MODEL_PRICING)
+    configure_upstream_limits(Config.UPSTREAM_LIMIT_DIR, Config.UPSTREAM_LIMITS)
+    job_runner = configure_job_queue(
+        Config.JOB_DB_PATH,
+        Config.JOB_WORKER_CONCURRENCY,
+        Config.JOB_MAX_RUNNING,
+        Config.JOB_POLL_INTERVAL_SECONDS,
+        Config.JOB_STALE_SECONDS,
+        Config.STREAM_REPLAY_GRACE_SECONDS,
+        Config.STREAM_REPLAY_PROGRESS_EVENTS,
+        usage_recorder=log_job_usage,
+        event_flush_seconds=Config.JOB_EVENT_FLUSH_SECONDS
+    )
     logger.info("📊 API 記錄系統已啟用")
 
+    partition_job = partial(
+        partition_maintenance_job,
+        Config.LOG_PARTITION_MONTHS_AHEAD,
+        Config.LOG_RETENTION_MONTHS,
+        Config.LOG_RETENTION_MODE
+    )
+    # 寫入記錄前先確保本月分區存在
+    await asyncio.to_thread(partition_job)
+
+    jobs = [
+        ('maintain_partitions', 6 * 3600, partition_job),
+        ('purge_payloads', 3600, partial(purge_payloads_job, Config.PAYLOAD_RETENTION_DAYS)),
+        ('refresh_rollups', Config.ROLLUP_REFRESH_SECONDS, refresh_rollups_job),
+        ('purge_jobs', min(3600, Config.STREAM_REPLAY_GRACE_SECONDS), partial(purge_jobs_job, Config.JOB_RETENTION_HOURS)),
+    ]
+    if configure_columnar_store(Config.COLUMNAR_ARCHIVE_DIR) is not None:
+        jobs.append((
+            'columnar_offload',
+            Config.COLUMNAR_OFFLOAD_SECONDS,
+            partial(columnar_offload_job, Config.COLUMNAR_HOT_DAYS)
+        ))
+    app.state.maintenance_tasks = start_maintenance_jobs(jobs)
+    app.state.maintenance_tasks.extend(job_runner.start())
+    app.state.maintenance_tasks.append(asyncio.create_task(warm_up_clients(), name='http_warm_up'))
+    if Config.LOOP_MONITOR_INTERVAL_SECONDS > 0:
+        app.state.maintenance_tasks.append(
+            start_loop_monitor(Config.LOOP_MONITOR_INTERVAL_SECONDS, Config.LOOP_STALL_THRESHOLD_SECONDS)
+        )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_maintenance_jobs(getattr(app.state, 'maintenance_tasks', []))
+    await async_engine.dispose()
+    await close_clients()
+    await asyncio.to_thread(get_exporter().close)
+    mark_worker_dead(os.getpid())
+
+# Prometheus 指標（須在 SPA 萬用路由之前註冊）
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 # 根路徑 "/" 直接回傳 index.html
 @app.get("/")
 async def serve_frontend():
@@ -0,0 +1,128 @@
+# benchmarks/bench_analytics.py
+"""
+AnalyticsService 查詢基準
+
+對目前資料庫（建議先以 generate_synthetic_logs.py 灌入大量資料）逐一執行
+AnalyticsService 的每個查詢，重複數次後記錄最小 / 中位數 / p95 耗時：
+    python benchmarks/generate_synthetic_logs.py --rows 20000000 --days 180 --truncate --refresh-rollups
+    python benchmarks/bench_analytics.py --label 20m --repeat 5
+
+結果輸出至 benchmarks/results/bench_analytics_<label>.json，方便前後比較。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import AsyncSessionLocal, async_engine
+from core.services.analytics_service import AnalyticsService
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def build_cases(days: int) -> dict:
+    """查詢名稱 -> 以 AnalyticsService 執行的協程工廠"""
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    range_end = datetime.now()
+    day_start = range_end - timedelta(days=1)
+    range_start = datetime.combine(start_date, datetime.min.time())
+    # 基準不受 API 的結果列數上限限制
+    max_rows = 1_000_000
+
+    async def deep_error_page(service: AnalyticsService):
+        """沿游標往回翻 20 頁"""
+        cursor = None
+        for _ in range(20):
+            page = await service.get_recent_errors(100, cursor)
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+    return {
+        f'traffic_stats_{days}d': lambda s: s.get_traffic_stats(start_date, end_date),
+        'traffic_stats_today': lambda s: s.get_traffic_stats(end_date, end_date),
+        f'unique_clients_hll_{days}d': lambda s: s.get_unique_clients(start_date, end_date),
+        f'unique_clients_exact_{days}d': lambda s: s.get_unique_clients(start_date, end_date, exact=True),
+        'buckets_minute_24h': lambda s: s.get_bucketed_stats(
+            day_start, range_end, 'minute', ('endpoint',), max_rows
+        ),
+        f'buckets_hour_{days}d': lambda s: s.get_bucketed_stats(
+            range_start, range_end, 'hour', ('endpoint', 'success'), max_rows
+        ),
+        f'buckets_day_{days}d_all_dims': lambda s: s.get_bucketed_stats(
+            range_start, range_end, 'day', ('endpoint', 'model_used', 'success'), max_rows
+        ),
+        'recent_errors_first_page': lambda s: s.get_recent_errors(50),
+        'recent_errors_20_pages': deep_error_page,
+        'recent_errors_endpoint': lambda s: s.get_recent_errors(50, endpoint='/backend/transcribe'),
+        'recent_errors_prefix': lambda s: s.get_recent_errors(50, error_prefix='Model'),
+        f'model_usage_{days}d': lambda s: s.get_model_usage_stats(days),
+    }
+
+async def time_case(factory, repeat: int) -> list:
+    """每次使用新的 session，避免 identity map 影響結果"""
+    durations = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await factory(AnalyticsService(db))
+            durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+async def run(args) -> dict:
+    async with AsyncSessionLocal() as db:
+        total_rows = (await db.execute(text("SELECT count(*) FROM social_work.api_usage_logs"))).scalar()
+    print(f"📊 api_usage_logs: {total_rows:,} 筆")
+
+    results = {}
+    cases = build_cases(args.days)
+    for name, factory in cases.items():
+        if args.only and args.only not in name:
+            continue
+        # 第一次執行暖機（連線、計畫快取），不列入統計
+        await time_case(factory, 1)
+        durations = sorted(await time_case(factory, args.repeat))
+        results[name] = {
+            'min_ms': round(durations[0], 2),
+            'median_ms': round(statistics.median(durations), 2),
+            'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 2),
+        }
+        print(f"⏱️ {name:<32} min {results[name]['min_ms']:>10.1f} ms   "
+              f"median {results[name]['median_ms']:>10.1f} ms")
+
+    await async_engine.dispose()
+    return {
+        'label': args.label,
+        'measured_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': total_rows,
+        'days': args.days,
+        'repeat': args.repeat,
+        'queries': results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='AnalyticsService 查詢基準')
+    parser.add_argument('--label', default='run', help='輸出檔標籤')
+    parser.add_argument('--days', type=int, default=30, help='日期範圍天數')
+    parser.add_argument('--repeat', type=int, default=5, help='每個查詢重複次數')
+    parser.add_argument('--only', help='只執行名稱包含此字串的查詢')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, f"bench_analytics_{args.label}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 已輸出: {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# benchmarks/bench_audio.py
+"""
+AudioProcessor / AudioSplitter 微基準
+
+以 e2e/synthetic_audio.py 產生的合成音檔（依格式與長度快取），對下列函數
+逐一量測牆鐘時間、CPU 時間（含 ffmpeg 子行程）與峰值 RSS：
+- AudioProcessor._get_audio_info_sync
+- AudioProcessor._compress_audio_sync（standard / aggressive）
+- AudioSplitter.smart_split_by_duration
+- AudioSplitter._split_by_size_sync
+
+每次量測都在全新的 spawn 子行程中執行，峰值 RSS 不受前一次量測影響。
+
+用法:
+    python benchmarks/bench_audio.py run --label baseline
+    python benchmarks/bench_audio.py run --label quick --formats wav,mp3 --minutes 1,15 --repeat 1
+    python benchmarks/bench_audio.py compare results/bench_audio_baseline.json results/bench_audio_new.json --threshold 0.15
+
+結果輸出至 benchmarks/results/bench_audio_<label>.json；compare 發現退步時以結束碼 1 離開。
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import tempfile
+import concurrent.futures
+import multiprocessing
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, 'e2e'))
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+DEFAULT_FIXTURES_DIR = os.path.join(tempfile.gettempdir(), 'social_work_bench_audio')
+
+OPERATIONS = ('probe', 'compress_standard', 'compress_aggressive', 'split_duration', 'split_size')
+FORMATS = ('wav', 'mp3', 'm4a', 'webm')
+DURATIONS = (1, 15, 60, 90)
+# compare 時檢查的指標：(欄位, 最小絕對差異)，差異過小視為雜訊
+COMPARED_METRICS = {
+    'wall_median_s': 0.02,
+    'cpu_median_s': 0.02,
+    'peak_rss_mb': 8.0,
+}
+
+def fixture_path(fixtures_dir: str, fmt: str, minutes: float) -> str:
+    """取得（必要時產生）合成音檔；內容由固定種子決定，可安全重複使用"""
+    from synthetic_audio import generate_audio_file
+
+    path = os.path.join(fixtures_dir, f"synthetic_{minutes:g}m.{fmt}")
+    if not os.path.exists(path):
+        os.makedirs(fixtures_dir, exist_ok=True)
+        print(f"🎵 產生 {minutes:g} 分鐘 {fmt} 合成音檔...")
+        partial_path = f"{path}.partial.{fmt}"
+        generate_audio_file(partial_path, minutes, fmt)
+        os.replace(partial_path, path)
+    return path
+
+def _run_operation(operation: str, input_path: str, minutes: float, work_dir: str, max_chunk_size: int):
+    from core.audio.processor import AudioProcessor
+    from core.audio.splitter import AudioSplitter
+
+    if operation == 'probe':
+        return AudioProcessor._get_audio_info_sync(input_path)
+    if operation == 'compress_standard':
+        return AudioProcessor._compress_audio_sync(input_path, os.path.join(work_dir, 'compressed.mp3'))
+    if operation == 'compress_aggressive':
+        return AudioProcessor._compress_audio_sync(input_path, os.path.join(work_dir, 'compressed.mp3'), True)
+    if operation == 'split_duration':
+        return asyncio.run(AudioSplitter.smart_split_by_duration(input_path, minutes))
+    if operation == 'split_size':
+        return AudioSplitter._split_by_size_sync(input_path, max_chunk_size)
+    raise ValueError(f"未知的操作: {operation}")
+
+def measure_once(operation: str, source_path: str, minutes: float, max_chunk_size: int) -> dict:
+    """
+    在子行程中執行一次量測
+
+    分割函數會把分段寫在輸入檔旁邊，因此先把輸入檔硬連結（或複製）到
+    暫存目錄，結束後整個目錄刪除。
+    """
+    from core.audio import processor, splitter  # 預先載入模組，匯入成本不計入量測
+
+    with tempfile.TemporaryDirectory(prefix='bench_audio_') as work_dir:
+        input_path = os.path.join(work_dir, os.path.basename(source_path))
+        try:
+            os.link(source_path, input_path)
+        except OSError:
+            shutil.copyfile(source_path, input_path)
+
+        self_before = resource.getrusage(resource.RUSAGE_SELF)
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.perf_counter()
+        result = _run_operation(operation, input_path, minutes, work_dir, max_chunk_size)
+        wall = time.perf_counter() - started
+        self_after = resource.getrusage(resource.RUSAGE_SELF)
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        outputs = [path for path in glob.glob(os.path.join(work_dir, '*')) if path != input_path]
+        output_bytes = sum(os.path.getsize(path) for path in outputs)
+
+    def cpu(usage):
+        return usage.ru_utime + usage.ru_stime
+
+    return {
+        'wall_s': wall,
+        'cpu_s': cpu(self_after) - cpu(self_before) + cpu(children_after) - cpu(children_before),
+        # ru_maxrss 單位為 KB；ffmpeg 子行程與 Python 行程分開計算
+        'peak_rss_mb': self_after.ru_maxrss / 1024,
+        'child_peak_rss_mb': children_after.ru_maxrss / 1024,
+        'ok': bool(result),
+        'outputs': len(outputs),
+        'output_bytes': output_bytes,
+    }
+
+def run_case(operation: str, source_path: str, minutes: float, repeat: int, max_chunk_size: int) -> dict:
+    context = multiprocessing.get_context('spawn')
+    samples = []
+    for _ in range(repeat):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            samples.append(executor.submit(measure_once, operation, source_path, minutes, max_chunk_size).result())
+
+    walls = [sample['wall_s'] for sample in samples]
+    cpus = [sample['cpu_s'] for sample in samples]
+    return {
+        'wall_min_s': round(min(walls), 4),
+        'wall_median_s': round(statistics.median(walls), 4),
+        'cpu_median_s': round(statistics.median(cpus), 4),
+        'peak_rss_mb': round(max(sample['peak_rss_mb'] for sample in samples), 1),
+        'child_peak_rss_mb': round(max(sample['child_peak_rss_mb'] for sample in samples), 1),
+        'ok': all(sample['ok'] for sample in samples),
+        'outputs': samples[-1]['outputs'],
+        'output_bytes': samples[-1]['output_bytes'],
+        'input_bytes': os.path.getsize(source_path),
+    }
+
+def ffmpeg_version() -> str:
+    try:
+        output = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, timeout=10).stdout
+        return output.splitlines()[0] if output else 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unavailable'
+
+def command_run(args):
+    operations = args.operations.split(',')
+    formats = args.formats.split(',')
+    durations = [float(minutes) for minutes in args.minutes.split(',')]
+    max_chunk_size = int(args.max_chunk_mb * 1024 * 1024)
+
+    cases = {}
+    for fmt in formats:
+        for minutes in durations:
+            source_path = fixture_path(args.fixtures_dir, fmt, minutes)
+            for operation in operations:
+                name = f"{operation}/{fmt}/{minutes:g}m"
+                cases[name] = run_case(operation, source_path, minutes, args.repeat, max_chunk_size)
+                case = cases[name]
+                print(f"⏱️ {name:<32} wall {case['wall_median_s']:>8.2f} s   cpu {case['cpu_median_s']:>8.2f} s   "
+                      f"rss {case['peak_rss_mb']:>8.1f} MB   ffmpeg {case['child_peak_rss_mb']:>7.1f} MB"
+                      f"{'' if case['ok'] else '   ⚠️ 失敗'}")
+
+    report = {
+        'label': args.label,
+        'measured_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'ffmpeg': ffmpeg_version(),
+        },
+        'repeat': args.repeat,
+        'max_chunk_mb': args.max_chunk_mb,
+        'cases': cases,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, f"bench_audio_{args.label}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 已輸出: {output_path}")
+
+def compare_reports(baseline: dict, current: dict, threshold: float) -> list:
+    """返回退步清單 [(案例, 指標, 基準值, 目前值, 變化比例)]"""
+    regressions = []
+    for name, case in current['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            continue
+        for metric, min_delta in COMPARED_METRICS.items():
+            before, after = base.get(metric), case.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if change > threshold and after - before > min_delta:
+                regressions.append((name, metric, before, after, change))
+    return regressions
+
+def command_compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    if baseline.get('environment') != current.get('environment'):
+        print("⚠️ 兩次量測的環境不同，結果僅供參考")
+
+    for name, case in current['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            print(f"  {name:<32} （基準中沒有此案例）")
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            if base.get(metric) and case.get(metric) is not None:
+                changes.append(f"{metric} {(case[metric] - base[metric]) / base[metric]:+7.1%}")
+        print(f"  {name:<32} {'   '.join(changes)}")
+
+    regressions = compare_reports(baseline, current, args.threshold)
+    if not regressions:
+        print(f"✅ 沒有超過 {args.threshold:.0%} 的退步")
+        return 0
+    print(f"❌ {len(regressions)} 項退步超過 {args.threshold:.0%}:")
+    for name, metric, before, after, change in regressions:
+        print(f"  {name:<32} {metric:<14} {before:>10} -> {after:<10} ({change:+.1%})")
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(description='AudioProcessor / AudioSplitter 微基準')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='執行量測並輸出 JSON 基準')
+    run_parser.add_argument('--label', default='run', help='輸出檔標籤')
+    run_parser.add_argument('--operations', default=','.join(OPERATIONS), help='逗號分隔的操作')
+    run_parser.add_argument('--formats', default=','.join(FORMATS), help='逗號分隔的格式')
+    run_parser.add_argument('--minutes', default=','.join(str(minutes) for minutes in DURATIONS),
+                            help='逗號分隔的音檔長度（分鐘）')
+    run_parser.add_argument('--repeat', type=int, default=3, help='每個案例重複次數')
+    run_parser.add_argument('--max-chunk-mb', type=float, default=15, help='_split_by_size_sync 的大小上限（MB）')
+    run_parser.add_argument('--fixtures-dir', default=DEFAULT_FIXTURES_DIR, help='合成音檔快取目錄')
+
+    compare_parser = subparsers.add_parser('compare', help='比較兩份 JSON 基準')
+    compare_parser.add_argument('baseline', help='基準 JSON')
+    compare_parser.add_argument('current', help='目前 JSON')
+    compare_parser.add_argument('--threshold', type=float, default=0.15, help='視為退步的增幅比例')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        command_run(args)
+    else:
+        sys.exit(command_compare(args))
+
+if __name__ == "__main__":
+    main()
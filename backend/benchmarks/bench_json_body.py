@@ -0,0 +1,85 @@
+# benchmarks/bench_json_body.py
+"""
+請求 JSON 解析基準測試
+
+比較 /backend/generate-report 大型逐字稿請求的每請求 CPU 時間：
+- 舊流程：中間件 json.loads 一次，端點 request.json() 再解析一次
+- 新流程：core.utils.json_codec 解析一次，結果經 request scope 共用
+
+用法:
+    python benchmarks/bench_json_body.py [--chars 50000] [--iterations 500]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.utils import json_codec
+
+SAMPLE_SENTENCES = [
+    '社工：您好，今天想跟您聊聊最近家裡的狀況。',
+    '案主：最近孩子比較不聽話，我也常常加班到很晚。',
+    '社工：了解，那孩子放學後通常是誰在照顧呢？',
+    '案主：有時候是阿嬤，有時候他自己在家看電視。',
+    '社工：經濟方面目前有沒有什麼困難？',
+    '案主：房租漲了，每個月都很緊，還在想要不要申請補助。',
+]
+
+def build_payload(target_chars: int, seed: int = 42) -> bytes:
+    """生成接近真實大小的報告請求內容"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < target_chars:
+        sentence = rng.choice(SAMPLE_SENTENCES)
+        parts.append(sentence)
+        length += len(sentence)
+    payload = {
+        'transcript': ''.join(parts)[:target_chars],
+        'socialWorkerNotes': '案主情緒穩定，需追蹤經濟補助申請進度。',
+        'selectedSections': ['主述議題', '個案概況', '經濟狀況', '社工評估'],
+        'requiredSections': ['主述議題', '個案概況'],
+    }
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+def bench(label: str, func, iterations: int) -> float:
+    """量測每次呼叫的平均 CPU 時間（微秒）"""
+    func()  # 預熱
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    elapsed = time.process_time() - start
+    per_call_us = elapsed / iterations * 1_000_000
+    print(f"  {label:<42} {per_call_us:10.1f} µs/請求")
+    return per_call_us
+
+def main():
+    parser = argparse.ArgumentParser(description='請求 JSON 解析基準測試')
+    parser.add_argument('--chars', type=int, default=50000, help='逐字稿字數')
+    parser.add_argument('--iterations', type=int, default=500, help='重複次數')
+    args = parser.parse_args()
+
+    body = build_payload(args.chars)
+    print(f"📦 請求大小: {len(body) / 1024:.1f}KB（逐字稿 {args.chars} 字）")
+    print(f"⚙️  JSON 後端: {'orjson' if json_codec.orjson is not None else 'json (stdlib)'}\n")
+
+    def parse_twice_stdlib():
+        json.loads(body.decode())  # 中間件
+        json.loads(body)           # 端點 request.json()
+
+    def parse_once_codec():
+        json_codec.loads(body)
+
+    before = bench('舊流程（json.loads ×2）', parse_twice_stdlib, args.iterations)
+    after = bench('新流程（json_codec.loads ×1，scope 共用）', parse_once_codec, args.iterations)
+
+    saved = before - after
+    print(f"\n✅ 每請求節省 CPU: {saved:.1f} µs（{saved / before * 100:.0f}%）")
+
+if __name__ == "__main__":
+    main()
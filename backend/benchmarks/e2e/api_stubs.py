@@ -0,0 +1,196 @@
+# benchmarks/e2e/api_stubs.py
+"""
+本機 OpenAI / Anthropic API 替身
+
+提供與官方 SDK 相容的兩個端點，延遲、輸出速度與錯誤率皆可設定：
+- POST /v1/audio/transcriptions  Whisper（verbose_json）
+- POST /v1/messages              Claude（stream=true 時以 SSE 逐 token 輸出）
+
+應用程式端只需設定環境變數即可改連替身（SDK 會自動讀取）：
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8900
+
+用法:
+    python benchmarks/e2e/api_stubs.py --port 8900 --whisper-seconds-per-mb 4 --tokens-per-second 60
+"""
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, asdict
+from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+@dataclass
+class StubSettings:
+    # Whisper：延遲 = 基本延遲 + 每 MB 延遲，再乘上對數常態抖動
+    whisper_base_seconds: float = 1.5
+    whisper_seconds_per_mb: float = 4.0
+    whisper_error_rate: float = 0.0
+    whisper_chars_per_mb: int = 400
+    # Claude：首 token 時間、輸出速度與長度
+    claude_ttft_seconds: float = 1.2
+    tokens_per_second: float = 60.0
+    output_tokens: int = 1200
+    tokens_per_delta: int = 3
+    claude_error_rate: float = 0.0
+    jitter_sigma: float = 0.25
+    seed: int = 0
+
+settings = StubSettings()
+rng = random.Random(settings.seed)
+
+# 簡體字樣本，讓 OpenCC 轉換實際有工作量
+SAMPLE_TEXT = (
+    '社工：您好，今天想跟您聊聊最近家里的状况。案主：最近孩子比较不听话，我也常常加班到很晚。'
+    '社工：了解，那孩子放学后通常是谁在照顾呢？案主：有时候是阿嬷，有时候他自己在家看电视。'
+    '社工：经济方面目前有没有什么困难？案主：房租涨了，每个月都很紧，还在想要不要申请补助。'
+)
+
+app = FastAPI(title="API stubs")
+
+# 統計，供驅動程式檢查替身是否成為瓶頸
+stats = {'whisper_requests': 0, 'whisper_errors': 0, 'claude_requests': 0, 'claude_errors': 0, 'in_flight': 0}
+
+def jitter(seconds: float) -> float:
+    if settings.jitter_sigma <= 0:
+        return seconds
+    return seconds * rng.lognormvariate(0, settings.jitter_sigma)
+
+def sample_text(chars: int) -> str:
+    repeats = chars // len(SAMPLE_TEXT) + 1
+    return (SAMPLE_TEXT * repeats)[:max(chars, 1)]
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(
+    file: UploadFile = File(...),
+    model: str = Form('whisper-1'),
+    response_format: str = Form('json'),
+    language: str = Form(None)
+):
+    content = await file.read()
+    size_mb = len(content) / 1024 / 1024
+    stats['whisper_requests'] += 1
+    stats['in_flight'] += 1
+    try:
+        await asyncio.sleep(jitter(settings.whisper_base_seconds + settings.whisper_seconds_per_mb * size_mb))
+        if rng.random() < settings.whisper_error_rate:
+            stats['whisper_errors'] += 1
+            return JSONResponse(
+                status_code=502,
+                content={'error': {'message': 'Bad Gateway', 'type': 'server_error', 'code': None}}
+            )
+    finally:
+        stats['in_flight'] -= 1
+
+    text = sample_text(int(size_mb * settings.whisper_chars_per_mb))
+    if response_format == 'text':
+        return PlainTextResponse(text)
+    return {
+        'task': 'transcribe',
+        'language': language or 'chinese',
+        'duration': round(size_mb * 60 / 0.48, 2),
+        'text': text,
+        'segments': [],
+    }
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    stats['claude_requests'] += 1
+    if rng.random() < settings.claude_error_rate:
+        stats['claude_errors'] += 1
+        return JSONResponse(
+            status_code=529,
+            content={'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}}
+        )
+
+    message_id = f"msg_{uuid.uuid4().hex[:24]}"
+    model = body.get('model', 'stub')
+    output_tokens = min(settings.output_tokens, body.get('max_tokens', settings.output_tokens))
+    prompt_chars = sum(len(str(message.get('content', ''))) for message in body.get('messages', []))
+    input_tokens = max(1, prompt_chars // 2)
+    text = sample_text(int(output_tokens * 1.5))
+
+    if not body.get('stream'):
+        await asyncio.sleep(jitter(settings.claude_ttft_seconds + output_tokens / settings.tokens_per_second))
+        return {
+            'id': message_id, 'type': 'message', 'role': 'assistant', 'model': model,
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn', 'stop_sequence': None,
+            'usage': {'input_tokens': input_tokens, 'output_tokens': output_tokens},
+        }
+
+    async def stream():
+        stats['in_flight'] += 1
+        try:
+            yield sse_event('message_start', {
+                'type': 'message_start',
+                'message': {
+                    'id': message_id, 'type': 'message', 'role': 'assistant', 'model': model,
+                    'content': [], 'stop_reason': None, 'stop_sequence': None,
+                    'usage': {'input_tokens': input_tokens, 'output_tokens': 1},
+                },
+            })
+            yield sse_event('content_block_start', {
+                'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}
+            })
+            await asyncio.sleep(jitter(settings.claude_ttft_seconds))
+
+            chars_per_token = len(text) / output_tokens
+            delay = settings.tokens_per_delta / settings.tokens_per_second
+            next_time = time.perf_counter()
+            for start_token in range(0, output_tokens, settings.tokens_per_delta):
+                end_token = min(output_tokens, start_token + settings.tokens_per_delta)
+                chunk = text[int(start_token * chars_per_token):int(end_token * chars_per_token)]
+                yield sse_event('content_block_delta', {
+                    'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': chunk}
+                })
+                # 以絕對時間排程，避免 sleep 誤差累積
+                next_time += delay
+                await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+
+            yield sse_event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+            yield sse_event('message_delta', {
+                'type': 'message_delta',
+                'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                'usage': {'output_tokens': output_tokens},
+            })
+            yield sse_event('message_stop', {'type': 'message_stop'})
+        finally:
+            stats['in_flight'] -= 1
+
+    return StreamingResponse(stream(), media_type='text/event-stream')
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, 'settings': asdict(settings)}
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    """將 StubSettings 欄位加入命令列參數（驅動程式共用）"""
+    for name, default in asdict(StubSettings()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='本機 OpenAI / Anthropic API 替身')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    for name in asdict(settings):
+        setattr(settings, name, getattr(args, name))
+    rng.seed(settings.seed)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+if __name__ == "__main__":
+    main()
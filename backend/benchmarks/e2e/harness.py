@@ -0,0 +1,342 @@
+# benchmarks/e2e/harness.py
+"""
+端對端基準共用工具
+
+- 啟動 / 停止子行程（API 替身、uvicorn）並等待就緒
+- 由 /proc 取樣主行程與所有子行程（uvicorn worker）的 RSS 合計
+- 以 httpx 串流 SSE 請求，記錄首個事件時間、事件間隔、最後事件類型與總延遲
+- 讀取應用的 /metrics（Prometheus 文字格式）
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import signal
+import asyncio
+import argparse
+import subprocess
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from api_stubs import SAMPLE_TEXT, StubSettings, add_stub_arguments
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+def start_process(args: List[str], env: Optional[Dict[str, str]] = None, cwd: str = BACKEND_DIR,
+                  log_path: Optional[str] = None) -> subprocess.Popen:
+    """啟動子行程（獨立行程群組，停止時連同 worker 一起結束）"""
+    output = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=cwd,
+        env={**os.environ, **(env or {})},
+        stdout=output,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+
+def stop_process(process: subprocess.Popen, timeout: float = 10):
+    if process.poll() is not None:
+        return
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60):
+    """輪詢直到 URL 回應（任何狀態碼皆可），行程提早結束則拋出例外"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"行程已結束（exit {process.returncode}）: {' '.join(process.args)}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.25)
+    raise TimeoutError(f"等待 {url} 就緒逾時")
+
+AUDIO_MIME_TYPES = {
+    'wav': 'audio/wav', 'mp3': 'audio/mpeg', 'm4a': 'audio/mp4',
+    'webm': 'audio/webm', 'ogg': 'audio/ogg', 'flac': 'audio/flac',
+}
+
+def add_stack_arguments(parser: argparse.ArgumentParser):
+    """應用 / 替身啟動與請求內容的共用命令列參數"""
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', 4)), help='uvicorn worker 數')
+    parser.add_argument('--app-port', type=int, default=8800)
+    parser.add_argument('--stub-port', type=int, default=8900)
+    parser.add_argument('--timeout', type=float, default=900, help='單一請求逾時（秒）')
+    parser.add_argument('--audio-minutes', type=float, default=5, help='合成音檔長度（分鐘）')
+    parser.add_argument('--audio-format', default='mp3', choices=list(AUDIO_MIME_TYPES), help='合成音檔格式')
+    parser.add_argument('--transcript-chars', type=int, default=6000, help='報告 / 處遇計畫輸入長度')
+    add_stub_arguments(parser)
+
+def stub_settings(args) -> dict:
+    return {name: getattr(args, name) for name in asdict(StubSettings())}
+
+def build_request_factories(args, audio_path: Optional[str]) -> dict:
+    """情境名稱 -> (路徑, 產生 httpx 請求參數的函數)"""
+    transcript = (SAMPLE_TEXT * (args.transcript_chars // len(SAMPLE_TEXT) + 1))[:args.transcript_chars]
+
+    audio_bytes = b''
+    if audio_path:
+        with open(audio_path, 'rb') as f:
+            audio_bytes = f.read()
+    audio_name = f"visit.{args.audio_format}"
+
+    report_payload = {
+        'transcript': transcript,
+        'socialWorkerNotes': '案主情緒穩定，願意配合後續訪視。',
+        'selectedSections': ['economic_financial_status', 'support_system_status'],
+        'requiredSections': ['main_issue', 'family_status', 'children_status', 'overall_evaluation_and_recommendation'],
+    }
+    plan_payload = {
+        'reportDraft': transcript,
+        'selectedServiceDomains': ['economic_assistance', 'protection_services'],
+    }
+
+    return {
+        # 要求直接串流背景工作事件（否則返回 202 與 job_id）
+        'transcribe': ('/backend/transcribe', lambda: {
+            'files': {'audio': (audio_name, audio_bytes, AUDIO_MIME_TYPES[args.audio_format])},
+            'headers': {'Accept': 'text/event-stream'},
+        }),
+        'report': ('/backend/generate-report', lambda: {'json': report_payload}),
+        'treatment-plan': ('/backend/generate-treatment-plan', lambda: {'json': plan_payload}),
+    }
+
+def require_postgres(parser: argparse.ArgumentParser):
+    if not os.getenv('DATABASE_URL', '').startswith('postgresql'):
+        parser.error('請設定指向測試用 Postgres 的 DATABASE_URL（應用會寫入使用記錄）')
+
+@contextmanager
+def launch_stack(args, work_dir: str, extra_env: Optional[Dict[str, str]] = None):
+    """
+    啟動 API 替身與 uvicorn 多 worker 應用，yield 應用主行程
+
+    指標目錄設在 work_dir 內，/metrics 會彙整所有 worker，不受負載平衡影響。
+    """
+    stub_args = []
+    for name, value in stub_settings(args).items():
+        stub_args.extend([f"--{name.replace('_', '-')}", str(value)])
+    stubs = start_process(
+        ['benchmarks/e2e/api_stubs.py', '--port', str(args.stub_port), *stub_args],
+        log_path=os.path.join(work_dir, 'stubs.log')
+    )
+    app = None
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.stub_port}/stats", stubs)
+        metrics_dir = os.path.join(work_dir, 'prometheus')
+        os.makedirs(metrics_dir, exist_ok=True)
+        app = start_process(
+            ['-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1', '--port', str(args.app_port),
+             '--workers', str(args.workers), '--log-level', 'warning'],
+            env={
+                'WEB_CONCURRENCY': str(args.workers),
+                'PROMETHEUS_MULTIPROC_DIR': metrics_dir,
+                # 佇列與全主機限制狀態也放在 work_dir，不與本機其他執行個體共用
+                'JOB_DB_PATH': os.path.join(work_dir, 'jobs.sqlite3'),
+                'UPSTREAM_LIMIT_DIR': os.path.join(work_dir, 'limits'),
+                'OPENAI_BASE_URL': f"http://127.0.0.1:{args.stub_port}/v1",
+                'ANTHROPIC_BASE_URL': f"http://127.0.0.1:{args.stub_port}",
+                'OPENAI_API_KEY': 'sk-bench',
+                'CLAUDE_API_KEY': 'sk-ant-bench',
+                **(extra_env or {}),
+            },
+            log_path=os.path.join(work_dir, 'app.log')
+        )
+        wait_until_ready(f"http://127.0.0.1:{args.app_port}/metrics", app, timeout=120)
+        print(f"🚀 應用已啟動（{args.workers} workers），日誌: {work_dir}")
+        yield app
+    finally:
+        if app is not None:
+            stop_process(app)
+        stop_process(stubs)
+
+def parse_metrics(text: str) -> Dict[str, List[tuple]]:
+    """解析 Prometheus 文字格式：指標名稱 -> [(標籤 dict, 數值)]"""
+    samples: Dict[str, List[tuple]] = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name_and_labels, _, value = line.rpartition(' ')
+        labels = {}
+        name = name_and_labels
+        if '{' in name_and_labels:
+            name, _, label_text = name_and_labels.partition('{')
+            for pair in label_text.rstrip('}').split('",'):
+                if '=' in pair:
+                    key, _, label_value = pair.partition('=')
+                    labels[key.strip(',')] = label_value.strip('"')
+        try:
+            samples.setdefault(name, []).append((labels, float(value)))
+        except ValueError:
+            continue
+    return samples
+
+async def scrape_metrics(client: httpx.AsyncClient, url: str) -> Dict[str, List[tuple]]:
+    response = await client.get(url)
+    response.raise_for_status()
+    return parse_metrics(response.text)
+
+def _children(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def tree_rss_bytes(pid: int) -> int:
+    """行程樹的 RSS 合計（uvicorn 主行程 + worker，含 ffmpeg 等孫行程）"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _rss_bytes(current)
+        pending.extend(_children(current))
+    return total
+
+class RssSampler:
+    """背景取樣行程樹 RSS，記錄峰值"""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_bytes = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self.peak_bytes = max(self.peak_bytes, tree_rss_bytes(self.pid))
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.peak_bytes = tree_rss_bytes(self.pid)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> int:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return self.peak_bytes
+
+@dataclass
+class StreamResult:
+    ok: bool
+    status: int
+    latency: float
+    first_event: Optional[float] = None
+    last_type: Optional[str] = None
+    events: int = 0
+    error: Optional[str] = None
+    trace_id: Optional[str] = None
+    gaps: List[float] = field(default_factory=list)
+
+async def stream_sse(client: httpx.AsyncClient, url: str, **request_kwargs) -> StreamResult:
+    """
+    送出請求並讀完整個 SSE 串流
+
+    成功的定義：HTTP 200 且最後一個事件為 complete（error 事件視為失敗）。
+    """
+    started = time.perf_counter()
+    result = StreamResult(ok=False, status=0, latency=0.0)
+    try:
+        async with client.stream('POST', url, **request_kwargs) as response:
+            result.status = response.status_code
+            result.trace_id = response.headers.get('x-trace-id')
+            if response.status_code != 200:
+                result.error = (await response.aread()).decode(errors='replace')[:200]
+            else:
+                previous = None
+                async for line in response.aiter_lines():
+                    if not line.startswith('data: '):
+                        continue
+                    now = time.perf_counter()
+                    if previous is None:
+                        result.first_event = now - started
+                    else:
+                        result.gaps.append(now - previous)
+                    previous = now
+                    result.events += 1
+                    try:
+                        event = json.loads(line[6:])
+                    except json.JSONDecodeError:
+                        continue
+                    result.last_type = event.get('type')
+                    if result.last_type == 'error':
+                        result.error = str(event.get('error'))[:200]
+                result.ok = result.last_type == 'complete'
+    except httpx.HTTPError as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.latency = time.perf_counter() - started
+    return result
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近秩百分位數"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+@dataclass
+class ScenarioReport:
+    name: str
+    concurrency: int
+    requests: int
+    results: List[StreamResult] = field(default_factory=list)
+    wall_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+
+    def summary(self) -> dict:
+        succeeded = [result for result in self.results if result.ok]
+        latencies = [result.latency for result in succeeded]
+        first_events = [result.first_event for result in self.results if result.first_event is not None]
+
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        errors = {}
+        for result in self.results:
+            if not result.ok:
+                key = result.error or f"HTTP {result.status} / {result.last_type}"
+                errors[key] = errors.get(key, 0) + 1
+
+        return {
+            'concurrency': self.concurrency,
+            'requests': self.requests,
+            'succeeded': len(succeeded),
+            'failed': len(self.results) - len(succeeded),
+            'wall_seconds': round(self.wall_seconds, 3),
+            'throughput_rps': round(len(succeeded) / self.wall_seconds, 4) if self.wall_seconds else None,
+            'latency_p50_ms': ms(percentile(latencies, 50)),
+            'latency_p99_ms': ms(percentile(latencies, 99)),
+            'first_event_p50_ms': ms(percentile(first_events, 50)),
+            'first_event_p99_ms': ms(percentile(first_events, 99)),
+            'peak_rss_mb': round(self.peak_rss_bytes / 1024 / 1024, 1),
+            'errors': errors,
+        }
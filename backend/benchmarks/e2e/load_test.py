@@ -0,0 +1,335 @@
+# benchmarks/e2e/load_test.py
+"""
+併發 SSE 負載測試
+
+模擬早上訪視結束後多位社工同時上傳：依負載曲線維持 N 個同時進行的 SSE
+串流（轉錄 / 報告，對本機 API 替身），分階段記錄：
+- 吞吐量、延遲 p50/p99、首個事件時間
+- SSE 事件間隔（p50/p99/最大值，長間隔代表使用者看到進度卡住）
+- 每個 worker 的事件迴圈停頓次數與秒數（應用的 event_loop_* 指標）
+- 應用行程樹的峰值 RSS
+
+最後依各階段吞吐量與延遲找出飽和點，輸出至 benchmarks/results/load_<label>.json。
+
+負載曲線:
+    step    依 --levels 逐級提高，每級維持 --stage-seconds
+    linear  於 --ramp-seconds 內線性增加到 --max-sessions，再維持 --hold-seconds
+    spike   一開始就直接 --max-sessions，維持 --hold-seconds
+
+用法:
+    DATABASE_URL=postgresql://... python benchmarks/e2e/load_test.py \\
+        --profile step --levels 1,2,4,8,16 --stage-seconds 60 \\
+        --mix transcribe=0.7,report=0.3 --workers 4 --max-concurrent-transcriptions 2 --label morning
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import (
+    RESULTS_DIR, RssSampler, StreamResult, stream_sse, percentile, add_stack_arguments,
+    build_request_factories, launch_stack, require_postgres, scrape_metrics, stub_settings
+)
+from synthetic_audio import generate_audio_file
+
+def build_schedule(args) -> List[dict]:
+    """
+    負載曲線 -> 階段列表 [{name, start, end, targets: [(時間偏移, 目標併發)]}]
+
+    linear 曲線以 --stage-seconds 切成多個時間窗，方便比較各時段的表現。
+    """
+    if args.profile == 'step':
+        levels = [int(level) for level in args.levels.split(',')]
+        return [
+            {'name': f"c={level}", 'start': i * args.stage_seconds, 'end': (i + 1) * args.stage_seconds,
+             'targets': [(i * args.stage_seconds, level)]}
+            for i, level in enumerate(levels)
+        ]
+
+    if args.profile == 'spike':
+        return [{'name': f"spike c={args.max_sessions}", 'start': 0, 'end': args.hold_seconds,
+                 'targets': [(0, args.max_sessions)]}]
+
+    # linear：每增加一個 session 的時間點
+    total = args.ramp_seconds + args.hold_seconds
+    step_seconds = args.ramp_seconds / args.max_sessions
+    targets = [(i * step_seconds, i + 1) for i in range(args.max_sessions)]
+    stages = []
+    start = 0.0
+    while start < total:
+        end = min(total, start + args.stage_seconds)
+        stage_targets = [(offset, target) for offset, target in targets if start <= offset < end]
+        if not stage_targets:
+            stage_targets = [(start, max([target for offset, target in targets if offset < start], default=1))]
+        stages.append({'name': f"{int(start)}-{int(end)}s", 'start': start, 'end': end, 'targets': stage_targets})
+        start = end
+    return stages
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def lag_histogram(metrics: dict) -> Dict[float, float]:
+    buckets = {}
+    for labels, value in metrics.get('event_loop_lag_seconds_bucket', []):
+        upper = float('inf') if labels.get('le') == '+Inf' else float(labels['le'])
+        buckets[upper] = buckets.get(upper, 0) + value
+    return buckets
+
+def per_worker(metrics: dict, name: str) -> Dict[str, float]:
+    return {labels.get('pid', '?'): value for labels, value in metrics.get(name, [])}
+
+def loop_stats(before: dict, after: dict) -> dict:
+    """兩次 /metrics 之間的事件迴圈延遲（彙總分位數 + 每個 worker 的停頓）"""
+    lag_before, lag_after = lag_histogram(before), lag_histogram(after)
+    deltas = sorted((upper, lag_after[upper] - lag_before.get(upper, 0)) for upper in lag_after)
+    total = deltas[-1][1] if deltas else 0
+
+    def bucket_quantile(q):
+        for upper, count in deltas:
+            if total and count >= q * total:
+                return upper
+        return None
+
+    stalls_before = per_worker(before, 'event_loop_stalls')
+    seconds_before = per_worker(before, 'event_loop_stall_seconds')
+    seconds_after = per_worker(after, 'event_loop_stall_seconds')
+    workers = {
+        pid: {
+            'stalls': int(count - stalls_before.get(pid, 0)),
+            'stall_seconds': round(seconds_after.get(pid, 0) - seconds_before.get(pid, 0), 3),
+        }
+        for pid, count in per_worker(after, 'event_loop_stalls').items()
+    }
+    return {
+        'samples': int(total),
+        'lag_p50_le_s': bucket_quantile(0.5),
+        'lag_p99_le_s': bucket_quantile(0.99),
+        'workers': {pid: stats for pid, stats in workers.items() if stats['stalls']},
+    }
+
+def summarize_stage(stage: dict, records: List[tuple], loop: dict, peak_rss_bytes: int) -> dict:
+    """records: [(目標名稱, 開始偏移, 結束偏移, StreamResult)]"""
+    duration = stage['end'] - stage['start']
+    started = [record for record in records if stage['start'] <= record[1] < stage['end']]
+    finished_ok = [record for record in records
+                   if stage['start'] <= record[2] < stage['end'] and record[3].ok]
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    by_target = {}
+    for name in sorted({record[0] for record in started}):
+        results: List[StreamResult] = [record[3] for record in started if record[0] == name]
+        latencies = [result.latency for result in results if result.ok]
+        first_events = [result.first_event for result in results if result.first_event is not None]
+        gaps = [gap for result in results for gap in result.gaps]
+        by_target[name] = {
+            'started': len(results),
+            'failed': sum(1 for result in results if not result.ok),
+            'latency_p50_ms': ms(percentile(latencies, 50)),
+            'latency_p99_ms': ms(percentile(latencies, 99)),
+            'first_event_p50_ms': ms(percentile(first_events, 50)),
+            'first_event_p99_ms': ms(percentile(first_events, 99)),
+            'gap_p50_ms': ms(percentile(gaps, 50)),
+            'gap_p99_ms': ms(percentile(gaps, 99)),
+            'gap_max_ms': ms(max(gaps, default=None)),
+        }
+
+    latencies = [record[3].latency for record in started if record[3].ok]
+    targets = [target for _, target in stage['targets']]
+    return {
+        'name': stage['name'],
+        'start_s': round(stage['start'], 1),
+        'duration_s': round(duration, 1),
+        'concurrency': max(targets),
+        'completed': len(finished_ok),
+        'throughput_rps': round(len(finished_ok) / duration, 4),
+        'latency_p99_ms': ms(percentile(latencies, 99)),
+        'targets': by_target,
+        'event_loop': loop,
+        'peak_rss_mb': round(peak_rss_bytes / 1024 / 1024, 1),
+    }
+
+def find_saturation(stages: List[dict], min_gain: float, latency_factor: float) -> dict:
+    """
+    找出飽和點：併發提高但吞吐量增幅低於 min_gain，
+    或 p99 延遲超過第一階段的 latency_factor 倍
+    """
+    best = max(stages, key=lambda stage: stage['throughput_rps'], default=None)
+    baseline_p99 = next((stage['latency_p99_ms'] for stage in stages if stage['latency_p99_ms']), None)
+    saturation = {'max_throughput_rps': best['throughput_rps'] if best else None,
+                  'max_throughput_concurrency': best['concurrency'] if best else None,
+                  'saturated_at_concurrency': None, 'reason': None}
+
+    for previous, stage in zip(stages, stages[1:]):
+        if stage['concurrency'] <= previous['concurrency']:
+            continue
+        if previous['throughput_rps'] and stage['throughput_rps'] < previous['throughput_rps'] * (1 + min_gain):
+            saturation['saturated_at_concurrency'] = stage['concurrency']
+            saturation['reason'] = (f"吞吐量 {previous['throughput_rps']} -> {stage['throughput_rps']} req/s，"
+                                    f"增幅低於 {min_gain:.0%}")
+            break
+        if baseline_p99 and stage['latency_p99_ms'] and stage['latency_p99_ms'] > baseline_p99 * latency_factor:
+            saturation['saturated_at_concurrency'] = stage['concurrency']
+            saturation['reason'] = f"p99 延遲 {stage['latency_p99_ms']} ms 超過基準 {baseline_p99} ms 的 {latency_factor:g} 倍"
+            break
+    return saturation
+
+async def run(args, audio_path: str, app_pid: int) -> dict:
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    metrics_url = f"{base_url}/metrics"
+    factories = build_request_factories(args, audio_path)
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(args.seed)
+    schedule = build_schedule(args)
+
+    records = []
+    in_flight = set()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=args.max_sessions)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        origin = time.perf_counter()
+
+        async def session(name: str):
+            path, make_request = factories[name]
+            started = time.perf_counter() - origin
+            result = await stream_sse(client, path, **make_request())
+            records.append((name, started, time.perf_counter() - origin, result))
+
+        stages = []
+        target = 0
+        for stage in schedule:
+            before = await scrape_metrics(client, metrics_url)
+            sampler = RssSampler(app_pid)
+            sampler.start()
+
+            pending_targets = list(stage['targets'])
+            while True:
+                now = time.perf_counter() - origin
+                if now >= stage['end']:
+                    break
+                while pending_targets and pending_targets[0][0] <= now:
+                    target = pending_targets.pop(0)[1]
+                # 維持目標併發：session 結束後由下一輪補上
+                while len(in_flight) < target:
+                    task = asyncio.create_task(session(rng.choices(names, weights)[0]))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                await asyncio.sleep(0.05)
+
+            after = await scrape_metrics(client, metrics_url)
+            peak_rss = await sampler.stop()
+            stages.append((stage, before, after, peak_rss))
+            print(f"📈 階段 {stage['name']:<14} 完成 {len(records)} 個 session，進行中 {len(in_flight)}")
+
+        # 等待進行中的 session 結束（計入延遲統計，不計入吞吐量）
+        if in_flight:
+            print(f"⏳ 等待 {len(in_flight)} 個進行中的 session...")
+            done, pending = await asyncio.wait(set(in_flight), timeout=args.drain_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        stub_stats = (await client.get(f"http://127.0.0.1:{args.stub_port}/stats")).json()
+
+    summaries = [
+        summarize_stage(stage, records, loop_stats(before, after), peak_rss)
+        for stage, before, after, peak_rss in stages
+    ]
+    for summary in summaries:
+        stalls = sum(worker['stalls'] for worker in summary['event_loop']['workers'].values())
+        print(f"⏱️ {summary['name']:<14} c={summary['concurrency']:<4} {summary['throughput_rps']:>8.3f} req/s   "
+              f"p99 {summary['latency_p99_ms'] or 0:>9.0f} ms   loop p99 ≤ {summary['event_loop']['lag_p99_le_s']} s   "
+              f"停頓 {stalls}   RSS {summary['peak_rss_mb']:>7.1f} MB")
+
+    return {
+        'stages': summaries,
+        'saturation': find_saturation(summaries, args.saturation_gain, args.latency_factor),
+        'stub_stats': stub_stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='併發 SSE 負載測試')
+    parser.add_argument('--label', default='run', help='輸出檔標籤')
+    parser.add_argument('--profile', default='step', choices=['step', 'linear', 'spike'], help='負載曲線')
+    parser.add_argument('--levels', default='1,2,4,8,16', help='step：逗號分隔的併發級距')
+    parser.add_argument('--stage-seconds', type=float, default=60, help='每個階段（或時間窗）的秒數')
+    parser.add_argument('--max-sessions', type=int, default=16, help='linear / spike：最大併發')
+    parser.add_argument('--ramp-seconds', type=float, default=300, help='linear：爬升秒數')
+    parser.add_argument('--hold-seconds', type=float, default=120, help='linear / spike：維持秒數')
+    parser.add_argument('--drain-seconds', type=float, default=300, help='最後等待進行中 session 的秒數')
+    parser.add_argument('--mix', default='transcribe=0.7,report=0.3', help='端點權重，例如 transcribe=0.7,report=0.3')
+    parser.add_argument('--seed', type=int, default=42, help='端點選擇的亂數種子')
+    parser.add_argument('--max-concurrent-transcriptions', type=int, help='覆寫應用的 MAX_CONCURRENT_TRANSCRIPTIONS')
+    parser.add_argument('--saturation-gain', type=float, default=0.1, help='低於此吞吐量增幅視為飽和')
+    parser.add_argument('--latency-factor', type=float, default=2.0, help='p99 延遲超過第一階段幾倍視為飽和')
+    add_stack_arguments(parser)
+    args = parser.parse_args()
+    require_postgres(parser)
+
+    if args.profile == 'step':
+        args.max_sessions = max(int(level) for level in args.levels.split(','))
+    unknown = set(parse_mix(args.mix)) - {'transcribe', 'report', 'treatment-plan'}
+    if unknown:
+        parser.error(f"未知的端點: {', '.join(sorted(unknown))}")
+
+    work_dir = tempfile.mkdtemp(prefix='load_test_')
+    audio_path = None
+    if 'transcribe' in parse_mix(args.mix):
+        print(f"🎵 產生 {args.audio_minutes} 分鐘 {args.audio_format} 合成音檔...")
+        audio_path = generate_audio_file(
+            os.path.join(work_dir, f"visit.{args.audio_format}"), args.audio_minutes, args.audio_format
+        )
+
+    extra_env = {}
+    if args.max_concurrent_transcriptions is not None:
+        extra_env['MAX_CONCURRENT_TRANSCRIPTIONS'] = str(args.max_concurrent_transcriptions)
+
+    with launch_stack(args, work_dir, extra_env) as app:
+        results = asyncio.run(run(args, audio_path, app.pid))
+
+    saturation = results['saturation']
+    if saturation['saturated_at_concurrency']:
+        print(f"🧱 飽和於併發 {saturation['saturated_at_concurrency']}：{saturation['reason']}")
+    else:
+        print(f"✅ 測試範圍內未飽和，最高 {saturation['max_throughput_rps']} req/s")
+
+    report = {
+        'label': args.label,
+        'measured_at': datetime.now().isoformat(timespec='seconds'),
+        'profile': args.profile,
+        'mix': parse_mix(args.mix),
+        'app_settings': {
+            'workers': args.workers,
+            'max_concurrent_transcriptions': args.max_concurrent_transcriptions or 'default',
+        },
+        'audio': {'minutes': args.audio_minutes, 'format': args.audio_format,
+                  'bytes': os.path.getsize(audio_path)} if audio_path else None,
+        'stub_settings': stub_settings(args),
+        **results,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, f"load_{args.label}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 已輸出: {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/e2e/run_e2e.py
+"""
+端對端吞吐量基準
+
+啟動本機 API 替身與真實的 FastAPI 應用（uvicorn 多 worker），
+以指定併發度對下列端點送出請求並讀完 SSE 串流：
+- transcribe        POST /backend/transcribe（合成音檔）
+- report            POST /backend/generate-report
+- treatment-plan    POST /backend/generate-treatment-plan
+
+每個情境、每個併發度記錄吞吐量、p50/p99 延遲、首個事件時間與
+應用行程樹的峰值 RSS，輸出至 benchmarks/results/e2e_<label>.json。
+應用仍會寫入使用記錄，需先設定指向測試用 Postgres 的 DATABASE_URL：
+
+    DATABASE_URL=postgresql://... python benchmarks/e2e/run_e2e.py \\
+        --scenarios transcribe,report --concurrency 1,4,8 --requests 16 \\
+        --audio-minutes 15 --audio-format mp3 --tokens-per-second 60 --label baseline
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import (
+    RESULTS_DIR, ScenarioReport, RssSampler, stream_sse, add_stack_arguments, build_request_factories,
+    launch_stack, require_postgres, stub_settings
+)
+from synthetic_audio import generate_audio_file
+
+async def run_scenario(name: str, path: str, make_request, concurrency: int, requests: int,
+                       base_url: str, app_pid: int, timeout: float) -> ScenarioReport:
+    report = ScenarioReport(name=name, concurrency=concurrency, requests=requests)
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            # 固定併發：每個 worker 完成一個請求後立即送出下一個（closed-loop）
+            for _ in remaining:
+                report.results.append(await stream_sse(client, path, **make_request()))
+
+        sampler = RssSampler(app_pid)
+        sampler.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        report.wall_seconds = time.perf_counter() - started
+        report.peak_rss_bytes = await sampler.stop()
+    return report
+
+async def run(args, audio_path: str, app_pid: int) -> dict:
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    factories = build_request_factories(args, audio_path)
+    scenarios = {}
+
+    for name in args.scenarios.split(','):
+        path, make_request = factories[name]
+        levels = {}
+        for concurrency in (int(level) for level in args.concurrency.split(',')):
+            report = await run_scenario(
+                name, path, make_request, concurrency, args.requests, base_url, app_pid, args.timeout
+            )
+            summary = report.summary()
+            levels[str(concurrency)] = summary
+            print(f"⏱️ {name:<15} c={concurrency:<3} {summary['throughput_rps'] or 0:>8.3f} req/s   "
+                  f"p50 {summary['latency_p50_ms'] or 0:>9.0f} ms   p99 {summary['latency_p99_ms'] or 0:>9.0f} ms   "
+                  f"TTFE p50 {summary['first_event_p50_ms'] or 0:>7.0f} ms   "
+                  f"RSS {summary['peak_rss_mb']:>7.1f} MB   失敗 {summary['failed']}")
+        scenarios[name] = levels
+
+    async with httpx.AsyncClient() as client:
+        stub_stats = (await client.get(f"http://127.0.0.1:{args.stub_port}/stats")).json()
+
+    return {'scenarios': scenarios, 'stub_stats': stub_stats}
+
+def main():
+    parser = argparse.ArgumentParser(description='端對端吞吐量基準')
+    parser.add_argument('--label', default='run', help='輸出檔標籤')
+    parser.add_argument('--scenarios', default='transcribe,report,treatment-plan', help='逗號分隔的情境')
+    parser.add_argument('--concurrency', default='1,4', help='逗號分隔的併發度')
+    parser.add_argument('--requests', type=int, default=8, help='每個併發度的請求數')
+    add_stack_arguments(parser)
+    args = parser.parse_args()
+
+    require_postgres(parser)
+
+    work_dir = tempfile.mkdtemp(prefix='e2e_bench_')
+    audio_path = None
+    if 'transcribe' in args.scenarios.split(','):
+        print(f"🎵 產生 {args.audio_minutes} 分鐘 {args.audio_format} 合成音檔...")
+        audio_path = generate_audio_file(
+            os.path.join(work_dir, f"visit.{args.audio_format}"), args.audio_minutes, args.audio_format
+        )
+
+    with launch_stack(args, work_dir) as app:
+        results = asyncio.run(run(args, audio_path, app.pid))
+
+    report = {
+        'label': args.label,
+        'measured_at': datetime.now().isoformat(timespec='seconds'),
+        'workers': args.workers,
+        'requests_per_level': args.requests,
+        'audio': {'minutes': args.audio_minutes, 'format': args.audio_format,
+                  'bytes': os.path.getsize(audio_path)} if audio_path else None,
+        'transcript_chars': args.transcript_chars,
+        'stub_settings': stub_settings(args),
+        **results,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, f"e2e_{args.label}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 已輸出: {output_path}")
+
+if __name__ == "__main__":
+    main()
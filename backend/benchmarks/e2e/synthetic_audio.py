@@ -0,0 +1,133 @@
+# benchmarks/e2e/synthetic_audio.py
+"""
+合成類語音音檔
+
+以基頻 + 泛音、雙共振峰包絡模擬音節，再依詞 / 句停頓排列並加上底噪，
+產生與真實訪談錄音相近的能量起伏與靜音比例（不含可辨識內容）。
+WAV 直接以標準庫輸出；mp3 / m4a / webm 等格式經 pydub（ffmpeg）轉檔。
+
+用法:
+    python benchmarks/e2e/synthetic_audio.py --minutes 15 --format mp3 --output /tmp/visit.mp3
+"""
+
+import io
+import math
+import wave
+import random
+import argparse
+from array import array
+
+SAMPLE_RATE = 16000
+MAX_AMPLITUDE = 12000
+NOISE_AMPLITUDE = 120
+
+# pydub 匯出參數，與錄音 App 常見設定相近
+EXPORT_OPTIONS = {
+    'mp3': {'format': 'mp3', 'bitrate': '128k'},
+    'm4a': {'format': 'ipod', 'codec': 'aac', 'bitrate': '96k'},
+    'webm': {'format': 'webm', 'codec': 'libopus', 'bitrate': '48k'},
+    'ogg': {'format': 'ogg', 'codec': 'libvorbis'},
+    'flac': {'format': 'flac'},
+}
+
+def _syllable(rng: random.Random, sample_rate: int) -> array:
+    """單一音節：帶滑音的基頻、共振峰加權泛音，開頭可能有子音噪音"""
+    duration = rng.uniform(0.12, 0.32)
+    count = int(duration * sample_rate)
+    f0_start = rng.uniform(100, 250)
+    f0_end = f0_start * rng.uniform(0.8, 1.25)
+    formants = (rng.uniform(500, 900), rng.uniform(1000, 2200))
+    harmonics = []
+    for n in range(1, 12):
+        frequency = f0_start * n
+        weight = sum(math.exp(-((frequency - formant) / 250) ** 2) for formant in formants) + 0.05 / n
+        harmonics.append((n, weight))
+    total_weight = sum(weight for _, weight in harmonics)
+
+    consonant = int(rng.uniform(0, 0.04) * sample_rate) if rng.random() < 0.6 else 0
+    samples = array('h', bytes(2 * count))
+    phase = 0.0
+    for i in range(count):
+        progress = i / count
+        f0 = f0_start + (f0_end - f0_start) * progress
+        phase += 2 * math.pi * f0 / sample_rate
+        envelope = math.sin(math.pi * progress) ** 0.6
+        value = sum(weight * math.sin(n * phase) for n, weight in harmonics) / total_weight
+        if i < consonant:
+            value = value * 0.3 + rng.uniform(-0.7, 0.7)
+        samples[i] = int(max(-1.0, min(1.0, value * envelope)) * MAX_AMPLITUDE)
+    return samples
+
+def _noise(rng: random.Random, count: int) -> array:
+    return array('h', (int(rng.gauss(0, NOISE_AMPLITUDE)) for _ in range(count)))
+
+def generate_pcm(minutes: float, seed: int = 42, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """產生 16-bit 單聲道 PCM"""
+    rng = random.Random(seed)
+    syllables = [_syllable(rng, sample_rate).tobytes() for _ in range(40)]
+    noise = _noise(rng, sample_rate * 2).tobytes()
+    target_bytes = int(minutes * 60 * sample_rate) * 2
+
+    def silence(seconds: float) -> bytes:
+        length = int(seconds * sample_rate) * 2
+        start = rng.randrange(0, len(noise) - length - 2, 2) if length < len(noise) - 2 else 0
+        return (noise * (length // len(noise) + 1))[start:start + length]
+
+    parts = []
+    written = 0
+    words_until_sentence_end = rng.randint(8, 15)
+    while written < target_bytes:
+        for _ in range(rng.randint(1, 4)):
+            syllable = rng.choice(syllables)
+            gap = silence(rng.uniform(0.03, 0.08))
+            parts.extend((syllable, gap))
+            written += len(syllable) + len(gap)
+        words_until_sentence_end -= 1
+        if words_until_sentence_end <= 0:
+            pause = silence(rng.uniform(0.6, 1.5))
+            words_until_sentence_end = rng.randint(8, 15)
+        else:
+            pause = silence(rng.uniform(0.15, 0.6))
+        parts.append(pause)
+        written += len(pause)
+
+    return b''.join(parts)[:target_bytes]
+
+def write_wav(pcm: bytes, output, sample_rate: int = SAMPLE_RATE):
+    with wave.open(output, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+
+def generate_audio_file(path: str, minutes: float, fmt: str = 'wav', seed: int = 42,
+                        sample_rate: int = SAMPLE_RATE) -> str:
+    """產生指定長度與格式的合成音檔，返回檔案路徑"""
+    pcm = generate_pcm(minutes, seed, sample_rate)
+    if fmt == 'wav':
+        write_wav(pcm, path, sample_rate)
+        return path
+
+    if fmt not in EXPORT_OPTIONS:
+        raise ValueError(f"不支援的格式: {fmt}")
+    from pydub import AudioSegment
+    buffer = io.BytesIO()
+    write_wav(pcm, buffer, sample_rate)
+    buffer.seek(0)
+    AudioSegment.from_wav(buffer).export(path, **EXPORT_OPTIONS[fmt])
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description='合成類語音音檔')
+    parser.add_argument('--minutes', type=float, default=5, help='音檔長度（分鐘）')
+    parser.add_argument('--format', default='wav', choices=['wav', *EXPORT_OPTIONS], help='輸出格式')
+    parser.add_argument('--seed', type=int, default=42, help='亂數種子')
+    parser.add_argument('--sample-rate', type=int, default=SAMPLE_RATE, help='取樣率')
+    parser.add_argument('--output', required=True, help='輸出路徑')
+    args = parser.parse_args()
+
+    generate_audio_file(args.output, args.minutes, args.format, args.seed, args.sample_rate)
+    print(f"✅ 已產生 {args.minutes} 分鐘 {args.format}: {args.output}")
+
+if __name__ == "__main__":
+    main()
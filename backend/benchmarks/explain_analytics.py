@@ -0,0 +1,148 @@
+# benchmarks/explain_analytics.py
+"""
+分析查詢 EXPLAIN 基準
+
+對 AnalyticsService 的查詢形狀執行 EXPLAIN (ANALYZE, BUFFERS)，比較：
+- before: func.date(timestamp) 過濾（無法使用 timestamp 索引）
+- after:  半開時間區間 [start, end + 1 天) 與新索引
+
+建議在執行 0004 遷移前後各跑一次，輸出存於 benchmarks/results/：
+    python benchmarks/explain_analytics.py --label before-0004
+    python migrate.py
+    python benchmarks/explain_analytics.py --label after-0004
+
+api_usage_logs 分區後，加上 --check-pruning 驗證時間範圍查詢只掃描涵蓋的月分區。
+"""
+
+import os
+import re
+import sys
+import argparse
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+PARTITION_PATTERN = re.compile(r'api_usage_logs_y(\d{4})m(\d{2})')
+
+# 以時間範圍過濾、應該只掃描涵蓋月份分區的查詢
+PRUNABLE_QUERIES = ('traffic_half_open_range (after)', 'endpoint_range')
+
+TRAFFIC_SELECT = """
+    SELECT date(timestamp) AS day, count(*), count(DISTINCT ip),
+           sum(CASE WHEN endpoint = '/backend/transcribe' THEN 1 ELSE 0 END),
+           sum(CASE WHEN success = 'error' THEN 1 ELSE 0 END),
+           avg(processing_time), sum(file_size)
+    FROM social_work.api_usage_logs
+"""
+
+QUERIES = {
+    'traffic_date_function (before)': TRAFFIC_SELECT + """
+    WHERE date(timestamp) >= :start_date AND date(timestamp) <= :end_date
+    GROUP BY date(timestamp) ORDER BY date(timestamp)
+    """,
+    'traffic_half_open_range (after)': TRAFFIC_SELECT + """
+    WHERE timestamp >= :range_start AND timestamp < :range_end
+    GROUP BY date(timestamp) ORDER BY date(timestamp)
+    """,
+    'endpoint_range': """
+    SELECT count(*), avg(processing_time)
+    FROM social_work.api_usage_logs
+    WHERE endpoint = '/backend/transcribe'
+      AND timestamp >= :range_start AND timestamp < :range_end
+    """,
+    'recent_errors': """
+    SELECT * FROM social_work.api_usage_logs
+    WHERE success = 'error'
+    ORDER BY timestamp DESC, id DESC
+    LIMIT 51
+    """,
+    'errors_keyset_page': """
+    SELECT * FROM social_work.api_usage_logs
+    WHERE success = 'error'
+      AND (timestamp, id) < (:range_start, 2147483647)
+    ORDER BY timestamp DESC, id DESC
+    LIMIT 51
+    """,
+    'errors_message_prefix': """
+    SELECT * FROM social_work.api_usage_logs
+    WHERE success = 'error'
+      AND left(error_message, 200) COLLATE "C" >= 'HTTP 5'
+      AND left(error_message, 200) COLLATE "C" < 'HTTP 6'
+    ORDER BY timestamp DESC, id DESC
+    LIMIT 51
+    """,
+    'model_usage': """
+    SELECT model_used, count(*), avg(processing_time)
+    FROM social_work.api_usage_logs
+    WHERE timestamp >= :range_start AND model_used IS NOT NULL
+    GROUP BY model_used
+    """,
+}
+
+def explain(conn, sql: str, params: dict) -> str:
+    rows = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) {sql}"), params)
+    return '\n'.join(row[0] for row in rows)
+
+def scanned_partitions(plan: str) -> set:
+    """從執行計畫中找出實際掃描的月分區"""
+    return {match.group(0) for match in PARTITION_PATTERN.finditer(plan)}
+
+def expected_partitions(start_date: date, end_date: date) -> set:
+    """日期範圍涵蓋的月分區"""
+    names = set()
+    month = start_date.replace(day=1)
+    while month <= end_date:
+        names.add(f"api_usage_logs_y{month.year:04d}m{month.month:02d}")
+        month = (month + timedelta(days=32)).replace(day=1)
+    return names
+
+def main():
+    parser = argparse.ArgumentParser(description='分析查詢 EXPLAIN 基準')
+    parser.add_argument('--label', default='run', help='輸出檔標籤，例如 before-0004')
+    parser.add_argument('--days', type=int, default=7, help='查詢的日期範圍天數')
+    parser.add_argument('--check-pruning', action='store_true', help='驗證分區裁剪')
+    args = parser.parse_args()
+
+    end_date = date.today()
+    start_date = end_date - timedelta(days=args.days - 1)
+    params = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'range_start': datetime.combine(start_date, datetime.min.time()),
+        'range_end': datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+    }
+
+    sections = [f"# EXPLAIN {args.label} @ {datetime.now().isoformat(timespec='seconds')}",
+                f"# 範圍: {start_date} ~ {end_date}"]
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT count(*) FROM social_work.api_usage_logs")).scalar()
+        sections.append(f"# 記錄數: {total}")
+        pruning_failed = False
+        for name, sql in QUERIES.items():
+            print(f"🔍 {name}")
+            plan = explain(conn, sql, params)
+            sections.append(f"\n## {name}\n{plan}")
+
+            if args.check_pruning and name in PRUNABLE_QUERIES:
+                scanned = scanned_partitions(plan)
+                extra = scanned - expected_partitions(start_date, end_date)
+                status = '✅ 已裁剪' if not extra else f'❌ 多掃描 {sorted(extra)}'
+                print(f"   分區: {sorted(scanned)} {status}")
+                sections.append(f"# 分區裁剪: {sorted(scanned)} {status}")
+                pruning_failed = pruning_failed or bool(extra)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, f"explain_analytics_{args.label}.txt")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sections) + '\n')
+    print(f"✅ 已輸出: {output_path}")
+
+    if args.check_pruning and pruning_failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
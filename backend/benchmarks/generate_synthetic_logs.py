@@ -0,0 +1,315 @@
+# benchmarks/generate_synthetic_logs.py
+"""
+大量合成 api_usage_logs 產生器
+
+依固定種子產生接近正式環境分佈的使用記錄，以 COPY 分批寫入，供分析查詢壓測：
+- 日夜週期：上班時段高峰、深夜低谷，週末流量較低
+- 端點組合：轉錄 / 報告 / 處遇計畫串流請求為主，少量統計查詢
+- 錯誤爆發：每天隨機數段 5~30 分鐘的高錯誤率區間
+- 大小分佈：音檔、請求內容、回應位元組與處理時間皆為對數常態分佈
+- 客戶端 IP 為長尾分佈（少數機構貢獻大部分流量）
+
+每天使用獨立的亂數種子 (seed, 日期)，同樣參數重跑會得到相同資料。
+
+用法:
+    python benchmarks/generate_synthetic_logs.py --rows 20000000 --days 180 --seed 42
+    python benchmarks/generate_synthetic_logs.py --rows 100000 --output /tmp/logs.csv  # 不連資料庫
+"""
+
+import io
+import os
+import sys
+import csv
+import math
+import time
+import random
+import argparse
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COPY_COLUMNS = (
+    'timestamp', 'ip', 'endpoint', 'method', 'model_used', 'file_size', 'processing_time',
+    'ttfb_ms', 'bytes_sent', 'final_event_type', 'success', 'error_message', 'data_payload',
+    'user_agent', 'audio_seconds', 'input_tokens', 'output_tokens', 'cached_tokens', 'upstream_ms',
+    'cost_usd',
+)
+
+# 每小時相對流量（台灣上班時段）
+HOUR_WEIGHTS = [
+    0.05, 0.03, 0.02, 0.02, 0.02, 0.04, 0.10, 0.30,
+    0.75, 1.00, 1.00, 0.90, 0.55, 0.80, 1.00, 1.00,
+    0.95, 0.80, 0.45, 0.30, 0.25, 0.20, 0.12, 0.08,
+]
+# 週一 ~ 週日
+WEEKDAY_FACTORS = [1.0, 1.0, 1.0, 1.0, 0.95, 0.35, 0.25]
+
+# 端點: (比例, 方法, 模型, 處理時間中位數 ms, 首位元組中位數 ms, 是否為 SSE)
+ENDPOINTS = {
+    '/backend/transcribe': (0.40, 'POST', 'whisper-1', 45000, 400, True),
+    '/backend/generate-report': (0.35, 'POST', 'claude-4-sonnet-20250514', 25000, 1500, True),
+    '/backend/generate-treatment-plan': (0.15, 'POST', 'claude-4-sonnet-20250514', 20000, 1500, True),
+    '/backend/traffic': (0.06, 'GET', None, 60, 60, False),
+    '/backend/errors': (0.02, 'GET', None, 30, 30, False),
+    '/backend/models': (0.02, 'GET', None, 40, 40, False),
+}
+
+ERROR_MESSAGES = [
+    ('SSE error event', 0.45),
+    ('HTTP 500', 0.15),
+    ('HTTP 502', 0.10),
+    ('Model overloaded', 0.15),
+    ('Timeout error', 0.10),
+    ('Invalid input format', 0.05),
+]
+# 錯誤爆發期間多為上游過載
+BURST_ERROR_MESSAGES = [('Model overloaded', 0.6), ('HTTP 502', 0.25), ('SSE error event', 0.15)]
+
+REPORT_SECTIONS = [
+    '主述議題', '家庭結構', '經濟狀況', '健康狀況', '社會支持', '居住環境',
+    '就業狀況', '風險評估', '需求評估', '處遇建議',
+]
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+]
+
+BASE_ERROR_RATE = 0.02
+BURST_ERROR_RATE = 0.35
+MAX_FILE_SIZE = 100 * 1024 * 1024
+
+def lognormal(rng: random.Random, median: float, sigma: float) -> float:
+    return rng.lognormvariate(math.log(median), sigma)
+
+def build_clients(count: int, seed: int) -> tuple:
+    """長尾分佈的客戶端 IP 與累積權重"""
+    rng = random.Random(f"{seed}:clients")
+    ips = [f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(count)]
+    cum_weights = []
+    total = 0.0
+    for rank in range(count):
+        total += 1 / (rank + 1) ** 1.1
+        cum_weights.append(total)
+    return ips, cum_weights
+
+def allocate_daily_rows(total_rows: int, days: list, seed: int) -> list:
+    """依星期與隨機波動分配每天的筆數，總和等於 total_rows"""
+    rng = random.Random(f"{seed}:days")
+    weights = [WEEKDAY_FACTORS[day.weekday()] * rng.uniform(0.85, 1.15) for day in days]
+    scale = total_rows / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    counts[-1] += total_rows - sum(counts)
+    return counts
+
+def build_bursts(rng: random.Random, day: date) -> list:
+    """當天的錯誤爆發區間 [(開始, 結束)]"""
+    bursts = []
+    for _ in range(rng.choices([0, 1, 2, 3], weights=[0.3, 0.4, 0.2, 0.1])[0]):
+        start = datetime.combine(day, datetime.min.time()) + timedelta(
+            hours=rng.choices(range(24), weights=HOUR_WEIGHTS)[0],
+            minutes=rng.randint(0, 59)
+        )
+        bursts.append((start, start + timedelta(minutes=rng.randint(5, 30))))
+    return bursts
+
+def build_payload_summary(rng: random.Random, request_bytes: int, endpoint: str) -> str:
+    """與 core.utils.payload_policy.summarize_payload 相同格式的摘要"""
+    sections = rng.sample(REPORT_SECTIONS, rng.randint(3, len(REPORT_SECTIONS)))
+    fields = {'text': max(request_bytes // 3, 1), 'selectedSections': len(sections)}
+    if endpoint == '/backend/generate-treatment-plan':
+        fields['reportContent'] = rng.randint(2000, 12000)
+    return (
+        '{"v":1,"sha256":"%064x","bytes":%d,"fields":{%s},"sections":{"selectedSections":[%s]}}' % (
+            rng.getrandbits(256),
+            request_bytes,
+            ','.join(f'"{key}":{value}' for key, value in fields.items()),
+            ','.join(f'"{section}"' for section in sections)
+        )
+    )
+
+def generate_day(day: date, count: int, seed: int, clients: tuple):
+    """產生單日記錄（依時間排序）"""
+    rng = random.Random(f"{seed}:{day.isoformat()}")
+    ips, cum_weights = clients
+    day_start = datetime.combine(day, datetime.min.time())
+
+    hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+    timestamps = sorted(
+        day_start + timedelta(hours=hour, seconds=rng.random() * 3600)
+        for hour in hours
+    )
+    endpoint_names = list(ENDPOINTS)
+    endpoints = rng.choices(endpoint_names, weights=[ENDPOINTS[name][0] for name in endpoint_names], k=count)
+    client_ips = rng.choices(ips, cum_weights=cum_weights, k=count)
+    bursts = build_bursts(rng, day)
+
+    for timestamp, endpoint, ip in zip(timestamps, endpoints, client_ips):
+        _, method, model_used, median_ms, ttfb_median_ms, is_stream = ENDPOINTS[endpoint]
+        in_burst = any(start <= timestamp < end for start, end in bursts)
+        is_error = rng.random() < (BURST_ERROR_RATE if in_burst else BASE_ERROR_RATE)
+
+        processing_time = int(lognormal(rng, median_ms, 0.6))
+        ttfb_ms = min(int(lognormal(rng, ttfb_median_ms, 0.5)), processing_time)
+        if is_error:
+            # 失敗多半較早結束
+            processing_time = int(processing_time * rng.uniform(0.05, 1.0))
+            ttfb_ms = min(ttfb_ms, processing_time)
+            messages = BURST_ERROR_MESSAGES if in_burst else ERROR_MESSAGES
+            error_message = rng.choices([m for m, _ in messages], weights=[w for _, w in messages])[0]
+        else:
+            error_message = None
+
+        file_size = None
+        data_payload = None
+        if endpoint == '/backend/transcribe':
+            file_size = min(int(lognormal(rng, 12 * 1024 * 1024, 0.8)), MAX_FILE_SIZE)
+            bytes_sent = int(processing_time * rng.uniform(0.3, 0.6))
+        elif method == 'POST':
+            file_size = int(lognormal(rng, 20 * 1024, 0.7))
+            data_payload = build_payload_summary(rng, file_size, endpoint)
+            bytes_sent = int(lognormal(rng, 16 * 1024, 0.5))
+        else:
+            bytes_sent = int(lognormal(rng, 2 * 1024, 0.4))
+
+        # 上游用量：失敗請求多半沒有完整回報
+        audio_seconds = input_tokens = output_tokens = cached_tokens = upstream_ms = cost_usd = None
+        if model_used and not is_error:
+            upstream_ms = int(processing_time * rng.uniform(0.7, 0.95))
+            if endpoint == '/backend/transcribe':
+                audio_seconds = round(file_size / (16 * 1024), 3)  # 約 128 kbps
+                cost_usd = round(audio_seconds / 60 * 0.006, 6)
+            else:
+                input_tokens = int(lognormal(rng, 6000, 0.6))
+                output_tokens = int(lognormal(rng, 1800, 0.4))
+                cost_usd = round((input_tokens * 3.0 + output_tokens * 15.0) / 1_000_000, 6)
+
+        if is_stream:
+            final_event_type = 'error' if is_error and error_message == 'SSE error event' else 'complete'
+            if is_error and error_message != 'SSE error event':
+                final_event_type = None
+        else:
+            final_event_type = None
+
+        yield (
+            timestamp.isoformat(sep=' '),
+            ip,
+            endpoint,
+            method,
+            model_used,
+            file_size,
+            processing_time,
+            ttfb_ms,
+            bytes_sent,
+            final_event_type,
+            'error' if is_error else 'success',
+            error_message,
+            data_payload,
+            rng.choice(USER_AGENTS),
+            audio_seconds,
+            input_tokens,
+            output_tokens,
+            cached_tokens,
+            upstream_ms,
+            cost_usd,
+        )
+
+def write_batches(rows, batch_rows: int):
+    """將記錄轉為 CSV 文字批次（空值輸出為未加引號的空字串，COPY 視為 NULL）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_rows:
+            yield buffer.getvalue(), pending
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue(), pending
+
+def prepare_database(days: list, truncate: bool):
+    """建立涵蓋日期的月分區；--truncate 時清空記錄與彙總"""
+    from sqlalchemy import text
+    from core.database import engine
+    from core.services.partition_maintenance import monthly_partition_ddl, month_start, add_months
+
+    with engine.begin() as conn:
+        month = month_start(days[0])
+        while month <= days[-1]:
+            conn.execute(text(monthly_partition_ddl(month)))
+            month = add_months(month, 1)
+
+        if truncate:
+            print("🧹 清空 api_usage_logs 與彙總表")
+            conn.execute(text("TRUNCATE social_work.api_usage_logs"))
+            conn.execute(text("TRUNCATE social_work.daily_api_stats, social_work.hourly_api_stats"))
+            conn.execute(text("DELETE FROM social_work.rollup_watermarks"))
+
+def main():
+    parser = argparse.ArgumentParser(description='大量合成 api_usage_logs 產生器')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='總筆數')
+    parser.add_argument('--days', type=int, default=90, help='涵蓋天數（至 --end-date 為止）')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(), help='最後一天 YYYY-MM-DD')
+    parser.add_argument('--seed', type=int, default=42, help='亂數種子')
+    parser.add_argument('--clients', type=int, default=5000, help='不重複客戶端 IP 數')
+    parser.add_argument('--batch-rows', type=int, default=100_000, help='每次 COPY 的筆數')
+    parser.add_argument('--output', help='寫入 CSV 檔而非資料庫')
+    parser.add_argument('--truncate', action='store_true', help='寫入前清空記錄與彙總表')
+    parser.add_argument('--refresh-rollups', action='store_true', help='寫入後更新彙總表')
+    args = parser.parse_args()
+
+    days = [args.end_date - timedelta(days=offset) for offset in range(args.days - 1, -1, -1)]
+    daily_counts = allocate_daily_rows(args.rows, days, args.seed)
+    clients = build_clients(args.clients, args.seed)
+
+    started = time.perf_counter()
+    written = 0
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            f.write(','.join(COPY_COLUMNS) + '\n')
+            for day, count in zip(days, daily_counts):
+                for chunk, rows in write_batches(generate_day(day, count, args.seed, clients), args.batch_rows):
+                    f.write(chunk)
+                    written += rows
+                print(f"📝 {day.isoformat()}: {count} 筆")
+    else:
+        from sqlalchemy import text
+        from core.database import engine
+
+        prepare_database(days, args.truncate)
+        copy_sql = f"COPY social_work.api_usage_logs ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        raw_connection = engine.raw_connection()
+        try:
+            cursor = raw_connection.cursor()
+            for day, count in zip(days, daily_counts):
+                for chunk, rows in write_batches(generate_day(day, count, args.seed, clients), args.batch_rows):
+                    cursor.copy_expert(copy_sql, io.StringIO(chunk))
+                    written += rows
+                raw_connection.commit()
+                elapsed = time.perf_counter() - started
+                print(f"📥 {day.isoformat()}: {count} 筆（累計 {written}，{written / elapsed:,.0f} 筆/秒）")
+            cursor.close()
+        finally:
+            raw_connection.close()
+
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE social_work.api_usage_logs"))
+
+        if args.refresh_rollups:
+            from core.database import get_db_context
+            from core.services.rollup_service import RollupService
+            print("📊 更新彙總表...")
+            with get_db_context() as db:
+                RollupService(db).refresh()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ 共 {written} 筆，耗時 {elapsed:.1f} 秒（{written / elapsed:,.0f} 筆/秒）")
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ from pydub import AudioSegment
 from pydub.effects import normalize
 import json
 import subprocess
+from core.utils.metrics import AUDIO_PROBE_SECONDS, AUDIO_COMPRESS_SECONDS
+from core.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -66,12 +68,14 @@ class AudioProcessor:
         """異步獲取音頻文件信息"""
         try:
             loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as executor:
+            with span('audio.probe', bytes=os.path.getsize(file_path)) as probe_span, \
+                    AUDIO_PROBE_SECONDS.time(), concurrent.futures.ThreadPoolExecutor() as executor:
                 result = await loop.run_in_executor(
                     executor, 
                     AudioProcessor._get_audio_info_sync, 
                     file_path
                 )
+                probe_span.set_attribute('duration_min', round(result.get('duration_min', 0), 2))
             return result
         except Exception as e:
             logger.error(f"獲取音頻信息失敗: {str(e)}")
@@ -125,7 +129,9 @@ class AudioProcessor:
         """異步壓縮音頻文件"""
         try:
             loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as executor:
+            mode = 'aggressive' if aggressive else 'standard'
+            with span('audio.compress', mode=mode, bytes=os.path.getsize(input_path)) as compress_span, \
+                    AUDIO_COMPRESS_SECONDS.labels(mode=mode).time(), concurrent.futures.ThreadPoolExecutor() as executor:
                 result = await loop.run_in_executor(
                     executor,
                     AudioProcessor._compress_audio_sync,
@@ -133,6 +139,8 @@ class AudioProcessor:
                     output_path,
                     aggressive
                 )
+                if result and os.path.exists(output_path):
+                    compress_span.set_attribute('output_bytes', os.path.getsize(output_path))
             return result
         except Exception as e:
             logger.error(f"異步壓縮音頻失敗: {str(e)}")
@@ -9,6 +9,8 @@ import concurrent.futures
 import logging
 from typing import List
 from pydub import AudioSegment
+from core.utils.metrics import AUDIO_SPLIT_SECONDS
+from core.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -71,8 +73,12 @@ class AudioSplitter:
                 return segments
             
             loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as executor:
+            with span('audio.split', strategy='duration', duration_minutes=round(duration_minutes, 2),
+                      segments=num_segments) as split_span, \
+                    AUDIO_SPLIT_SECONDS.labels(strategy='duration').time(), \
+                    concurrent.futures.ThreadPoolExecutor() as executor:
                 segments = await loop.run_in_executor(executor, split_sync)
+                split_span.set_attribute('bytes', sum(os.path.getsize(path) for path in segments))
             
             logger.info(f"🎉 智能分割完成，生成 {len(segments)} 個分段")
             return segments
@@ -125,13 +131,16 @@ class AudioSplitter:
         """異步按文件大小分割音頻"""
         try:
             loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as executor:
+            with span('audio.split', strategy='size', bytes=os.path.getsize(file_path), max_size=max_size) as split_span, \
+                    AUDIO_SPLIT_SECONDS.labels(strategy='size').time(), \
+                    concurrent.futures.ThreadPoolExecutor() as executor:
                 result = await loop.run_in_executor(
                     executor,
                     AudioSplitter._split_by_size_sync,
                     file_path,
                     max_size
                 )
+                split_span.set_attribute('segments', len(result))
             return result
         except Exception as e:
             logger.error(f"異步分割音頻失敗: {str(e)}")
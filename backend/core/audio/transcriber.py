@@ -4,12 +4,17 @@
 
 import io
 import os
+import time
 import asyncio
 import aiofiles
 import logging
 from typing import Tuple
 from core.utils.retry import simple_retry
 from core.audio.processor import AudioProcessor
+from core.utils.metrics import WHISPER_CHUNK_SECONDS, WHISPER_CHUNK_BYTES
+from core.utils.tracing import span
+from core.utils.usage import record_transcription
+from core.utils.upstream_limits import upstream_slot
 
 logger = logging.getLogger(__name__)
 
@@ -55,13 +60,31 @@ class AudioTranscriber:
                 
                 logger.info(f"📡 發送分段 {chunk_index} 到 OpenAI...")
                 
-                response = await self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_io,
-                    response_format="verbose_json",
-                    language="zh",
-                    timeout=120.0
-                )
+                WHISPER_CHUNK_BYTES.observe(len(audio_data))
+                with span('whisper.request', chunk_index=chunk_index, bytes=len(audio_data),
+                          extra_compressed=processing_path != chunk_path) as request_span:
+                    # 全主機的 Whisper 並發與速率限制（跨 worker 共用）
+                    async with upstream_slot('whisper') as waited:
+                        request_span.set_attribute('limit_wait_seconds', round(waited, 3))
+                        request_started = time.perf_counter()
+                        try:
+                            response = await self.openai_client.audio.transcriptions.create(
+                                model="whisper-1",
+                                file=audio_io,
+                                response_format="verbose_json",
+                                language="zh",
+                                timeout=120.0
+                            )
+                        except Exception:
+                            elapsed = time.perf_counter() - request_started
+                            WHISPER_CHUNK_SECONDS.labels(outcome='error').observe(elapsed)
+                            record_transcription("whisper-1", None, elapsed)
+                            raise
+                elapsed = time.perf_counter() - request_started
+                WHISPER_CHUNK_SECONDS.labels(outcome='success').observe(elapsed)
+                # verbose_json 回報的 duration 即計費秒數
+                record_transcription(getattr(response, 'model', None) or "whisper-1",
+                                     getattr(response, 'duration', None), elapsed)
                 
                 text = response.text
                 logger.info(f"✅ 分段 {chunk_index} 轉換成功，文字長度: {len(text)}")
@@ -87,14 +110,22 @@ class AudioTranscriber:
     
     async def transcribe_chunk_with_retry(self, chunk_path: str, chunk_index: int, max_retries: int = 3) -> Tuple[int, str, str]:
         """帶重試機制的轉錄"""
-        try:
-            return await simple_retry(
-                self.transcribe_chunk,
-                chunk_path,
-                chunk_index,
-                max_retries=max_retries
-            )
-        except Exception as e:
-            error_msg = f"分段 {chunk_index} 所有重試都失敗: {str(e)}"
-            logger.error(error_msg)
-            return chunk_index, "", error_msg
\ No newline at end of file
+        chunk_bytes = os.path.getsize(chunk_path) if os.path.exists(chunk_path) else None
+        with span('whisper.chunk', chunk_index=chunk_index, bytes=chunk_bytes) as chunk_span:
+            try:
+                result = await simple_retry(
+                    self.transcribe_chunk,
+                    chunk_path,
+                    chunk_index,
+                    max_retries=max_retries
+                )
+            except Exception as e:
+                error_msg = f"分段 {chunk_index} 所有重試都失敗: {str(e)}"
+                logger.error(error_msg)
+                result = chunk_index, "", error_msg
+
+            if result[2]:
+                chunk_span.set_error(result[2])
+            else:
+                chunk_span.set_attribute('characters', len(result[1]))
+            return result
\ No newline at end of file
@@ -4,10 +4,13 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
-from contextlib import contextmanager
+import time
+from contextlib import contextmanager, asynccontextmanager
 import logging
+from core.utils.metrics import DB_POOL_CHECKOUT_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -17,17 +20,83 @@ DATABASE_URL = os.getenv(
     'postgresql://yining_juan@127.0.0.1:5432/social_work_logs_db'
 )
 
+def to_async_url(url: str) -> str:
+    """將同步連線字串轉為對應的 async driver（asyncpg / aiosqlite）"""
+    if url.startswith('postgresql+psycopg2://'):
+        return url.replace('postgresql+psycopg2://', 'postgresql+asyncpg://', 1)
+    if url.startswith('postgresql://'):
+        return url.replace('postgresql://', 'postgresql+asyncpg://', 1)
+    if url.startswith('sqlite://'):
+        return url.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', to_async_url(DATABASE_URL))
+
+# 連線池大小：run.py 以 WEB_CONCURRENCY（預設 4）個 worker 執行，
+# 每個 worker 各有一組同步與非同步連線池，總和需低於 PostgreSQL max_connections
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 4))
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 80))
+
+_worker_budget = max(4, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+# 同步連線只用於背景維護任務與遷移
+SYNC_POOL_SIZE = max(1, _worker_budget // 5)
+SYNC_MAX_OVERFLOW = 1
+# 其餘連線給分析查詢與 API 記錄
+ASYNC_POOL_SIZE = max(2, (_worker_budget - SYNC_POOL_SIZE - SYNC_MAX_OVERFLOW) * 2 // 3)
+ASYNC_MAX_OVERFLOW = max(0, _worker_budget - SYNC_POOL_SIZE - SYNC_MAX_OVERFLOW - ASYNC_POOL_SIZE)
+
+class TimedQueuePool(QueuePool):
+    """記錄取得連線等待時間的同步連線池"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool='sync').observe(time.perf_counter() - started)
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """記錄取得連線等待時間的非同步連線池"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool='async').observe(time.perf_counter() - started)
+
+def _pool_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    """SQLite（本機測試）使用預設連線池，不套用大小設定"""
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': 3600,
+        'pool_pre_ping': True,
+    }
+
 engine = create_engine(
     DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=10,
-    pool_recycle=3600,
-    pool_pre_ping=True,
-    max_overflow=5
+    **({} if DATABASE_URL.startswith('sqlite') else {'poolclass': TimedQueuePool}),
+    **_pool_options(DATABASE_URL, SYNC_POOL_SIZE, SYNC_MAX_OVERFLOW)
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **({} if ASYNC_DATABASE_URL.startswith('sqlite') else {'poolclass': TimedAsyncQueuePool}),
+    **_pool_options(ASYNC_DATABASE_URL, ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 def get_db() -> Session:
     """獲取數據庫會話"""
     db = SessionLocal()
@@ -49,8 +118,26 @@ def get_db_context():
     finally:
         db.close()
 
+async def get_async_db() -> AsyncSession:
+    """獲取非同步數據庫會話（FastAPI 依賴）"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@asynccontextmanager
+async def get_async_db_context():
+    """用於非依賴注入場景的非同步數據庫會話"""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
 # 創建表格
 def create_tables():
     """創建所有表格"""
     from models.api_usage_log import Base
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    import models.api_usage_payload  # noqa: F401 註冊旁表
+    import models.daily_api_stats  # noqa: F401 註冊彙總表
+    Base.metadata.create_all(bind=engine)
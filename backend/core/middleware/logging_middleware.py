@@ -3,64 +3,84 @@
 # ================================
 
 import time
-import json
 import ipaddress
-from fastapi import Request
 from sqlalchemy.exc import SQLAlchemyError
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
 from models.api_usage_log import ApiUsageLog
-from core.database import get_db_context
+from models.api_usage_payload import ApiUsagePayload
+from core.database import get_async_db_context
+from core.utils.payload_policy import summarize_payload, compress_payload
+from core.utils.json_codec import loads as json_loads, get_cached_request_json
+from core.utils.usage import begin_usage
+from core.utils.sse import SSEEventTracker
 import logging
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-class ApiLoggingMiddleware(BaseHTTPMiddleware):
-    """API 使用記錄中間件"""
-    
-    def __init__(self, app):
-        super().__init__(app)
+class ApiLoggingMiddleware:
+    """API 使用記錄中間件（純 ASGI 實作）
+
+    直接包裝 receive / send，不預先緩衝請求內容，
+    並在串流回應真正結束後才記錄處理時間：
+    - ttfb_ms: 從收到請求到送出第一個回應內容位元組
+    - processing_time: 從收到請求到回應串流結束
+    - bytes_sent: 回應內容總位元組數
+    - final_event_type: SSE 串流最後一個事件的類型
+    - model_used / audio_seconds / *_tokens / upstream_ms / cost_usd:
+      轉錄與生成流程回報的實際上游用量（core.utils.usage）
+
+    data_payload 只記錄請求摘要（欄位大小、章節列表、內容雜湊）；
+    store_full_payloads 開啟時，完整內容壓縮後另存於 api_usage_payloads。
+    """
+
+    def __init__(self, app: ASGIApp, store_full_payloads: bool = False, max_section_items: int = 50):
+        self.app = app
+        self.store_full_payloads = store_full_payloads
+        self.max_section_items = max_section_items
         self.excluded_paths = {
             '/docs',
-            '/redoc', 
+            '/redoc',
             '/openapi.json',
             '/favicon.ico',
             '/health',  # 健康檢查不記錄
+            '/metrics',  # Prometheus 抓取不記錄
         }
         self.excluded_prefixes = ('/assets/', '/static/', '/css/', '/js/')
-    
+
     def should_log(self, path: str) -> bool:
         """判斷是否需要記錄此請求"""
         if path in self.excluded_paths:
             return False
-        
+
         if any(path.startswith(prefix) for prefix in self.excluded_prefixes):
             return False
-            
+
         return True
-    
-    def get_client_ip(self, request: Request) -> str:
+
+    def get_client_ip(self, headers: Headers, scope: Scope) -> str:
         """獲取客戶端真實IP"""
         # 檢查各種可能的 IP 頭
         possible_headers = [
             'x-forwarded-for',
-            'x-real-ip', 
+            'x-real-ip',
             'x-client-ip',
             'cf-connecting-ip'  # Cloudflare
         ]
-        
+
         for header in possible_headers:
-            ip_str = request.headers.get(header)
+            ip_str = headers.get(header)
             if ip_str:
                 # X-Forwarded-For 可能包含多個 IP，取第一個
                 candidate = ip_str.split(',')[0].strip()
                 if self.validate_ip(candidate):
                     return candidate
-        
-        # 如果沒有找到，使用 client.host
-        return request.client.host if request.client else "unknown"
-    
+
+        # 如果沒有找到，使用 ASGI scope 中的 client
+        client = scope.get('client')
+        return client[0] if client else "unknown"
+
     def validate_ip(self, ip_str: str) -> bool:
         """驗證 IP 地址格式"""
         try:
@@ -68,110 +88,188 @@ class ApiLoggingMiddleware(BaseHTTPMiddleware):
             return True
         except ValueError:
             return False
-    
+
     def extract_model_info(self, path: str, request_data: dict = None) -> str:
-        """從請求中提取模型信息"""
+        """端點預設模型（上游呼叫未回報實際模型時使用，例如請求在呼叫前就失敗）"""
         if path == '/backend/transcribe':
             return 'whisper-1'
         elif path == '/backend/generate-report':
-            return 'claude-3-sonnet'
+            return 'claude-4-sonnet-20250514'
         elif path == '/backend/generate-treatment-plan':
-            return 'claude-3-sonnet'
+            return 'claude-4-sonnet-20250514'
         return None
-    
-    def get_file_size(self, request: Request) -> int:
+
+    def get_file_size(self, headers: Headers) -> int:
         """獲取上傳文件大小"""
-        content_length = request.headers.get('content-length')
+        content_length = headers.get('content-length')
         if content_length:
             try:
                 return int(content_length)
             except ValueError:
                 pass
         return None
-    
-    async def dispatch(self, request: Request, call_next) -> Response:
+
+    def parse_request_data(self, scope: Scope, body_parts: list) -> dict:
+        """取得請求 JSON：優先使用端點已解析的結果，避免重複解析"""
+        found, request_data = get_cached_request_json(scope)
+        if found:
+            return request_data
+        if not body_parts:
+            return None
+        try:
+            return json_loads(b''.join(body_parts))
+        except Exception:
+            return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """處理請求並記錄"""
-        path = request.url.path
-        
-        if not self.should_log(path):
-            return await call_next(request)
-        
+        if scope['type'] != 'http' or not self.should_log(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path']
+
         # 記錄開始時間
-        start_time = time.time()
-        
+        start_time = time.perf_counter()
+        started_at = datetime.now()  # 請求開始的牆鐘時間，串流結束才寫入記錄
+
         # 獲取請求信息
-        ip = self.get_client_ip(request)
-        user_agent = request.headers.get('user-agent', '')
-        method = request.method
-        file_size = self.get_file_size(request)
-        
-        # 嘗試獲取請求數據
-        request_data = None
-        if method == 'POST' and 'multipart/form-data' not in request.headers.get('content-type', ''):
-            try:
-                body = await request.body()
-                if body:
-                    request_data = json.loads(body.decode())
-            except Exception:
-                pass
-        
-        # 提取模型信息
-        model_used = self.extract_model_info(path, request_data)
-        
+        headers = Headers(scope=scope)
+        ip = self.get_client_ip(headers, scope)
+        user_agent = headers.get('user-agent', '')
+        method = scope['method']
+        file_size = self.get_file_size(headers)
+        # 端點建立背景工作時以 request.state.client_ip 記錄來源，與本記錄一致
+        scope.setdefault('state', {})['client_ip'] = ip
+
+        # 只在端點讀取請求內容時順帶記錄，不額外預讀
+        capture_body = method == 'POST' and 'multipart/form-data' not in headers.get('content-type', '')
+        body_parts = []
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if capture_body and message['type'] == 'http.request':
+                chunk = message.get('body', b'')
+                if chunk:
+                    body_parts.append(chunk)
+            return message
+
+        # 回應統計
+        response_state = {
+            'status_code': None,
+            'is_event_stream': False,
+            'first_byte_time': None,
+            'bytes_sent': 0,
+        }
+        sse_tracker = SSEEventTracker()
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                response_state['status_code'] = message['status']
+                content_type = Headers(raw=message.get('headers', [])).get('content-type', '')
+                response_state['is_event_stream'] = content_type.startswith('text/event-stream')
+            elif message['type'] == 'http.response.body':
+                chunk = message.get('body', b'')
+                if chunk:
+                    if response_state['first_byte_time'] is None:
+                        response_state['first_byte_time'] = time.perf_counter()
+                    response_state['bytes_sent'] += len(chunk)
+                    if response_state['is_event_stream']:
+                        sse_tracker.feed(chunk)
+            await send(message)
+
+        # 上游用量由轉錄 / 生成流程累加到此物件
+        usage = begin_usage()
+
         # 處理請求
         success = 'success'
         error_message = None
-        response = None
         exception_to_raise = None
-        
+
         try:
-            response = await call_next(request)
-            
-            # 根據狀態碼判斷是否成功
-            if response.status_code >= 400:
-                success = 'error'
-                error_message = f"HTTP {response.status_code}"
-                
+            await self.app(scope, receive_wrapper, send_wrapper)
         except Exception as e:
             success = 'error'
             error_message = str(e)
             exception_to_raise = e  # 記住要拋出的異常
-        
-        # 計算處理時間
-        processing_time = int((time.time() - start_time) * 1000)
-        
-        # 異步記錄到數據庫 - 無論成功或失敗都要記錄
+
+        # 串流結束後才計算處理時間
+        end_time = time.perf_counter()
+        processing_time = int((end_time - start_time) * 1000)
+        ttfb_ms = None
+        if response_state['first_byte_time'] is not None:
+            ttfb_ms = int((response_state['first_byte_time'] - start_time) * 1000)
+
+        # 根據狀態碼與 SSE 最終事件判斷是否成功
+        status_code = response_state['status_code']
+        if exception_to_raise is None:
+            if status_code is not None and status_code >= 400:
+                success = 'error'
+                error_message = f"HTTP {status_code}"
+            elif sse_tracker.final_event_type == 'error':
+                success = 'error'
+                error_message = "SSE error event"
+
+        request_data = self.parse_request_data(scope, body_parts)
+
+        # 優先使用上游回報的實際模型；交給背景工作的請求由工作記錄模型與用量
+        model_used = usage.model
+        if model_used is None and usage.job_id is None:
+            model_used = self.extract_model_info(path, request_data)
+
+        # 記錄到數據庫 - 無論成功或失敗都要記錄
         try:
             await self.log_to_database(
-                timestamp=datetime.fromtimestamp(time.time()),
+                timestamp=started_at,
                 ip=ip,
                 endpoint=path,
                 method=method,
                 model_used=model_used,
                 file_size=file_size,
                 processing_time=processing_time,
+                ttfb_ms=ttfb_ms,
+                bytes_sent=response_state['bytes_sent'],
+                final_event_type=sse_tracker.final_event_type,
                 success=success,
                 error_message=error_message,
                 data_payload=request_data,
-                user_agent=user_agent
+                user_agent=user_agent,
+                **usage.to_columns()
             )
         except Exception as log_error:
             logger.error(f"記錄 API 使用失敗: {log_error}")
-        
+
         # 如果有異常需要拋出，現在才拋出
         if exception_to_raise:
             raise exception_to_raise
-        
-        return response
-    
-    async def log_to_database(self, **kwargs):
+
+    async def log_to_database(self, data_payload=None, **kwargs):
         """異步記錄到數據庫"""
         try:
-            with get_db_context() as db:
-                log_entry = ApiUsageLog(**kwargs)
+            summary = summarize_payload(data_payload, self.max_section_items)
+            async with get_async_db_context() as db:
+                log_entry = ApiUsageLog(data_payload=summary, **kwargs)
                 db.add(log_entry)
+
+                if self.store_full_payloads and data_payload is not None:
+                    await db.flush()  # 取得 log_entry.id
+                    blob, original_size = compress_payload(data_payload)
+                    db.add(ApiUsagePayload(
+                        log_id=log_entry.id,
+                        content_hash=summary['sha256'],
+                        original_size=original_size,
+                        payload=blob
+                    ))
                 # commit 在 context manager 中自動處理
         except SQLAlchemyError as e:
             logger.error(f"數據庫記錄錯誤: {e}")
         except Exception as e:
             logger.error(f"記錄 API 使用時發生未知錯誤: {e}")
+
+async def log_job_usage(columns: dict):
+    """寫入背景工作的使用記錄（JobRunner 在工作結束時呼叫，欄位見 JobRunner._record_usage）"""
+    try:
+        async with get_async_db_context() as db:
+            db.add(ApiUsageLog(**columns))
+    except SQLAlchemyError as e:
+        logger.error(f"數據庫記錄錯誤: {e}")
@@ -2,24 +2,220 @@
 # 4. 統計查詢服務 - core/services/analytics_service.py
 # ================================
 
-from datetime import datetime, timedelta, date
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from datetime import datetime, timedelta, date, time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, select, tuple_
 from models.api_usage_log import ApiUsageLog
-from typing import List, Dict, Any
+from models.daily_api_stats import DailyApiStats, HourlyApiStats, RollupWatermark
+from core.services.rollup_service import RollupService
+from core.services.columnar_store import ColumnarStore, get_columnar_store
+from core.utils.latency_sketch import LatencySketch
+from core.utils.hyperloglog import HyperLogLog
+from core.utils.usage import JOB_USAGE_METHOD
+from core.utils.sql_functions import truncate_timestamp, latency_bucket_index, byte_order_prefix
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import base64
+import asyncio
+from types import SimpleNamespace
+
+BUCKET_GRANULARITIES = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+BUCKET_DIMENSIONS = ('endpoint', 'model_used', 'success')
+
+def truncate_to_bucket(moment: datetime, granularity: str) -> datetime:
+    """將時間向下取整到分鐘 / 小時 / 日"""
+    if granularity == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return datetime.combine(moment.date(), time.min)
+
+# 錯誤訊息前綴索引只涵蓋前 N 個字元，避免過長訊息超出 btree 索引列大小
+ERROR_PREFIX_INDEX_CHARS = 200
+
+def encode_error_cursor(timestamp: datetime, log_id: int) -> str:
+    """將 (timestamp, id) 編碼為不透明的分頁游標"""
+    raw = f"{timestamp.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_error_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析分頁游標，格式錯誤時拋出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp_str, log_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(timestamp_str), int(log_id)
+    except Exception:
+        raise ValueError("無效的分頁游標")
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """前綴範圍的上界（不含），即最後一個字元加一"""
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+# 用量彙總欄位，順序與 ColumnarStore.USAGE_AGGREGATES 相同
+USAGE_TOTAL_FIELDS = (
+    'usage_count', 'total_time', 'timed_count', 'input_tokens', 'output_tokens',
+    'cached_tokens', 'audio_seconds', 'cost_usd', 'generation_ms',
+)
+
+def usage_aggregates() -> tuple:
+    """USAGE_TOTAL_FIELDS 對應的 SQL 聚合欄位"""
+    return (
+        func.count().label('usage_count'),
+        func.coalesce(func.sum(ApiUsageLog.processing_time), 0).label('total_time'),
+        func.count(ApiUsageLog.processing_time).label('timed_count'),
+        func.coalesce(func.sum(ApiUsageLog.input_tokens), 0).label('input_tokens'),
+        func.coalesce(func.sum(ApiUsageLog.output_tokens), 0).label('output_tokens'),
+        func.coalesce(func.sum(ApiUsageLog.cached_tokens), 0).label('cached_tokens'),
+        func.coalesce(func.sum(ApiUsageLog.audio_seconds), 0).label('audio_seconds'),
+        func.coalesce(func.sum(ApiUsageLog.cost_usd), 0).label('cost_usd'),
+        # 只計入有輸出 token 的上游時間，作為 tokens/sec 的分母
+        func.coalesce(
+            func.sum(ApiUsageLog.upstream_ms).filter(ApiUsageLog.output_tokens.isnot(None)), 0
+        ).label('generation_ms'),
+    )
+
+def add_usage_totals(totals: List[float], values: Sequence) -> List[float]:
+    for i, value in enumerate(values):
+        totals[i] += float(value or 0)
+    return totals
+
+def summarize_usage(totals: Sequence) -> Dict[str, Any]:
+    """將 USAGE_TOTAL_FIELDS 總和轉為 API 輸出（tokens/sec 含首 token 等待時間）"""
+    values = dict(zip(USAGE_TOTAL_FIELDS, totals))
+    generation_seconds = values['generation_ms'] / 1000
+    return {
+        "usage_count": int(values['usage_count']),
+        "avg_processing_time": round(
+            values['total_time'] / values['timed_count'] if values['timed_count'] else 0, 2
+        ),
+        "input_tokens": int(values['input_tokens']),
+        "output_tokens": int(values['output_tokens']),
+        "cached_tokens": int(values['cached_tokens']),
+        "audio_seconds": round(values['audio_seconds'], 1),
+        "cost_usd": round(values['cost_usd'], 4),
+        "output_tokens_per_second": (
+            round(values['output_tokens'] / generation_seconds, 2) if generation_seconds else None
+        ),
+    }
+
+class BucketAccumulator:
+    """單一 (時間桶, 分組) 的累計值"""
+
+    __slots__ = ('request_count', 'error_count', 'total_processing_time',
+                 'processing_time_count', 'total_file_size', 'sketch')
+
+    def __init__(self):
+        self.request_count = 0
+        self.error_count = 0
+        self.total_processing_time = 0
+        self.processing_time_count = 0
+        self.total_file_size = 0
+        self.sketch = LatencySketch()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_count": self.request_count,
+            "error_count": self.error_count,
+            "avg_processing_time": round(
+                self.total_processing_time / self.processing_time_count, 2
+            ) if self.processing_time_count else 0,
+            "total_file_size": self.total_file_size,
+            "latency_percentiles": self.sketch.percentiles()
+        }
 
 class AnalyticsService:
-    """API 使用分析服務"""
+    """API 使用分析服務
+
+    啟用列式歷史資料庫時，已歸檔日期的原始記錄查詢改由 DuckDB 讀取 Parquet，
+    PostgreSQL 只需處理最近的熱資料。
+    """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, columnar_store: Optional[ColumnarStore] = None):
         self.db = db
+        self.columnar_store = columnar_store or get_columnar_store()
+
+    async def _get_cold_range(self, range_start: datetime, range_end: datetime) -> Optional[tuple]:
+        """查詢範圍中可由歸檔回答的部分；未啟用或未歸檔則為 None"""
+        if self.columnar_store is None:
+            return None
+        return await asyncio.to_thread(self.columnar_store.cold_range, range_start, range_end)
     
-    def get_traffic_stats(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
-        """獲取指定日期範圍的流量統計"""
-        
-        # 查詢數據
-        rows = self.db.query(
-            func.date(ApiUsageLog.timestamp).label('day'),
+    async def get_traffic_stats(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        """獲取指定日期範圍的流量統計
+
+        已彙總完成的日期讀取 daily_api_stats，只有尚未彙總的日期（通常是今天）
+        才查詢原始記錄。每日各端點的延遲分位數由 hourly_api_stats 的草圖合併而得。
+        """
+        data_map = {}
+
+        # 彙總涵蓋之前的日期才是完整的
+        covered_until = await self._get_covered_until()
+        raw_start = start_date
+        if covered_until is not None:
+            raw_start = max(start_date, covered_until.date())
+
+        if raw_start > start_date:
+            rollups = (await self.db.execute(
+                select(DailyApiStats).where(
+                    DailyApiStats.day >= start_date,
+                    DailyApiStats.day < raw_start,
+                    DailyApiStats.day <= end_date
+                )
+            )).scalars().all()
+            for rollup in rollups:
+                data_map[rollup.day] = self._build_day_stats(
+                    total_requests=rollup.total_requests,
+                    distinct_ips=rollup.distinct_ips,
+                    transcribe_count=rollup.transcribe_count,
+                    report_count=rollup.report_count,
+                    treatment_count=rollup.treatment_count,
+                    error_count=rollup.error_count,
+                    avg_processing_time=(
+                        rollup.total_processing_time / rollup.processing_time_count
+                        if rollup.processing_time_count else 0
+                    ),
+                    total_file_size=rollup.total_file_size
+                )
+
+        if raw_start <= end_date:
+            data_map.update(await self._get_raw_traffic_stats(raw_start, end_date))
+
+        # 各日、各端點的延遲分位數
+        latency_map = {}
+        range_start, range_end = self._datetime_range(start_date, end_date)
+        sketches = await self._get_latency_sketches('endpoint', range_start, range_end, covered_until, by_day=True)
+        for (day, endpoint), sketch in sketches.items():
+            latency_map.setdefault(day, {})[endpoint] = sketch.percentiles()
+
+        # 填充缺失的日期
+        result = []
+        current_day = start_date
+        while current_day <= end_date:
+            if current_day in data_map:
+                stats = data_map[current_day]
+            else:
+                stats = self._build_day_stats()
+
+            result.append({
+                "date": current_day.strftime("%Y-%m-%d"),
+                **stats,
+                "latency_percentiles": latency_map.get(current_day, {})
+            })
+            current_day += timedelta(days=1)
+
+        return result
+
+    async def _get_raw_traffic_stats(self, start_date: date, end_date: date) -> Dict[date, Dict[str, Any]]:
+        """從原始記錄計算流量統計（與 daily_api_stats 相同，不含背景工作的用量記錄）"""
+        day_column = truncate_timestamp('day', ApiUsageLog.timestamp).label('day')
+        rows = (await self.db.execute(select(
+            day_column,
             func.count().label('total_requests'),
             func.count(func.distinct(ApiUsageLog.ip)).label('distinct_ips'),
             func.sum(
@@ -48,100 +244,534 @@ class AnalyticsService:
             ).label('error_count'),
             func.avg(ApiUsageLog.processing_time).label('avg_processing_time'),
             func.sum(ApiUsageLog.file_size).label('total_file_size')
-        ).filter(
-            func.date(ApiUsageLog.timestamp) >= start_date,
-            func.date(ApiUsageLog.timestamp) <= end_date
+        ).where(
+            *self._timestamp_range(start_date, end_date),
+            ApiUsageLog.method != JOB_USAGE_METHOD
         ).group_by(
-            func.date(ApiUsageLog.timestamp)
+            day_column
         ).order_by(
-            func.date(ApiUsageLog.timestamp)
-        ).all()
-        
+            day_column
+        ))).all()
+
         # 建立數據映射
         data_map = {}
         for row in rows:
-            data_map[row.day] = {
-                "total_requests": row.total_requests or 0,
-                "distinct_ips": row.distinct_ips or 0,
-                "transcribe_count": row.transcribe_count or 0,
-                "report_count": row.report_count or 0,
-                "treatment_count": row.treatment_count or 0,
-                "error_count": row.error_count or 0,
-                "success_rate": round(
-                    ((row.total_requests - (row.error_count or 0)) / row.total_requests * 100) 
-                    if row.total_requests > 0 else 0, 2
-                ),
-                "avg_processing_time": round(row.avg_processing_time or 0, 2),
-                "total_file_size": row.total_file_size or 0
-            }
+            data_map[row.day.date()] = self._build_day_stats(
+                total_requests=row.total_requests or 0,
+                distinct_ips=row.distinct_ips or 0,
+                transcribe_count=row.transcribe_count or 0,
+                report_count=row.report_count or 0,
+                treatment_count=row.treatment_count or 0,
+                error_count=row.error_count or 0,
+                avg_processing_time=row.avg_processing_time or 0,
+                total_file_size=row.total_file_size or 0
+            )
+        return data_map
 
-        
-        # 填充缺失的日期
-        result = []
-        current_day = start_date
-        while current_day <= end_date:
-            if current_day in data_map:
-                stats = data_map[current_day]
+    async def _get_covered_until(self) -> Optional[datetime]:
+        """彙總表涵蓋到的時間點；尚未彙總過則為 None"""
+        watermark = await self.db.get(RollupWatermark, RollupService.ROLLUP_NAME)
+        return watermark.covered_until if watermark else None
+
+    async def _get_latency_sketches(
+        self,
+        column: str,
+        range_start: datetime,
+        range_end: datetime,
+        covered_until: Optional[datetime],
+        by_day: bool = False,
+        include_jobs: bool = False
+    ) -> Dict[Any, LatencySketch]:
+        """
+        依欄位（endpoint / model_used）合併延遲草圖
+
+        彙總涵蓋的整點小時直接合併 hourly_api_stats 的草圖，
+        其後尚未彙總的部分（全新安裝或水位重設時可能是整個範圍）在資料庫中
+        依草圖桶索引分組計數。by_day 時鍵為 (日期, 欄位值)。
+
+        與彙總表相同，預設不含背景工作的用量記錄；include_jobs 時改為整個範圍
+        都由原始記錄計數（彙總表不含這些記錄），供模型延遲使用。
+        """
+        split = range_start
+        if covered_until is not None and not include_jobs:
+            covered_hour = covered_until.replace(minute=0, second=0, microsecond=0)
+            split = min(max(range_start, covered_hour), range_end)
+
+        sketches: Dict[Any, LatencySketch] = {}
+
+        def sketch_for(moment: datetime, value) -> LatencySketch:
+            key = (moment.date(), value) if by_day else value
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = LatencySketch()
+            return sketch
+
+        if split > range_start:
+            group_column = getattr(HourlyApiStats, column)
+            rows = (await self.db.execute(
+                select(
+                    HourlyApiStats.bucket_start,
+                    group_column.label('value'),
+                    HourlyApiStats.latency_sketch
+                ).where(
+                    HourlyApiStats.bucket_start >= range_start,
+                    HourlyApiStats.bucket_start < split,
+                    group_column.isnot(None)
+                )
+            )).all()
+            for row in rows:
+                if row.latency_sketch:
+                    sketch_for(row.bucket_start, row.value).merge(LatencySketch.from_dict(row.latency_sketch))
+
+        if split < range_end:
+            # 尚未彙總的部分由資料庫依桶索引計數，每個 (日期, 欄位值, 桶) 只傳回一列
+            group_column = getattr(ApiUsageLog, column)
+            bucket_index = latency_bucket_index(ApiUsageLog.processing_time).label('bucket_index')
+            day_column = truncate_timestamp('day', ApiUsageLog.timestamp).label('day')
+            value_column = group_column.label('value')
+            keys = (day_column, value_column) if by_day else (value_column,)
+            conditions = [
+                ApiUsageLog.timestamp >= split,
+                ApiUsageLog.timestamp < range_end,
+                group_column.isnot(None),
+                ApiUsageLog.processing_time.isnot(None)
+            ]
+            if not include_jobs:
+                conditions.append(ApiUsageLog.method != JOB_USAGE_METHOD)
+            rows = (await self.db.execute(
+                select(
+                    *keys,
+                    bucket_index,
+                    func.count().label('bucket_count')
+                ).where(*conditions).group_by(*keys, bucket_index)
+            )).all()
+            for row in rows:
+                moment = row.day if by_day else range_start
+                sketch_for(moment, row.value).add_bucket(row.bucket_index, row.bucket_count)
+
+        return sketches
+
+    @staticmethod
+    def _datetime_range(start_date: date, end_date: date) -> tuple:
+        """日期範圍轉為半開區間 [start, end + 1 天)"""
+        return (
+            datetime.combine(start_date, time.min),
+            datetime.combine(end_date + timedelta(days=1), time.min)
+        )
+
+    @classmethod
+    def _timestamp_range(cls, start_date: date, end_date: date) -> tuple:
+        """日期範圍轉為半開區間過濾條件，讓 timestamp 索引可用"""
+        range_start, range_end = cls._datetime_range(start_date, end_date)
+        return (
+            ApiUsageLog.timestamp >= range_start,
+            ApiUsageLog.timestamp < range_end
+        )
+
+    @staticmethod
+    def _build_day_stats(
+        total_requests: int = 0,
+        distinct_ips: int = 0,
+        transcribe_count: int = 0,
+        report_count: int = 0,
+        treatment_count: int = 0,
+        error_count: int = 0,
+        avg_processing_time: float = 0,
+        total_file_size: int = 0
+    ) -> Dict[str, Any]:
+        """組裝單日統計"""
+        return {
+            "total_requests": total_requests,
+            "distinct_ips": distinct_ips,
+            "transcribe_count": transcribe_count,
+            "report_count": report_count,
+            "treatment_count": treatment_count,
+            "error_count": error_count,
+            "success_rate": round(
+                ((total_requests - error_count) / total_requests * 100)
+                if total_requests > 0 else 0, 2
+            ),
+            "avg_processing_time": round(float(avg_processing_time or 0), 2),
+            "total_file_size": int(total_file_size or 0)
+        }
+
+    async def get_unique_clients(self, start_date: date, end_date: date, exact: bool = False) -> Dict[str, Any]:
+        """
+        估計日期範圍內的不重複客戶端 IP 數
+
+        預設合併每日 HyperLogLog 草圖（相對標準誤差約 0.81%），尚未彙總的日期
+        由原始記錄補上；exact=True 時改以 COUNT(DISTINCT ip) 精確計算，供稽核使用。
+        """
+        range_start, range_end = self._datetime_range(start_date, end_date)
+        result = {
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+        }
+
+        if exact:
+            cold_range = await self._get_cold_range(range_start, range_end)
+            if cold_range is None:
+                count = (await self.db.execute(
+                    select(func.count(func.distinct(ApiUsageLog.ip))).where(
+                        *self._timestamp_range(start_date, end_date),
+                        ApiUsageLog.method != JOB_USAGE_METHOD
+                    )
+                )).scalar() or 0
             else:
-                stats = {
-                    "total_requests": 0,
-                    "distinct_ips": 0,
-                    "transcribe_count": 0,
-                    "report_count": 0,
-                    "treatment_count": 0,
-                    "error_count": 0,
-                    "success_rate": 0,
-                    "avg_processing_time": 0,
-                    "total_file_size": 0
-                }
-            
-            result.append({
-                "date": current_day.strftime("%Y-%m-%d"),
-                **stats
-            })
-            current_day += timedelta(days=1)
-        
+                # 歸檔部分與熱資料部分的 IP 集合取聯集
+                ips = await asyncio.to_thread(self.columnar_store.distinct_ips, *cold_range)
+                if cold_range[1] < range_end:
+                    ips.update((await self.db.execute(
+                        select(ApiUsageLog.ip).where(
+                            ApiUsageLog.timestamp >= cold_range[1],
+                            ApiUsageLog.timestamp < range_end,
+                            ApiUsageLog.method != JOB_USAGE_METHOD
+                        ).distinct()
+                    )).scalars().all())
+                count = len(ips)
+            result.update(unique_clients=count, method="exact", relative_standard_error=0.0)
+            return result
+
+        hll = HyperLogLog()
+        covered_until = await self._get_covered_until()
+        raw_start = range_start
+        if covered_until is not None:
+            raw_start = min(max(range_start, datetime.combine(covered_until.date(), time.min)), range_end)
+
+        if raw_start > range_start:
+            sketches = (await self.db.execute(
+                select(DailyApiStats.ip_hll).where(
+                    DailyApiStats.day >= start_date,
+                    DailyApiStats.day < raw_start.date(),
+                    DailyApiStats.ip_hll.isnot(None)
+                )
+            )).scalars().all()
+            for sketch in sketches:
+                hll.merge(HyperLogLog.from_bytes(sketch))
+
+        if raw_start < range_end:
+            ips = (await self.db.execute(
+                select(ApiUsageLog.ip).where(
+                    ApiUsageLog.timestamp >= raw_start,
+                    ApiUsageLog.timestamp < range_end,
+                    ApiUsageLog.method != JOB_USAGE_METHOD
+                ).distinct()
+            )).scalars().all()
+            hll.add_all(ips)
+
+        result.update(
+            unique_clients=hll.estimate(),
+            method="hyperloglog",
+            relative_standard_error=round(hll.standard_error, 4)
+        )
         return result
+
+    async def get_bucketed_stats(
+        self,
+        range_start: datetime,
+        range_end: datetime,
+        granularity: str = 'hour',
+        group_by: Sequence[str] = (),
+        max_rows: int = 5000
+    ) -> Dict[str, Any]:
+        """
+        依分鐘 / 小時 / 日分桶並按任意維度分組的統計
+
+        小時與日粒度優先合併 hourly_api_stats，彙總尚未涵蓋的部分與分鐘粒度
+        才查詢原始記錄，並在資料庫中以 GROUP BY 聚合。與彙總表相同，
+        不含背景工作的用量記錄。
+        時間桶數或結果列數超過 max_rows 時拋出 ValueError。
+        """
+        if granularity not in BUCKET_GRANULARITIES:
+            raise ValueError(f"不支援的粒度: {granularity}")
+        invalid = [dimension for dimension in group_by if dimension not in BUCKET_DIMENSIONS]
+        if invalid:
+            raise ValueError(f"不支援的分組維度: {', '.join(invalid)}")
+        if range_start >= range_end:
+            raise ValueError("開始時間必須早於結束時間")
+
+        range_start = truncate_to_bucket(range_start, granularity)
+        bucket_count = -(-(range_end - range_start) // BUCKET_GRANULARITIES[granularity])
+        if bucket_count > max_rows:
+            raise ValueError(f"時間桶數 {bucket_count} 超過上限 {max_rows}，請縮小範圍或改用較粗的粒度")
+
+        group_by = tuple(group_by)
+        accumulators: Dict[tuple, BucketAccumulator] = {}
+        sources = []
+
+        def accumulator_for(bucket: datetime, row) -> BucketAccumulator:
+            key = (bucket, *(getattr(row, dimension) for dimension in group_by))
+            accumulator = accumulators.get(key)
+            if accumulator is None:
+                if len(accumulators) >= max_rows:
+                    raise ValueError(f"結果列數超過上限 {max_rows}，請減少分組維度或縮小範圍")
+                accumulator = accumulators[key] = BucketAccumulator()
+            return accumulator
+
+        # 小時彙總涵蓋的部分
+        split = range_start
+        if granularity != 'minute':
+            covered_until = await self._get_covered_until()
+            if covered_until is not None:
+                split = min(max(range_start, truncate_to_bucket(covered_until, 'hour')), range_end)
+
+        if split > range_start:
+            sources.append('rollup')
+            rows = await self.db.stream(
+                select(HourlyApiStats).where(
+                    HourlyApiStats.bucket_start >= range_start,
+                    HourlyApiStats.bucket_start < split
+                ).execution_options(yield_per=1000)
+            )
+            async for rollup in rows.scalars():
+                accumulator = accumulator_for(truncate_to_bucket(rollup.bucket_start, granularity), rollup)
+                accumulator.request_count += rollup.request_count
+                if rollup.success == 'error':
+                    accumulator.error_count += rollup.request_count
+                accumulator.total_processing_time += rollup.total_processing_time
+                accumulator.processing_time_count += rollup.processing_time_count
+                accumulator.total_file_size += rollup.total_file_size
+                if rollup.latency_sketch:
+                    accumulator.sketch.merge(LatencySketch.from_dict(rollup.latency_sketch))
+
+        # 已歸檔的部分由 DuckDB 預先聚合
+        cold_range = await self._get_cold_range(split, range_end) if split < range_end else None
+        if cold_range is not None:
+            sources.append('archive')
+            rows = await asyncio.to_thread(self.columnar_store.bucket_rows, *cold_range, granularity)
+            for archived in rows:
+                accumulator = accumulator_for(archived['bucket'], SimpleNamespace(**archived))
+                accumulator.request_count += archived['request_count']
+                if archived['success'] == 'error':
+                    accumulator.error_count += archived['request_count']
+                accumulator.total_processing_time += archived['total_processing_time']
+                accumulator.processing_time_count += archived['processing_time_count']
+                accumulator.total_file_size += archived['total_file_size']
+                for index, bucket_count in archived['latency_buckets']:
+                    accumulator.sketch.add_bucket(index, bucket_count)
+            split = cold_range[1]
+
+        # 其餘部分由資料庫依時間桶與分組維度聚合，Python 只處理聚合後的列
+        if split < range_end:
+            sources.append('raw')
+            bucket_column = truncate_timestamp(granularity, ApiUsageLog.timestamp).label('bucket')
+            dimension_columns = [getattr(ApiUsageLog, dimension) for dimension in group_by]
+            raw_range = (
+                ApiUsageLog.timestamp >= split,
+                ApiUsageLog.timestamp < range_end,
+                ApiUsageLog.method != JOB_USAGE_METHOD
+            )
+
+            rows = (await self.db.execute(
+                select(
+                    bucket_column,
+                    *dimension_columns,
+                    func.count().label('request_count'),
+                    func.coalesce(func.sum(case((ApiUsageLog.success == 'error', 1), else_=0)), 0).label('error_count'),
+                    func.coalesce(func.sum(ApiUsageLog.processing_time), 0).label('total_processing_time'),
+                    func.count(ApiUsageLog.processing_time).label('processing_time_count'),
+                    func.coalesce(func.sum(ApiUsageLog.file_size), 0).label('total_file_size')
+                ).where(*raw_range).group_by(bucket_column, *dimension_columns)
+            )).all()
+            for row in rows:
+                accumulator = accumulator_for(row.bucket, row)
+                accumulator.request_count += row.request_count
+                accumulator.error_count += row.error_count
+                accumulator.total_processing_time += row.total_processing_time
+                accumulator.processing_time_count += row.processing_time_count
+                accumulator.total_file_size += row.total_file_size
+
+            # 延遲草圖：依草圖桶索引計數後合併
+            bucket_index = latency_bucket_index(ApiUsageLog.processing_time).label('bucket_index')
+            rows = (await self.db.execute(
+                select(
+                    bucket_column,
+                    *dimension_columns,
+                    bucket_index,
+                    func.count().label('bucket_count')
+                ).where(
+                    *raw_range,
+                    ApiUsageLog.processing_time.isnot(None)
+                ).group_by(bucket_column, *dimension_columns, bucket_index)
+            )).all()
+            for row in rows:
+                accumulator_for(row.bucket, row).sketch.add_bucket(row.bucket_index, row.bucket_count)
+
+        buckets = []
+        for key in sorted(accumulators, key=lambda item: tuple('' if value is None else value for value in item)):
+            bucket_start, *dimension_values = key
+            buckets.append({
+                "bucket_start": bucket_start.isoformat(),
+                **dict(zip(group_by, dimension_values)),
+                **accumulators[key].to_dict()
+            })
+
+        return {
+            "granularity": granularity,
+            "group_by": list(group_by),
+            "start": range_start.isoformat(),
+            "end": range_end.isoformat(),
+            "sources": sources,
+            "buckets": buckets
+        }
+
+    async def get_recent_errors(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        error_prefix: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        獲取錯誤記錄（依 timestamp, id 由新到舊，keyset 分頁）
+
+        cursor 為上一頁返回的 next_cursor，查詢條件為 (timestamp, id) < 游標，
+        不論翻到多深都只走索引範圍掃描，不需 OFFSET。
+        error_prefix 以 C 排序規則的範圍條件比對，可使用前綴索引。
+        """
+        conditions = [ApiUsageLog.success == 'error']
+
+        if cursor:
+            cursor_timestamp, cursor_id = decode_error_cursor(cursor)
+            conditions.append(
+                tuple_(ApiUsageLog.timestamp, ApiUsageLog.id) < tuple_(cursor_timestamp, cursor_id)
+            )
+
+        if endpoint:
+            conditions.append(ApiUsageLog.endpoint == endpoint)
+
+        if error_prefix:
+            indexed_prefix = error_prefix[:ERROR_PREFIX_INDEX_CHARS]
+            indexed_message = byte_order_prefix(ApiUsageLog.error_message, ERROR_PREFIX_INDEX_CHARS)
+            conditions.append(indexed_message >= indexed_prefix)
+            upper_bound = prefix_upper_bound(indexed_prefix)
+            if upper_bound is not None:
+                conditions.append(indexed_message < upper_bound)
+            if len(error_prefix) > ERROR_PREFIX_INDEX_CHARS:
+                conditions.append(ApiUsageLog.error_message.startswith(error_prefix, autoescape=True))
+
+        # 多取一筆以判斷是否還有下一頁
+        errors = (await self.db.execute(
+            select(ApiUsageLog).where(
+                *conditions
+            ).order_by(
+                ApiUsageLog.timestamp.desc(),
+                ApiUsageLog.id.desc()
+            ).limit(limit + 1)
+        )).scalars().all()
+
+        next_cursor = None
+        if len(errors) > limit:
+            errors = errors[:limit]
+            next_cursor = encode_error_cursor(errors[-1].timestamp, errors[-1].id)
+
+        return {
+            "errors": [
+                {
+                    "id": error.id,
+                    "timestamp": error.timestamp.isoformat(),
+                    "ip": error.ip,
+                    "endpoint": error.endpoint,
+                    "method": error.method,
+                    "error_message": error.error_message,
+                    "processing_time": error.processing_time
+                }
+                for error in errors
+            ],
+            "next_cursor": next_cursor
+        }
     
-    def get_recent_errors(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """獲取最近的錯誤記錄"""
-        errors = self.db.query(ApiUsageLog).filter(
-            ApiUsageLog.success == 'error'
-        ).order_by(
-            ApiUsageLog.timestamp.desc()
-        ).limit(limit).all()
+    async def get_model_usage_stats(self, days: int = 30) -> Dict[str, Any]:
+        """獲取模型使用統計（含 token、音檔秒數與估算成本）"""
+        now = datetime.now()
+        start_date = now - timedelta(days=days)
+
+        # 模型 -> USAGE_TOTAL_FIELDS 總和
+        totals: Dict[str, List[float]] = {}
+        hot_start = start_date
+
+        cold_range = await self._get_cold_range(start_date, now)
+        if cold_range is not None:
+            archived = await asyncio.to_thread(self.columnar_store.model_usage, *cold_range)
+            for model_used, values in archived.items():
+                add_usage_totals(totals.setdefault(model_used, [0.0] * len(USAGE_TOTAL_FIELDS)), values)
+            hot_start = cold_range[1]
+
+        stats = (await self.db.execute(
+            select(
+                ApiUsageLog.model_used,
+                *usage_aggregates()
+            ).where(
+                ApiUsageLog.timestamp >= hot_start,
+                ApiUsageLog.model_used.isnot(None)
+            ).group_by(
+                ApiUsageLog.model_used
+            )
+        )).all()
+        for stat in stats:
+            add_usage_totals(totals.setdefault(stat.model_used, [0.0] * len(USAGE_TOTAL_FIELDS)), stat[1:])
         
+        # 延遲分位數以小時為粒度，起點向下取整點；上游模型的用量記在背景工作的記錄上
+        sketches = await self._get_latency_sketches(
+            'model_used',
+            start_date.replace(minute=0, second=0, microsecond=0),
+            now,
+            await self._get_covered_until(),
+            include_jobs=True
+        )
+        
+        return {
+            model_used: {
+                **summarize_usage(model_totals),
+                "latency_percentiles": (
+                    sketches[model_used].percentiles()
+                    if model_used in sketches else LatencySketch().percentiles()
+                )
+            }
+            for model_used, model_totals in totals.items()
+        }
+
+    async def get_daily_endpoint_usage(self, days: int = 30) -> List[Dict[str, Any]]:
+        """每日、每個端點與模型的 token / 音檔秒數 / 成本，供容量規劃"""
+        now = datetime.now()
+        start = datetime.combine(now.date() - timedelta(days=days - 1), time.min)
+
+        # (日期, 端點, 模型) -> USAGE_TOTAL_FIELDS 總和
+        totals: Dict[tuple, List[float]] = {}
+        hot_start = start
+
+        cold_range = await self._get_cold_range(start, now)
+        if cold_range is not None:
+            archived = await asyncio.to_thread(self.columnar_store.daily_endpoint_usage, *cold_range)
+            for day, endpoint, model_used, *values in archived:
+                key = (day, endpoint, model_used)
+                add_usage_totals(totals.setdefault(key, [0.0] * len(USAGE_TOTAL_FIELDS)), values)
+            hot_start = cold_range[1]
+
+        day_column = truncate_timestamp('day', ApiUsageLog.timestamp).label('day')
+        stats = (await self.db.execute(
+            select(
+                day_column,
+                ApiUsageLog.endpoint,
+                ApiUsageLog.model_used,
+                *usage_aggregates()
+            ).where(
+                ApiUsageLog.timestamp >= hot_start,
+                ApiUsageLog.model_used.isnot(None)
+            ).group_by(
+                day_column, ApiUsageLog.endpoint, ApiUsageLog.model_used
+            )
+        )).all()
+        for stat in stats:
+            key = (stat.day.date(), stat.endpoint, stat.model_used)
+            add_usage_totals(totals.setdefault(key, [0.0] * len(USAGE_TOTAL_FIELDS)), stat[3:])
+
         return [
             {
-                "timestamp": error.timestamp.isoformat(),
-                "ip": error.ip,
-                "endpoint": error.endpoint,
-                "method": error.method,
-                "error_message": error.error_message,
-                "processing_time": error.processing_time
+                "date": day.isoformat(),
+                "endpoint": endpoint,
+                "model_used": model_used,
+                **summarize_usage(usage_totals),
             }
-            for error in errors
+            for (day, endpoint, model_used), usage_totals in sorted(totals.items())
         ]
-    
-    def get_model_usage_stats(self, days: int = 30) -> Dict[str, Any]:
-        """獲取模型使用統計"""
-        start_date = datetime.now() - timedelta(days=days)
-        
-        stats = self.db.query(
-            ApiUsageLog.model_used,
-            func.count().label('usage_count'),
-            func.avg(ApiUsageLog.processing_time).label('avg_time')
-        ).filter(
-            ApiUsageLog.timestamp >= start_date,
-            ApiUsageLog.model_used.isnot(None)
-        ).group_by(
-            ApiUsageLog.model_used
-        ).all()
-        
-        return {
-            stat.model_used: {
-                "usage_count": stat.usage_count,
-                "avg_processing_time": round(stat.avg_time or 0, 2)
-            }
-            for stat in stats
-        }
\ No newline at end of file
@@ -0,0 +1,323 @@
+# ================================
+# 9. 列式歷史資料庫 - core/services/columnar_store.py
+# ================================
+
+import os
+import json
+import math
+import zlib
+import logging
+import tempfile
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import text
+from core.utils.latency_sketch import LatencySketch
+from core.utils.usage import JOB_USAGE_METHOD
+
+try:
+    import duckdb
+except ImportError:  # 選用依賴，未安裝時歷史查詢照常走 PostgreSQL
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# 匯出到 Parquet 的欄位（不含 data_payload，摘要留在 PostgreSQL）
+ARCHIVE_COLUMNS = (
+    'id', 'timestamp', 'ip', 'endpoint', 'method', 'model_used', 'file_size',
+    'processing_time', 'ttfb_ms', 'bytes_sent', 'final_event_type', 'success',
+    'error_message', 'user_agent', 'audio_seconds', 'input_tokens', 'output_tokens',
+    'cached_tokens', 'upstream_ms', 'cost_usd',
+)
+
+ARCHIVE_CSV_TYPES = {
+    'id': 'BIGINT', 'timestamp': 'TIMESTAMP', 'ip': 'VARCHAR', 'endpoint': 'VARCHAR',
+    'method': 'VARCHAR', 'model_used': 'VARCHAR', 'file_size': 'BIGINT',
+    'processing_time': 'INTEGER', 'ttfb_ms': 'INTEGER', 'bytes_sent': 'BIGINT',
+    'final_event_type': 'VARCHAR', 'success': 'VARCHAR', 'error_message': 'VARCHAR',
+    'user_agent': 'VARCHAR', 'audio_seconds': 'DOUBLE', 'input_tokens': 'INTEGER',
+    'output_tokens': 'INTEGER', 'cached_tokens': 'INTEGER', 'upstream_ms': 'INTEGER',
+    'cost_usd': 'DOUBLE',
+}
+
+MANIFEST_NAME = '_manifest.json'
+
+# 延遲草圖桶索引 ceil(ln(x) / ln(gamma)) 的分母，與 LatencySketch 預設精度一致
+SKETCH_LOG_GAMMA = math.log(LatencySketch().gamma)
+
+def _sql_literal(value: str) -> str:
+    """DuckDB 的 COPY / read_* 路徑不接受參數綁定，改以字串常值帶入"""
+    return "'" + value.replace("'", "''") + "'"
+
+def copy_day_to_csv(conn, day: date, csv_file):
+    """以 psycopg2 COPY 將單日記錄（ARCHIVE_COLUMNS，含標頭）寫入 csv_file"""
+    dbapi_cursor = conn.connection.cursor()
+    try:
+        query = dbapi_cursor.mogrify(
+            f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM social_work.api_usage_logs "
+            "WHERE timestamp >= %s AND timestamp < %s",
+            (datetime.combine(day, time.min), datetime.combine(day + timedelta(days=1), time.min))
+        ).decode()
+        dbapi_cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV HEADER", csv_file)
+    finally:
+        dbapi_cursor.close()
+
+class ColumnarStore:
+    """
+    以 Parquet + DuckDB 保存已結束日期的 api_usage_logs
+
+    檔案依日期存放於 <archive_dir>/api_usage_logs/day=YYYY-MM-DD/part.parquet，
+    _manifest.json 記錄 archived_until（不含），之前的每一天都已完整歸檔，
+    AnalyticsService 只把早於此日期的查詢交給 DuckDB，其餘仍查 PostgreSQL。
+    """
+
+    def __init__(self, archive_dir: str):
+        if duckdb is None:
+            raise RuntimeError("未安裝 duckdb，無法使用列式歷史資料庫")
+        self.archive_dir = archive_dir
+        self.table_dir = os.path.join(archive_dir, 'api_usage_logs')
+        os.makedirs(self.table_dir, exist_ok=True)
+
+    # ---------- 歸檔範圍 ----------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.archive_dir, MANIFEST_NAME)
+
+    def archived_until(self) -> Optional[date]:
+        """已連續歸檔到的日期（不含）；尚未歸檔則為 None"""
+        try:
+            with open(self._manifest_path()) as f:
+                return date.fromisoformat(json.load(f)['archived_until'])
+        except FileNotFoundError:
+            return None
+
+    def _set_archived_until(self, day: date):
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'archived_until': day.isoformat(), 'updated_at': datetime.now().isoformat()}, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def cold_range(self, range_start: datetime, range_end: datetime) -> Optional[Tuple[datetime, datetime]]:
+        """查詢範圍中可由歸檔回答的部分 [range_start, split)；沒有則為 None"""
+        archived_until = self.archived_until()
+        if archived_until is None:
+            return None
+        split = min(range_end, datetime.combine(archived_until, time.min))
+        if split <= range_start:
+            return None
+        return range_start, split
+
+    # ---------- 寫入 ----------
+
+    def _day_path(self, day: date) -> str:
+        return os.path.join(self.table_dir, f'day={day.isoformat()}', 'part.parquet')
+
+    def archive_csv(self, day: date, csv_path: str) -> int:
+        """將單日 CSV（含標頭，欄位為 ARCHIVE_COLUMNS）轉為 ZSTD 壓縮的 Parquet，返回筆數"""
+        target = self._day_path(day)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_target = target + '.tmp'
+
+        columns = ', '.join(f"'{name}': '{ARCHIVE_CSV_TYPES[name]}'" for name in ARCHIVE_COLUMNS)
+        con = duckdb.connect()
+        try:
+            con.execute(f"""
+                COPY (
+                    SELECT * FROM read_csv({_sql_literal(csv_path)}, header = true, columns = {{{columns}}})
+                    ORDER BY timestamp, id
+                ) TO {_sql_literal(tmp_target)} (FORMAT PARQUET, COMPRESSION ZSTD)
+            """)
+            row_count = con.execute(f"SELECT count(*) FROM read_parquet({_sql_literal(tmp_target)})").fetchone()[0]
+        finally:
+            con.close()
+
+        # 寫完才替換，查詢端不會讀到半個檔案
+        os.replace(tmp_target, target)
+        return row_count
+
+    def export_day_from_postgres(self, conn, day: date) -> int:
+        """以 COPY 將 PostgreSQL 中單日記錄匯出並歸檔"""
+        with tempfile.NamedTemporaryFile('w+', suffix='.csv', dir=self.archive_dir) as csv_file:
+            copy_day_to_csv(conn, day, csv_file)
+            csv_file.flush()
+            return self.archive_csv(day, csv_file.name)
+
+    def mark_archived(self, day: date):
+        """day 之前（含）都已歸檔"""
+        self._set_archived_until(day + timedelta(days=1))
+
+    # ---------- 查詢 ----------
+
+    def _query(self, sql: str, params: list) -> list:
+        """在歸檔檔案上執行查詢（logs 為全部歸檔的視圖，day 分區可被剪枝）"""
+        pattern = os.path.join(self.table_dir, 'day=*', 'part.parquet')
+        source = f"read_parquet({_sql_literal(pattern)}, hive_partitioning = true, union_by_name = true)"
+        con = duckdb.connect()
+        try:
+            # 較早歸檔的檔案可能缺少後來新增的欄位，以 NULL 補齊
+            existing = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+            missing = ''.join(
+                f", NULL::{ARCHIVE_CSV_TYPES[name]} AS {name}" for name in ARCHIVE_COLUMNS if name not in existing
+            )
+            con.execute(f"CREATE VIEW logs AS SELECT *{missing} FROM {source}")
+            return con.execute(sql, params).fetchall()
+        finally:
+            con.close()
+
+    @staticmethod
+    def _range_params(range_start: datetime, range_end: datetime) -> list:
+        return [range_start.date(), range_end.date(), range_start, range_end]
+
+    RANGE_FILTER = "day >= ? AND day <= ? AND timestamp >= ? AND timestamp < ?"
+    # 流量統計只計 HTTP 請求（與 daily_api_stats / hourly_api_stats 相同）
+    HTTP_FILTER = f"method <> {_sql_literal(JOB_USAGE_METHOD)}"
+
+    def distinct_ips(self, range_start: datetime, range_end: datetime) -> Set[str]:
+        """範圍內不重複的 IP"""
+        rows = self._query(
+            f"SELECT DISTINCT ip FROM logs WHERE {self.RANGE_FILTER} AND {self.HTTP_FILTER}",
+            self._range_params(range_start, range_end)
+        )
+        return {row[0] for row in rows}
+
+    # 模型 / 端點用量彙總欄位，順序與 AnalyticsService.USAGE_TOTAL_FIELDS 相同
+    USAGE_AGGREGATES = """
+        count(*), coalesce(sum(processing_time), 0), count(processing_time),
+        coalesce(sum(input_tokens), 0), coalesce(sum(output_tokens), 0), coalesce(sum(cached_tokens), 0),
+        coalesce(sum(audio_seconds), 0), coalesce(sum(cost_usd), 0),
+        coalesce(sum(upstream_ms) FILTER (WHERE output_tokens IS NOT NULL), 0)
+    """
+
+    def model_usage(self, range_start: datetime, range_end: datetime) -> Dict[str, tuple]:
+        """各模型的用量彙總（欄位見 USAGE_AGGREGATES）"""
+        rows = self._query(
+            f"""
+            SELECT model_used, {self.USAGE_AGGREGATES}
+            FROM logs
+            WHERE {self.RANGE_FILTER} AND model_used IS NOT NULL
+            GROUP BY model_used
+            """,
+            self._range_params(range_start, range_end)
+        )
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def daily_endpoint_usage(self, range_start: datetime, range_end: datetime) -> List[tuple]:
+        """每日、每個 (endpoint, model_used) 的用量彙總：[(day, endpoint, model_used, *USAGE_AGGREGATES)]"""
+        return [
+            tuple(row)
+            for row in self._query(
+                f"""
+                SELECT day, endpoint, model_used, {self.USAGE_AGGREGATES}
+                FROM logs
+                WHERE {self.RANGE_FILTER} AND model_used IS NOT NULL
+                GROUP BY ALL
+                """,
+                self._range_params(range_start, range_end)
+            )
+        ]
+
+    def bucket_rows(
+        self,
+        range_start: datetime,
+        range_end: datetime,
+        granularity: str
+    ) -> List[dict]:
+        """
+        依時間桶與 (endpoint, model_used, success) 預先聚合
+
+        每列附上延遲草圖的 (桶索引, 計數) 列表，由 DuckDB 依桶索引分組計數，
+        呼叫端以 LatencySketch.add_bucket 合併，不需傳回每筆處理時間
+        """
+        rows = self._query(
+            f"""
+            WITH grouped AS (
+                SELECT date_trunc('{granularity}', timestamp) AS bucket,
+                       endpoint, model_used, success,
+                       processing_time IS NOT NULL AS timed,
+                       CASE WHEN processing_time > 0
+                            THEN CAST(ceil(ln(processing_time::DOUBLE) / {SKETCH_LOG_GAMMA!r}) AS BIGINT)
+                       END AS bucket_index,
+                       count(*) AS request_count,
+                       coalesce(sum(processing_time), 0) AS total_processing_time,
+                       coalesce(sum(file_size), 0) AS total_file_size
+                FROM logs
+                WHERE {self.RANGE_FILTER} AND {self.HTTP_FILTER}
+                GROUP BY ALL
+            )
+            SELECT bucket, endpoint, model_used, success,
+                   sum(request_count), sum(total_processing_time),
+                   coalesce(sum(request_count) FILTER (WHERE timed), 0),
+                   sum(total_file_size),
+                   list([bucket_index, request_count]) FILTER (WHERE timed)
+            FROM grouped
+            GROUP BY bucket, endpoint, model_used, success
+            """,
+            self._range_params(range_start, range_end)
+        )
+        return [
+            {
+                'bucket': row[0],
+                'endpoint': row[1],
+                'model_used': row[2],
+                'success': row[3],
+                'request_count': int(row[4]),
+                'total_processing_time': int(row[5]),
+                'processing_time_count': int(row[6]),
+                'total_file_size': int(row[7]),
+                'latency_buckets': [(index, int(bucket_count)) for index, bucket_count in row[8] or []],
+            }
+            for row in rows
+        ]
+
+# 由啟動流程依設定建立，未啟用時為 None
+_columnar_store: Optional[ColumnarStore] = None
+
+def configure_columnar_store(archive_dir: Optional[str]) -> Optional[ColumnarStore]:
+    """啟用列式歷史資料庫；未設定目錄或未安裝 duckdb 時維持停用"""
+    global _columnar_store
+    if not archive_dir:
+        _columnar_store = None
+    elif duckdb is None:
+        logger.warning("⚠️ 已設定 COLUMNAR_ARCHIVE_DIR 但未安裝 duckdb，歷史查詢仍使用 PostgreSQL")
+        _columnar_store = None
+    else:
+        _columnar_store = ColumnarStore(archive_dir)
+        logger.info(f"🗄️ 列式歷史資料庫已啟用: {archive_dir}")
+    return _columnar_store
+
+def get_columnar_store() -> Optional[ColumnarStore]:
+    """目前啟用的列式歷史資料庫"""
+    return _columnar_store
+
+def _try_lock(conn) -> bool:
+    """避免多個 worker 同時歸檔"""
+    lock_key = zlib.crc32(b'api_usage_logs_columnar_offload')
+    return bool(conn.execute(text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': lock_key}).scalar())
+
+def offload_closed_days(db, store: ColumnarStore, hot_days: int, max_days_per_run: int = 7) -> int:
+    """
+    將熱資料窗之前、尚未歸檔的日期依序匯出為 Parquet
+
+    每次最多處理 max_days_per_run 天；逐日推進 archived_until，
+    中途失敗時下次從失敗的那天重新開始。返回本次歸檔的天數。
+    """
+    if not _try_lock(db):
+        logger.info("⏭️ 其他 worker 正在歸檔，跳過")
+        return 0
+
+    cutoff = date.today() - timedelta(days=hot_days)
+    day = store.archived_until()
+    if day is None:
+        first_timestamp = db.execute(text("SELECT min(timestamp) FROM social_work.api_usage_logs")).scalar()
+        if first_timestamp is None:
+            return 0
+        day = first_timestamp.date()
+
+    archived = 0
+    conn = db.connection()
+    while day < cutoff and archived < max_days_per_run:
+        row_count = store.export_day_from_postgres(conn, day)
+        store.mark_archived(day)
+        logger.info(f"🗄️ 已歸檔 {day.isoformat()}：{row_count} 筆")
+        day += timedelta(days=1)
+        archived += 1
+    return archived
@@ -0,0 +1,588 @@
+# ================================
+# 10. 背景工作佇列 - core/services/job_queue.py
+# ================================
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from core.utils.sse import send_sse_data
+from core.utils.file_utils import cleanup_files
+from core.utils.usage import begin_usage, defer_to_job, JOB_USAGE_METHOD
+from core.utils.metrics import JOB_QUEUE_WAIT_SECONDS, JOB_RUN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ('completed', 'failed')
+HEARTBEAT_SECONDS = 15
+KEEPALIVE_SECONDS = 15
+# 訂閱者每次從檔案讀取的事件數
+EVENTS_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    files TEXT NOT NULL DEFAULT '[]',
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    error TEXT,
+    usage TEXT,
+    retention REAL,
+    last_seq INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT,
+    frame TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# 舊版資料庫缺少的欄位：(資料表, 欄位, 型別)
+ADDED_COLUMNS = (
+    ('jobs', 'retention', 'REAL'),
+    ('job_events', 'type', 'TEXT'),
+)
+
+# 工作處理函數：接收 payload，yield send_sse_data 產生的 SSE 幀
+JobHandler = Callable[[dict], AsyncIterator[str]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+# 工作結束時寫入使用記錄的函數：接收 ApiUsageLog 欄位
+UsageRecorder = Callable[[Dict[str, Any]], Awaitable[None]]
+
+def register_job_handler(kind: str, handler: JobHandler):
+    """註冊工作類型的處理函數（端點模組匯入時呼叫）"""
+    _handlers[kind] = handler
+
+def parse_frame(frame: str) -> dict:
+    """取出 SSE 幀的 JSON 內容；非資料幀返回空 dict"""
+    if not frame.startswith('data: '):
+        return {}
+    try:
+        return json.loads(frame[6:])
+    except ValueError:
+        return {}
+
+class JobStore:
+    """
+    以 SQLite 檔案保存工作狀態與事件
+
+    同一主機上的所有 uvicorn worker 共用此檔案：任一 worker 都能領取工作，
+    也都能為訂閱者讀出事件；每次操作開啟短連線，以 asyncio.to_thread 呼叫。
+
+    事件同時作為重新連線的補送緩衝：progress 事件會被後來的取代，每個工作
+    只保留最近 replay_progress_events 個，其餘事件（chunk / complete / error）全數保留。
+    執行中的工作由 JobRunner 批次寫入（append_events），不是每幀一個交易。
+    """
+
+    def __init__(self, path: str, replay_progress_events: int = 50):
+        self.path = path
+        self.replay_progress_events = replay_progress_events
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            for table, column, column_type in ADDED_COLUMNS:
+                existing = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """寫入交易（BEGIN IMMEDIATE 取得寫入鎖，避免多行程同時領取同一工作）"""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['files'] = json.loads(job['files'])
+        job['usage'] = json.loads(job['usage']) if job['usage'] else None
+        return job
+
+    def enqueue(self, kind: str, payload: dict, files: Optional[List[str]] = None) -> str:
+        """新增工作並返回 ID；files 為工作擁有的暫存檔，結束後刪除"""
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, files, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), json.dumps(files or []), time.time())
+            )
+        return job_id
+
+    def create_running(self, kind: str, worker: str, retention_seconds: Optional[float] = None,
+                       payload: Optional[dict] = None) -> dict:
+        """建立立即由本行程執行的工作（不經佇列），retention_seconds 覆寫結束後的保留時間"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, retention, worker, created_at, started_at, heartbeat_at) "
+                "VALUES (?, ?, 'running', ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload or {}, ensure_ascii=False), retention_seconds, worker, now, now, now)
+            )
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self, kinds: List[str], worker: str, max_running: int) -> Optional[dict]:
+        """領取最早排隊的工作；全主機執行中的佇列工作已達上限時返回 None"""
+        if not kinds:
+            return None
+        placeholders = ','.join('?' * len(kinds))
+        with self._transaction() as conn:
+            running = conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status = 'running' AND kind IN ({placeholders})", kinds
+            ).fetchone()[0]
+            if running >= max_running:
+                return None
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = 'queued' AND kind IN ({placeholders}) "
+                "ORDER BY created_at LIMIT 1",
+                kinds
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, now, now, row['id'])
+            )
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone())
+
+    def append_event(self, job_id: str, frame: str) -> int:
+        """保存一個事件幀並更新進度，返回事件序號（執行中工作以外使用，例如 fail_stale）"""
+        with self._transaction() as conn:
+            seq = conn.execute("SELECT last_seq FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] + 1
+            self._insert_events(conn, job_id, [(seq, frame)])
+        return seq
+
+    def append_events(self, job_id: str, events: List[Tuple[int, str]]):
+        """
+        在單一交易中保存多個已編號的事件幀並更新進度
+
+        序號由呼叫端（JobRunner）分配；重複寫入同一序號會被忽略，可安全重試。
+        """
+        if not events:
+            return
+        with self._transaction() as conn:
+            self._insert_events(conn, job_id, events)
+
+    def _insert_events(self, conn: sqlite3.Connection, job_id: str, events: List[Tuple[int, str]]):
+        rows, progress, message = [], None, None
+        for seq, frame in events:
+            data = parse_frame(frame)
+            rows.append((job_id, seq, data.get('type'), frame))
+            progress = data.get('progress', progress)
+            message = data.get('message', message)
+        conn.executemany("INSERT OR IGNORE INTO job_events (job_id, seq, type, frame) VALUES (?, ?, ?, ?)", rows)
+        progress_seqs = [row[1] for row in rows if row[2] == 'progress']
+        if progress_seqs:
+            conn.execute(
+                "DELETE FROM job_events WHERE job_id = ? AND type = 'progress' AND seq <= ?",
+                (job_id, progress_seqs[-1] - self.replay_progress_events)
+            )
+        last_seq = events[-1][0]
+        conn.execute(
+            "UPDATE jobs SET last_seq = MAX(last_seq, ?), heartbeat_at = ?, progress = COALESCE(?, progress), "
+            "message = COALESCE(?, message) WHERE id = ?",
+            (last_seq, time.time(), progress, message, job_id)
+        )
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None, usage: Optional[dict] = None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, usage = ?, finished_at = ? WHERE id = ?",
+                (status, error, json.dumps(usage) if usage else None, time.time(), job_id)
+            )
+
+    def heartbeat(self, job_ids: List[str]):
+        if not job_ids:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                [(time.time(), job_id) for job_id in job_ids]
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = self._to_dict(row)
+            if job['status'] == 'queued':
+                job['queue_position'] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?", (job['created_at'],)
+                ).fetchone()[0]
+            return job
+
+    def events_after(self, job_id: str, after_seq: int, limit: int = EVENTS_PAGE_SIZE) -> List[tuple]:
+        """返回 [(序號, SSE 幀)]"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, frame FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after_seq, limit)
+            ).fetchall()
+        return [(row['seq'], row['frame']) for row in rows]
+
+    def fail_stale(self, stale_seconds: float) -> int:
+        """
+        將心跳逾時的執行中工作標記為失敗（所屬 worker 已結束）
+
+        補上一個 error 事件，讓仍在訂閱的客戶端能正常結束。
+        """
+        cutoff = time.time() - stale_seconds
+        with self._connection() as conn:
+            stale_ids = [row['id'] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)
+            )]
+        for job_id in stale_ids:
+            self.append_event(job_id, send_sse_data('error', error='處理中斷，請重新嘗試'))
+            self.finish(job_id, 'failed', error='worker 無回應')
+            logger.warning(f"⚠️ 工作 {job_id} 心跳逾時，已標記為失敗")
+        return len(stale_ids)
+
+    def purge(self, retention_seconds: float) -> int:
+        """刪除已結束且超過保留時間的工作與事件，並清理殘留的暫存檔"""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, files FROM jobs WHERE status IN ('completed', 'failed') "
+                "AND finished_at < ? - COALESCE(retention, ?)",
+                (time.time(), retention_seconds)
+            ).fetchall()
+            job_ids = [(row['id'],) for row in rows]
+            conn.executemany("DELETE FROM job_events WHERE job_id = ?", job_ids)
+            conn.executemany("DELETE FROM jobs WHERE id = ?", job_ids)
+        cleanup_files([path for row in rows for path in json.loads(row['files'])])
+        if rows:
+            logger.info(f"🧹 已清除 {len(rows)} 個過期工作")
+        return len(rows)
+
+class PendingEvents:
+    """
+    執行中工作尚未寫入 SQLite 的事件（依序號排列）
+
+    JobRunner 每 flush_interval 秒把累積的事件以一個交易寫入，
+    本行程的訂閱者則直接從這裡取得尚未寫入的事件，不必等待寫入。
+    """
+
+    def __init__(self, last_seq: int = 0):
+        self.last_seq = last_seq
+        self.events: List[Tuple[int, str]] = []
+
+    def append(self, frame: str) -> int:
+        self.last_seq += 1
+        self.events.append((self.last_seq, frame))
+        return self.last_seq
+
+    def after(self, seq: int) -> List[Tuple[int, str]]:
+        return [event for event in self.events if event[0] > seq]
+
+    def discard_through(self, seq: int):
+        """移除已寫入的事件"""
+        self.events = [event for event in self.events if event[0] > seq]
+
+class JobRunner:
+    """
+    本 worker 的工作執行器
+
+    concurrency 為本行程同時執行的工作數，max_running 為全主機上限
+    （在領取交易中檢查）；新工作由本行程入列時立即喚醒，其他行程入列的
+    工作則靠 poll_interval 輪詢領取。
+
+    報告 / 處遇計畫等即時串流以 start_stream 直接執行（不佔佇列名額），
+    事件同樣保存，斷線後在 stream_grace_seconds 內可重新連線補送。
+
+    事件先放在記憶體（PendingEvents），每 flush_interval 秒以一個交易批次寫入
+    SQLite；本行程的訂閱者立即收到，其他行程的訂閱者最多延遲 flush_interval 秒。
+
+    工作結束時由 usage_recorder 寫入一筆 method 為 JOB 的使用記錄（上游模型、
+    token、音檔秒數與成本），與客戶端是否仍連線、是否以輪詢取得結果無關；
+    建立工作的 HTTP 請求則不再記錄模型與用量，避免重複計算。
+    """
+
+    def __init__(self, store: JobStore, concurrency: int = 1, max_running: int = 2,
+                 poll_interval: float = 0.5, stale_seconds: float = 120, stream_grace_seconds: float = 300,
+                 usage_recorder: Optional[UsageRecorder] = None, flush_interval: float = 0.5):
+        self.store = store
+        self.concurrency = concurrency
+        self.max_running = max_running
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.stream_grace_seconds = stream_grace_seconds
+        self.usage_recorder = usage_recorder
+        self.flush_interval = flush_interval
+        self.worker_id = f"{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._running: Set[str] = set()
+        self._streams: Set[asyncio.Task] = set()
+        self._listeners: Dict[str, Set[asyncio.Event]] = {}
+        self._pending: Dict[str, PendingEvents] = {}
+
+    def start(self) -> List[asyncio.Task]:
+        """啟動工作迴圈與心跳任務，返回 task 列表供關閉時取消"""
+        tasks = [
+            asyncio.create_task(self._worker_loop(), name=f"job_worker:{index}")
+            for index in range(self.concurrency)
+        ]
+        tasks.append(asyncio.create_task(self._heartbeat_loop(), name='job_heartbeat'))
+        logger.info(f"🧵 背景工作執行器已啟動（本行程 {self.concurrency} 個，全主機上限 {self.max_running} 個）")
+        return tasks
+
+    def notify(self):
+        """有新工作入列"""
+        self._wakeup.set()
+
+    async def enqueue(self, kind: str, payload: dict, files: Optional[List[str]] = None) -> str:
+        job_id = await asyncio.to_thread(self.store.enqueue, kind, payload, files)
+        defer_to_job(job_id)
+        self.notify()
+        return job_id
+
+    async def start_stream(self, kind: str, frames: AsyncIterator[str], payload: Optional[dict] = None) -> str:
+        """
+        在本行程背景執行串流產生器並返回工作 ID
+
+        產生器不再綁定單一 HTTP 連線：客戶端斷線後仍會跑完，事件保留
+        stream_grace_seconds 秒供 Last-Event-ID 補送。payload 只用於記錄（例如 origin）。
+        """
+        job = await asyncio.to_thread(
+            self.store.create_running, kind, self.worker_id, self.stream_grace_seconds, payload
+        )
+        defer_to_job(job['id'])
+        task = asyncio.create_task(self._run(job, frames), name=f"stream:{kind}:{job['id']}")
+        self._streams.add(task)
+        task.add_done_callback(self._streams.discard)
+        return job['id']
+
+    async def _worker_loop(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, list(_handlers), self.worker_id, self.max_running)
+            except sqlite3.Error as e:
+                logger.error(f"領取工作失敗: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+            # 執行結束釋出名額，讓其他 worker 的閒置迴圈儘快重試
+            self.notify()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, list(self._running))
+                await asyncio.to_thread(self.store.fail_stale, self.stale_seconds)
+            except sqlite3.Error as e:
+                logger.error(f"工作心跳失敗: {e}")
+
+    async def _run(self, job: dict, frames: Optional[AsyncIterator[str]] = None):
+        """執行一個工作並保存所有事件；本任務內的上游用量記錄到工作上"""
+        job_id, kind = job['id'], job['kind']
+        if frames is None:
+            frames = _handlers[kind](job['payload'])
+            JOB_QUEUE_WAIT_SECONDS.labels(kind=kind).observe(job['started_at'] - job['created_at'])
+        logger.info(f"▶️ 開始工作 {kind}:{job_id}")
+        self._running.add(job_id)
+        usage = begin_usage()
+        pending = self._pending[job_id] = PendingEvents(job['last_seq'])
+        stop_flushing = asyncio.Event()
+        flusher = asyncio.create_task(self._flush_loop(job_id, pending, stop_flushing), name=f"job_flush:{job_id}")
+        status, error, final_event_type = 'failed', None, None
+        try:
+            async for frame in frames:
+                pending.append(frame)
+                self._notify_listeners(job_id)
+                data = parse_frame(frame)
+                final_event_type = data.get('type') or final_event_type
+                if data.get('type') == 'complete':
+                    status = 'completed'
+                elif data.get('type') == 'error':
+                    error = data.get('error')
+            if status != 'completed' and error is None:
+                error = '處理未完成'
+        except asyncio.CancelledError:
+            # 服務關閉：同步寫入剩餘事件與結束狀態，訂閱者才不會一直等待
+            flusher.cancel()
+            pending.append(send_sse_data('error', error='服務重新啟動，請重新上傳'))
+            self.store.append_events(job_id, pending.events)
+            self.store.finish(job_id, 'failed', error='服務關閉時中斷', usage=self._usage(usage))
+            self._pending.pop(job_id, None)
+            raise
+        except Exception as e:
+            logger.error(f"工作 {job_id} 執行失敗: {e}", exc_info=True)
+            error = str(e)
+            final_event_type = 'error'
+            pending.append(send_sse_data('error', error=f'處理失敗: {e}'))
+        finally:
+            self._running.discard(job_id)
+            cleanup_files(job['files'])
+
+        stop_flushing.set()
+        await flusher
+        await asyncio.to_thread(self.store.finish, job_id, status, error, self._usage(usage))
+        self._pending.pop(job_id, None)
+        self._notify_listeners(job_id)
+        run_seconds = time.time() - job['started_at']
+        JOB_RUN_SECONDS.labels(kind=kind, status=status).observe(run_seconds)
+        logger.info(f"{'✅' if status == 'completed' else '❌'} 工作 {kind}:{job_id} 結束: {status}")
+        await self._record_usage(job, status, error, final_event_type, run_seconds, usage)
+
+    async def _flush_loop(self, job_id: str, pending: PendingEvents, stop: asyncio.Event):
+        """每 flush_interval 秒批次寫入累積的事件；stop 設定後寫入剩餘事件並結束"""
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            events = list(pending.events)
+            if events:
+                try:
+                    await asyncio.to_thread(self.store.append_events, job_id, events)
+                    pending.discard_through(events[-1][0])
+                except sqlite3.Error as e:
+                    logger.error(f"寫入工作 {job_id} 事件失敗: {e}")
+            if stop.is_set():
+                return
+
+    @staticmethod
+    def _usage(usage) -> Optional[dict]:
+        columns = usage.to_columns()
+        return {'model': usage.model, **columns} if columns else None
+
+    async def _record_usage(self, job: dict, status: str, error: Optional[str],
+                            final_event_type: Optional[str], run_seconds: float, usage):
+        """寫入工作的使用記錄；來源請求的 IP 與 User-Agent 取自 payload['origin']"""
+        if self.usage_recorder is None:
+            return
+        origin = job['payload'].get('origin') or {}
+        try:
+            await self.usage_recorder({
+                'timestamp': datetime.fromtimestamp(job['started_at']),
+                'ip': origin.get('ip') or 'unknown',
+                'endpoint': f"/backend/jobs/{job['kind']}",
+                'method': JOB_USAGE_METHOD,
+                'model_used': usage.model,
+                'file_size': job['payload'].get('file_size'),
+                'processing_time': int(run_seconds * 1000),
+                'final_event_type': final_event_type,
+                'success': 'success' if status == 'completed' else 'error',
+                'error_message': error,
+                'user_agent': origin.get('user_agent'),
+                **usage.to_columns()
+            })
+        except Exception as e:
+            logger.error(f"記錄工作 {job['id']} 用量失敗: {e}")
+
+    def _notify_listeners(self, job_id: str):
+        for event in self._listeners.get(job_id, ()):
+            event.set()
+
+    async def subscribe(self, job_id: str, after_seq: int = 0) -> AsyncIterator[str]:
+        """
+        依序送出工作事件直到工作結束
+
+        每個事件帶有 id: 序號；工作在本行程執行時，新事件會立即喚醒訂閱者
+        （尚未寫入的事件直接從記憶體送出），在其他行程執行則以 poll_interval 輪詢。
+        斷線不影響工作本身，之後以
+        Last-Event-ID（最後收到的序號）重新訂閱只補送之後的事件。
+        """
+        signal = asyncio.Event()
+        self._listeners.setdefault(job_id, set()).add(signal)
+        last_sent = time.monotonic()
+        try:
+            while True:
+                signal.clear()
+                # 先取記憶體中的事件再讀檔案：期間寫入的事件兩邊都有，依序號去重
+                pending = self._pending.get(job_id)
+                unflushed = pending.after(after_seq) if pending else []
+                job = await asyncio.to_thread(self.store.get, job_id)
+                events = await asyncio.to_thread(self.store.events_after, job_id, after_seq)
+                if len(events) >= EVENTS_PAGE_SIZE:
+                    # 檔案中還有更早的事件：本輪只送檔案內容，記憶體中的事件下一輪再送
+                    unflushed = []
+                for seq, frame in events + unflushed:
+                    if seq <= after_seq:
+                        continue
+                    after_seq = seq
+                    yield f"id: {seq}\n{frame}"
+                if events or unflushed:
+                    last_sent = time.monotonic()
+                    continue
+                if job is None or job['status'] in TERMINAL_STATES:
+                    return
+                if time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+                    last_sent = time.monotonic()
+                    yield ": keepalive\n\n"
+                try:
+                    await asyncio.wait_for(signal.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(signal)
+                if not listeners:
+                    del self._listeners[job_id]
+
+_job_runner: Optional[JobRunner] = None
+
+def configure_job_queue(db_path: str, concurrency: int, max_running: int, poll_interval: float,
+                        stale_seconds: float, stream_grace_seconds: float = 300,
+                        replay_progress_events: int = 50,
+                        usage_recorder: Optional[UsageRecorder] = None,
+                        event_flush_seconds: float = 0.5) -> JobRunner:
+    """建立工作佇列與本行程的執行器（啟動時呼叫）"""
+    global _job_runner
+    _job_runner = JobRunner(
+        JobStore(db_path, replay_progress_events),
+        concurrency, max_running, poll_interval, stale_seconds, stream_grace_seconds, usage_recorder,
+        event_flush_seconds
+    )
+    logger.info(f"🗂️ 背景工作佇列: {db_path}")
+    return _job_runner
+
+def get_job_runner() -> JobRunner:
+    if _job_runner is None:
+        raise RuntimeError("背景工作佇列尚未設定")
+    return _job_runner
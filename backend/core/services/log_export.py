@@ -0,0 +1,88 @@
+# ================================
+# 8. 記錄匯出服務 - core/services/log_export.py
+# ================================
+
+import io
+import csv
+import logging
+from datetime import datetime
+from typing import AsyncGenerator, Awaitable, Callable, Optional
+from sqlalchemy import select
+from models.api_usage_log import ApiUsageLog
+from core.database import AsyncSessionLocal
+from core.utils.json_codec import dumps as json_dumps
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+EXPORT_COLUMNS = (
+    'id', 'timestamp', 'ip', 'endpoint', 'method', 'model_used', 'file_size',
+    'processing_time', 'ttfb_ms', 'bytes_sent', 'final_event_type', 'success',
+    'error_message', 'data_payload', 'user_agent', 'audio_seconds', 'input_tokens',
+    'output_tokens', 'cached_tokens', 'upstream_ms', 'cost_usd',
+)
+
+def _row_values(log: ApiUsageLog) -> dict:
+    values = {column: getattr(log, column) for column in EXPORT_COLUMNS}
+    values['timestamp'] = log.timestamp.isoformat()
+    return values
+
+def _format_csv(rows: list) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for values in rows:
+        writer.writerow([
+            json_dumps(value) if column == 'data_payload' and value is not None else value
+            for column, value in values.items()
+        ])
+    return buffer.getvalue()
+
+async def stream_usage_logs(
+    range_start: datetime,
+    range_end: datetime,
+    fmt: str = 'ndjson',
+    endpoint: Optional[str] = None,
+    fetch_size: int = 1000,
+    is_disconnected: Callable[[], Awaitable[bool]] = None
+) -> AsyncGenerator[str, None]:
+    """
+    以伺服器端游標逐批匯出 api_usage_logs
+
+    每次只從資料庫取 fetch_size 筆並立即輸出，記憶體用量固定；
+    每批輸出前檢查客戶端是否已斷線，斷線即停止查詢並釋放游標。
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支援的匯出格式: {fmt}")
+
+    query = select(ApiUsageLog).where(
+        ApiUsageLog.timestamp >= range_start,
+        ApiUsageLog.timestamp < range_end
+    )
+    if endpoint:
+        query = query.where(ApiUsageLog.endpoint == endpoint)
+    query = query.order_by(ApiUsageLog.timestamp, ApiUsageLog.id).execution_options(yield_per=fetch_size)
+
+    if fmt == 'csv':
+        yield _format_csv([dict(zip(EXPORT_COLUMNS, EXPORT_COLUMNS))])
+
+    exported = 0
+    # 串流期間自行管理會話，不依賴請求結束即關閉的依賴注入
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.scalars().partitions():
+            if is_disconnected is not None and await is_disconnected():
+                logger.info(f"🔌 客戶端已斷線，停止匯出（已輸出 {exported} 筆）")
+                return
+
+            rows = [_row_values(log) for log in partition]
+            if fmt == 'ndjson':
+                yield ''.join(json_dumps(values) + '\n' for values in rows)
+            else:
+                yield _format_csv(rows)
+            exported += len(rows)
+
+    logger.info(f"📤 匯出完成，共 {exported} 筆")
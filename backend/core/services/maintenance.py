@@ -0,0 +1,69 @@
+# ================================
+# 5. 背景維護任務 - core/services/maintenance.py
+# ================================
+
+import asyncio
+import logging
+from typing import Callable, List, Tuple
+from core.database import get_db_context, engine
+from core.utils.payload_policy import purge_expired_payloads
+from core.services.rollup_service import RollupService
+from core.services.partition_maintenance import maintain_partitions
+from core.services.columnar_store import get_columnar_store, offload_closed_days
+from core.services.job_queue import get_job_runner
+
+logger = logging.getLogger(__name__)
+
+async def run_periodic(name: str, interval_seconds: float, func: Callable[[], None]):
+    """在背景執行緒中週期性執行同步維護任務"""
+    logger.info(f"⏱️ 維護任務已啟動: {name}（每 {interval_seconds} 秒）")
+    while True:
+        try:
+            await asyncio.to_thread(func)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"維護任務 {name} 執行失敗: {e}")
+        await asyncio.sleep(interval_seconds)
+
+def start_maintenance_jobs(jobs: List[Tuple[str, float, Callable[[], None]]]) -> List[asyncio.Task]:
+    """啟動維護任務，返回 task 列表供關閉時取消"""
+    return [
+        asyncio.create_task(run_periodic(name, interval, func), name=f"maintenance:{name}")
+        for name, interval, func in jobs
+    ]
+
+async def stop_maintenance_jobs(tasks: List[asyncio.Task]):
+    """取消所有維護任務"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def purge_payloads_job(retention_days: int):
+    """清除過期的完整請求內容"""
+    with get_db_context() as db:
+        purge_expired_payloads(db, retention_days)
+
+def refresh_rollups_job():
+    """增量更新流量彙總表"""
+    with get_db_context() as db:
+        RollupService(db).refresh()
+
+def partition_maintenance_job(months_ahead: int, retention_months: int, mode: str):
+    """建立未來月分區並卸離 / 刪除過期分區（僅 PostgreSQL）"""
+    if engine.dialect.name != 'postgresql':
+        return
+    with get_db_context() as db:
+        maintain_partitions(db, months_ahead, retention_months, mode)
+
+def columnar_offload_job(hot_days: int):
+    """將熱資料窗之前的日期歸檔為 Parquet（僅 PostgreSQL 且已啟用列式歷史資料庫）"""
+    store = get_columnar_store()
+    if store is None or engine.dialect.name != 'postgresql':
+        return
+    with get_db_context() as db:
+        offload_closed_days(db, store, hot_days)
+
+def purge_jobs_job(retention_hours: float):
+    """清除已結束且超過保留時間的背景工作與其事件"""
+    get_job_runner().store.purge(retention_hours * 3600)
@@ -0,0 +1,180 @@
+# ================================
+# 7. 分區維護 - core/services/partition_maintenance.py
+# ================================
+
+import re
+import zlib
+import logging
+from datetime import date
+from typing import List, Tuple
+from sqlalchemy import text
+from core.utils.metrics import LOG_DEFAULT_PARTITION_ROWS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_NAME = 'social_work'
+PARENT_TABLE = 'api_usage_logs'
+PARTITION_NAME_PATTERN = re.compile(rf'^{PARENT_TABLE}_y(\d{{4}})m(\d{{2}})$')
+# 不屬於任何月分區的記錄（時鐘異常、分區預建失敗）落入預設分區，不會寫入失敗
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+# 檢查預設分區時最多計數的筆數，避免大量誤入時全表計數
+DEFAULT_PARTITION_COUNT_LIMIT = 100000
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def add_months(month: date, months: int) -> date:
+    """月份加減（輸入須為月初）"""
+    index = month.year * 12 + (month.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+def monthly_partition_ddl(month: date, schema: str = SCHEMA_NAME) -> str:
+    """單月分區的建立語句，範圍為半開區間 [月初, 下月初)"""
+    month = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {schema}.{partition_name(month)} "
+        f"PARTITION OF {schema}.{PARENT_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+def default_partition_ddl(schema: str = SCHEMA_NAME) -> str:
+    """預設分區的建立語句"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {schema}.{DEFAULT_PARTITION} "
+        f"PARTITION OF {schema}.{PARENT_TABLE} DEFAULT"
+    )
+
+def _default_partition_exists(conn) -> bool:
+    return conn.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"),
+        {'name': f'{SCHEMA_NAME}.{DEFAULT_PARTITION}'}
+    ).scalar()
+
+def create_month_partition(conn, month: date):
+    """
+    建立單月分區
+
+    預設分區中若已有該月的記錄，直接 CREATE ... PARTITION OF 會失敗，
+    此時改為先建立獨立表、把記錄從預設分區搬過去，再 ATTACH 為分區。
+    """
+    month = month_start(month)
+    next_month = add_months(month, 1)
+    if not _default_partition_exists(conn) or not conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {SCHEMA_NAME}.{DEFAULT_PARTITION} "
+        "WHERE timestamp >= :start AND timestamp < :end)"
+    ), {'start': month, 'end': next_month}).scalar():
+        conn.execute(text(monthly_partition_ddl(month)))
+        return
+
+    name = partition_name(month)
+    conn.execute(text(
+        f"CREATE TABLE {SCHEMA_NAME}.{name} "
+        f"(LIKE {SCHEMA_NAME}.{PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {SCHEMA_NAME}.{DEFAULT_PARTITION}
+            WHERE timestamp >= :start AND timestamp < :end
+            RETURNING *
+        )
+        INSERT INTO {SCHEMA_NAME}.{name} SELECT * FROM moved
+    """), {'start': month, 'end': next_month}).rowcount
+    conn.execute(text(
+        f"ALTER TABLE {SCHEMA_NAME}.{PARENT_TABLE} ATTACH PARTITION {SCHEMA_NAME}.{name} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+    ))
+    logger.info(f"🗂️ 已將預設分區中的 {moved} 筆記錄移入 {name}")
+
+def check_default_partition(conn) -> int:
+    """
+    預設分區中的記錄數（上限 DEFAULT_PARTITION_COUNT_LIMIT），同時更新指標；
+    有記錄表示月分區沒有預先建好，需要注意
+    """
+    if not _default_partition_exists(conn):
+        return 0
+    rows = conn.execute(text(
+        f"SELECT count(*) FROM (SELECT 1 FROM {SCHEMA_NAME}.{DEFAULT_PARTITION} LIMIT :limit) AS sample"
+    ), {'limit': DEFAULT_PARTITION_COUNT_LIMIT}).scalar()
+    LOG_DEFAULT_PARTITION_ROWS.set(rows)
+    if rows:
+        logger.warning(f"⚠️ 預設分區 {DEFAULT_PARTITION} 有 {rows} 筆記錄，"
+                       f"請確認月分區是否預建（建立對應月分區時會自動搬移）")
+    return rows
+
+def _try_lock(conn) -> bool:
+    """避免多個 worker 同時執行 DDL"""
+    lock_key = zlib.crc32(b'api_usage_logs_partitions')
+    return bool(conn.execute(text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': lock_key}).scalar())
+
+def list_partitions(conn) -> List[Tuple[str, date]]:
+    """列出目前掛在父表下的月分區 (名稱, 月初)"""
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        JOIN pg_namespace ns ON parent.relnamespace = ns.oid
+        WHERE ns.nspname = :schema AND parent.relname = :parent
+    """), {'schema': SCHEMA_NAME, 'parent': PARENT_TABLE}).fetchall()
+
+    partitions = []
+    for (name,) in rows:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+def ensure_future_partitions(conn, months_ahead: int = 3, today: date = None) -> List[str]:
+    """預先建立本月起 months_ahead 個月的分區與預設分區，返回新建的月分區名稱"""
+    current = month_start(today or date.today())
+    existing = {name for name, _ in list_partitions(conn)}
+
+    conn.execute(text(default_partition_ddl()))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name not in existing:
+            create_month_partition(conn, month)
+            created.append(name)
+
+    if created:
+        logger.info(f"🗂️ 已建立分區: {', '.join(created)}")
+    return created
+
+def apply_retention(conn, retention_months: int, mode: str = 'detach', today: date = None) -> List[str]:
+    """
+    卸離或刪除超過保留期限的分區
+
+    Args:
+        retention_months: 保留月數（含本月），0 表示不清除
+        mode: 'detach' 只卸離（資料表保留供封存），'drop' 直接刪除
+    """
+    if retention_months <= 0:
+        return []
+    if mode not in ('detach', 'drop'):
+        raise ValueError(f"不支援的保留模式: {mode}")
+
+    cutoff = add_months(month_start(today or date.today()), -(retention_months - 1))
+    expired = [name for name, month in list_partitions(conn) if month < cutoff]
+
+    for name in expired:
+        conn.execute(text(f"ALTER TABLE {SCHEMA_NAME}.{PARENT_TABLE} DETACH PARTITION {SCHEMA_NAME}.{name}"))
+        if mode == 'drop':
+            conn.execute(text(f"DROP TABLE {SCHEMA_NAME}.{name}"))
+
+    if expired:
+        logger.info(f"🧹 已{'刪除' if mode == 'drop' else '卸離'}過期分區: {', '.join(expired)}")
+    return expired
+
+def maintain_partitions(conn, months_ahead: int, retention_months: int, mode: str = 'detach'):
+    """建立未來分區並套用保留期限；每個 worker 都會檢查預設分區以更新指標"""
+    if _try_lock(conn):
+        ensure_future_partitions(conn, months_ahead)
+        apply_retention(conn, retention_months, mode)
+    else:
+        logger.info("⏭️ 其他 worker 正在維護分區，跳過")
+    check_default_partition(conn)
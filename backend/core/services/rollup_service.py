@@ -0,0 +1,192 @@
+# ================================
+# 6. 彙總維護服務 - core/services/rollup_service.py
+# ================================
+
+import zlib
+import logging
+from datetime import datetime, timedelta, date, time
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, text
+from models.api_usage_log import ApiUsageLog
+from models.daily_api_stats import DailyApiStats, HourlyApiStats, RollupWatermark
+from core.utils.latency_sketch import LatencySketch
+from core.utils.hyperloglog import HyperLogLog
+from core.utils.sql_functions import truncate_timestamp
+from core.utils.usage import JOB_USAGE_METHOD
+
+logger = logging.getLogger(__name__)
+
+class RollupService:
+    """daily_api_stats / hourly_api_stats 增量彙總
+
+    以 api_usage_logs.id 作為水位，每次只重新計算水位之後新增記錄所涉及的日期與小時。
+    為避免遺漏尚未提交的記錄，只處理 SAFETY_LAG_SECONDS 之前寫入（created_at，
+    資料庫時間）的記錄：id 較小但較晚提交的記錄不會被水位跳過。
+    timestamp 是請求開始時間，長串流的記錄可能很久之後才寫入，因此不能用來判斷。
+    """
+
+    ROLLUP_NAME = 'daily_api_stats'
+    SAFETY_LAG_SECONDS = 60
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _try_lock(self) -> bool:
+        """多個 worker 同時執行時，只讓一個進行彙總（PostgreSQL advisory lock）"""
+        if self.db.bind.dialect.name != 'postgresql':
+            return True
+        lock_key = zlib.crc32(self.ROLLUP_NAME.encode())
+        return bool(self.db.execute(
+            text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': lock_key}
+        ).scalar())
+
+    def refresh(self) -> int:
+        """增量更新彙總表，返回重新計算的天數"""
+        if not self._try_lock():
+            logger.info("⏭️ 其他 worker 正在更新彙總，跳過")
+            return 0
+
+        watermark = self.db.get(RollupWatermark, self.ROLLUP_NAME)
+        if watermark is None:
+            watermark = RollupWatermark(name=self.ROLLUP_NAME, last_log_id=0)
+            self.db.add(watermark)
+
+        safety_lag = timedelta(seconds=self.SAFETY_LAG_SECONDS)
+        # 寫入時間由資料庫產生，截止點也以資料庫時鐘計算
+        inserted_before = self.db.query(func.now()).scalar() - safety_lag
+        last_id = watermark.last_log_id or 0
+
+        max_id = self.db.query(func.max(ApiUsageLog.id)).filter(
+            ApiUsageLog.id > last_id,
+            ApiUsageLog.created_at < inserted_before
+        ).scalar()
+
+        days = []
+        if max_id is not None:
+            hours = [
+                row[0] for row in self.db.query(
+                    truncate_timestamp('hour', ApiUsageLog.timestamp)
+                ).filter(
+                    ApiUsageLog.id > last_id,
+                    ApiUsageLog.id <= max_id
+                ).distinct().all()
+            ]
+            days = sorted({hour.date() for hour in hours})
+            for day in days:
+                self.recompute_day(day)
+            for hour in hours:
+                self.recompute_hour(hour)
+            watermark.last_log_id = max_id
+
+        # 已寫入但還在安全延遲內的記錄尚未彙總，涵蓋時間不能超過其中最早的請求時間
+        covered_until = datetime.now() - safety_lag
+        pending_start = self.db.query(func.min(ApiUsageLog.timestamp)).filter(
+            ApiUsageLog.id > (max_id or last_id)
+        ).scalar()
+        if pending_start is not None:
+            covered_until = min(covered_until, pending_start)
+
+        watermark.covered_until = covered_until
+        watermark.refreshed_at = datetime.now()
+
+        if days:
+            logger.info(f"📊 已更新 {len(days)} 天的流量彙總（水位 id={max_id}）")
+        return len(days)
+
+    def recompute_day(self, day: date):
+        """重新計算單日彙總（只計 HTTP 請求，不含背景工作的用量記錄）"""
+        day_start = datetime.combine(day, time.min)
+        day_end = day_start + timedelta(days=1)
+
+        row = self.db.query(
+            func.count().label('total_requests'),
+            func.sum(case((ApiUsageLog.endpoint == '/backend/transcribe', 1), else_=0)).label('transcribe_count'),
+            func.sum(case((ApiUsageLog.endpoint == '/backend/generate-report', 1), else_=0)).label('report_count'),
+            func.sum(case((ApiUsageLog.endpoint == '/backend/generate-treatment-plan', 1), else_=0)).label('treatment_count'),
+            func.sum(case((ApiUsageLog.success == 'error', 1), else_=0)).label('error_count'),
+            func.sum(ApiUsageLog.processing_time).label('total_processing_time'),
+            func.count(ApiUsageLog.processing_time).label('processing_time_count'),
+            func.sum(ApiUsageLog.file_size).label('total_file_size')
+        ).filter(
+            ApiUsageLog.timestamp >= day_start,
+            ApiUsageLog.timestamp < day_end,
+            ApiUsageLog.method != JOB_USAGE_METHOD
+        ).one()
+
+        # 當日不重複 IP：同時記錄精確數量與可跨日合併的 HyperLogLog
+        ip_hll = HyperLogLog()
+        distinct_ips = 0
+        for (ip,) in self.db.query(ApiUsageLog.ip).filter(
+            ApiUsageLog.timestamp >= day_start,
+            ApiUsageLog.timestamp < day_end,
+            ApiUsageLog.method != JOB_USAGE_METHOD
+        ).distinct().yield_per(1000):
+            ip_hll.add(ip)
+            distinct_ips += 1
+
+        self.db.merge(DailyApiStats(
+            day=day,
+            total_requests=row.total_requests or 0,
+            distinct_ips=distinct_ips,
+            transcribe_count=row.transcribe_count or 0,
+            report_count=row.report_count or 0,
+            treatment_count=row.treatment_count or 0,
+            error_count=row.error_count or 0,
+            total_processing_time=row.total_processing_time or 0,
+            processing_time_count=row.processing_time_count or 0,
+            total_file_size=row.total_file_size or 0,
+            ip_hll=ip_hll.to_bytes(),
+            updated_at=datetime.now()
+        ))
+
+    def recompute_hour(self, hour_start: datetime):
+        """重新計算單一小時的分組彙總與延遲草圖（與 recompute_day 相同，不含背景工作的用量記錄）"""
+        hour_end = hour_start + timedelta(hours=1)
+
+        rows = self.db.query(
+            ApiUsageLog.endpoint,
+            ApiUsageLog.model_used,
+            ApiUsageLog.success,
+            ApiUsageLog.processing_time,
+            ApiUsageLog.file_size
+        ).filter(
+            ApiUsageLog.timestamp >= hour_start,
+            ApiUsageLog.timestamp < hour_end,
+            ApiUsageLog.method != JOB_USAGE_METHOD
+        ).yield_per(1000)
+
+        groups = {}
+        for row in rows:
+            key = (row.endpoint, row.model_used, row.success)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    'request_count': 0,
+                    'total_processing_time': 0,
+                    'processing_time_count': 0,
+                    'total_file_size': 0,
+                    'sketch': LatencySketch(),
+                }
+            group['request_count'] += 1
+            if row.processing_time is not None:
+                group['total_processing_time'] += row.processing_time
+                group['processing_time_count'] += 1
+                group['sketch'].add(row.processing_time)
+            group['total_file_size'] += row.file_size or 0
+
+        self.db.query(HourlyApiStats).filter(
+            HourlyApiStats.bucket_start == hour_start
+        ).delete(synchronize_session=False)
+
+        for (endpoint, model_used, success), group in groups.items():
+            self.db.add(HourlyApiStats(
+                bucket_start=hour_start,
+                endpoint=endpoint,
+                model_used=model_used,
+                success=success,
+                request_count=group['request_count'],
+                total_processing_time=group['total_processing_time'],
+                processing_time_count=group['processing_time_count'],
+                total_file_size=group['total_file_size'],
+                latency_sketch=group['sketch'].to_dict()
+            ))
@@ -2,11 +2,15 @@
 # 15. core/treatmentplan/generator.py - 處遇計畫生成器
 # ================================
 
+import time
 import logging
 from typing import List, AsyncGenerator
 from core.utils.sse import send_sse_data
 from core.treatmentplan.templates import PromptTemplateManager
 from core.utils.text_converter import text_converter
+from core.utils.metrics import CLAUDE_TTFT_SECONDS, CLAUDE_TOKENS_PER_SECOND
+from core.utils.usage import record_completion
+from core.utils.upstream_limits import upstream_slot
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +18,7 @@ class TreatmentPlanGenerator:
     """報告生成器"""
     
     def __init__(self, claude_client):
+        # anthropic.AsyncAnthropic：串流不再阻塞事件迴圈
         self.claude_client = claude_client
         self.template_manager = PromptTemplateManager()
     
@@ -37,23 +42,56 @@ class TreatmentPlanGenerator:
             full_plan = ""
             current_progress = 30
             
-            with self.claude_client.messages.stream(
-                model="claude-4-sonnet-20250514",
-                max_tokens=4000,
-                temperature=0.3,
-                messages=[{"role": "user", "content": prompt}]
-            ) as stream:
+            # 全主機的 Claude 並發與速率限制（跨 worker 共用），等待時間不計入首 token 延遲
+            async with upstream_slot('claude'):
+                request_started = time.perf_counter()
+                first_token_time = last_token_time = None
+                model = "claude-4-sonnet-20250514"
+                input_usage = None
+                output_tokens = 0
+                async with self.claude_client.messages.stream(
+                    model=model,
+                    max_tokens=4000,
+                    temperature=0.3,
+                    messages=[{"role": "user", "content": prompt}]
+                ) as stream:
                 
-                for event in stream:
-                    if event.type == "content_block_delta":
-                        text_chunk = event.delta.text
-                        full_plan += text_chunk
+                    async for event in stream:
+                        if event.type == "message_start":
+                            # 實際模型與輸入 token（含提示快取）只在 message_start 回報
+                            model = event.message.model or model
+                            input_usage = event.message.usage
                         
-                        current_progress = min(85, current_progress + 0.5)
-                        yield send_sse_data('progress', progress=current_progress, message='生成中...')
+                        elif event.type == "content_block_delta":
+                            last_token_time = time.perf_counter()
+                            if first_token_time is None:
+                                first_token_time = last_token_time
+                                CLAUDE_TTFT_SECONDS.labels(generator='treatment_plan').observe(first_token_time - request_started)
+                            text_chunk = event.delta.text
+                            full_plan += text_chunk
                         
-                    elif event.type == "message_stop":
-                        break
+                            current_progress = min(85, current_progress + 0.5)
+                            yield send_sse_data('progress', progress=current_progress, message='生成中...')
+                        
+                        elif event.type == "message_delta":
+                            output_tokens = event.usage.output_tokens
+                        
+                        elif event.type == "message_stop":
+                            break
+            
+            record_completion(
+                model,
+                getattr(input_usage, 'input_tokens', 0),
+                output_tokens,
+                time.perf_counter() - request_started,
+                cached_tokens=getattr(input_usage, 'cache_read_input_tokens', 0),
+                cache_write_tokens=getattr(input_usage, 'cache_creation_input_tokens', 0)
+            )
+            
+            if first_token_time is not None and output_tokens:
+                generation_seconds = last_token_time - first_token_time
+                if generation_seconds > 0:
+                    CLAUDE_TOKENS_PER_SECOND.labels(generator='treatment_plan').observe(output_tokens / generation_seconds)
             
             # 🔑 轉換為繁體中文
             yield send_sse_data('progress', progress=90, message='轉換為繁體中文...')
@@ -0,0 +1,85 @@
+# ================================
+# 15. core/utils/http_clients.py - 上游 HTTP 連線池
+# ================================
+
+import time
+import asyncio
+import logging
+import importlib.util
+import httpx
+from core.utils.metrics import UPSTREAM_CONNECTION_REQUESTS, UPSTREAM_POOL_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 需要選用依賴 h2（pip install httpx[http2]）
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+def pool_size(max_concurrent: int, default: int = 20) -> int:
+    """
+    連線池大小：與全主機並發上限相同（單一 worker 最多可能用滿所有名額），
+    未限制並發時使用預設值
+    """
+    return max_concurrent if max_concurrent > 0 else default
+
+def _connection_tracer(upstream: str):
+    """
+    建立 httpx 請求事件掛勾，透過 httpcore 的 trace 擴充記錄：
+    - 連線是否重用（請求期間沒有建立 TCP 連線即為重用）
+    - 連線池等待：自送出請求到開始建立連線或送出標頭的時間
+    """
+    async def on_request(request: httpx.Request):
+        started = time.perf_counter()
+        state = {'waited': False, 'connected': False}
+
+        async def trace(event_name: str, info: dict):
+            if event_name.endswith('connect_tcp.started'):
+                state['connected'] = True
+            elif not event_name.endswith('send_request_headers.started'):
+                return
+            if not state['waited']:
+                state['waited'] = True
+                UPSTREAM_POOL_WAIT_SECONDS.labels(upstream=upstream).observe(time.perf_counter() - started)
+            if event_name.endswith('send_request_headers.started'):
+                UPSTREAM_CONNECTION_REQUESTS.labels(
+                    upstream=upstream, connection='new' if state['connected'] else 'reused'
+                ).inc()
+
+        request.extensions['trace'] = trace
+
+    return on_request
+
+def build_http_client(upstream: str, max_connections: int, keepalive_expiry: float = 60,
+                      http2: bool = True, connect_timeout: float = 10, timeout: float = 600) -> httpx.AsyncClient:
+    """建立 SDK 共用的 httpx 連線池（keep-alive、可用時啟用 HTTP/2）"""
+    http2 = http2 and HTTP2_AVAILABLE
+    logger.info(f"🔌 {upstream} 連線池: 最多 {max_connections} 條連線，"
+                f"keep-alive {keepalive_expiry:g} 秒，HTTP/2 {'啟用' if http2 else '停用'}")
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        event_hooks={'request': [_connection_tracer(upstream)]}
+    )
+
+async def warm_up(upstream: str, client: httpx.AsyncClient, base_url, connections: int = 1, timeout: float = 10):
+    """
+    預先建立連線（TCP + TLS），讓第一批請求不必付連線成本
+
+    送出不帶驗證的 HEAD 請求，回應狀態碼不重要；失敗只記錄警告。
+    """
+    if connections <= 0:
+        return
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(client.head(str(base_url), timeout=timeout) for _ in range(connections)),
+        return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.warning(f"⚠️ {upstream} 連線預熱失敗: {errors[0]}")
+    else:
+        logger.info(f"🔥 {upstream} 已預熱 {connections} 條連線（{time.perf_counter() - started:.2f} 秒）")
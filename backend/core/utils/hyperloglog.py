@@ -0,0 +1,80 @@
+# ================================
+# 10. core/utils/hyperloglog.py - HyperLogLog 基數估計
+# ================================
+
+import math
+import zlib
+import hashlib
+from typing import Iterable
+
+DEFAULT_PRECISION = 14
+
+class HyperLogLog:
+    """
+    HyperLogLog 不重複值估計
+
+    使用 2^precision 個暫存器與 64 位元雜湊。預設 precision=14（16384 個暫存器，
+    未壓縮 16KB），標準誤差為 1.04 / sqrt(2^14) ≈ 0.81%，約 95% 的估計落在
+    ±1.6% 之內。小基數時改用 linear counting，誤差更小。
+    合併只需逐一取暫存器最大值，因此每日草圖可合併成任意日期範圍的估計。
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision 必須介於 4 與 18 之間")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    @property
+    def standard_error(self) -> float:
+        """相對標準誤差"""
+        return 1.04 / math.sqrt(self.m)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def add(self, value: str):
+        hashed = self._hash(value)
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        # 剩餘位元中第一個 1 的位置（從 1 起算）
+        rank = remaining_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add_all(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("無法合併精度不同的 HyperLogLog")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self) -> int:
+        """估計不重複值數量"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw_estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+
+        zeros = self.registers.count(0)
+        if raw_estimate <= 2.5 * m and zeros:
+            # 小基數：linear counting
+            return round(m * math.log(m / zeros))
+        return round(raw_estimate)
+
+    def to_bytes(self) -> bytes:
+        """序列化（首位元組為 precision，其餘為壓縮後的暫存器）"""
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        hll = cls(data[0])
+        registers = zlib.decompress(data[1:])
+        if len(registers) != hll.m:
+            raise ValueError("HyperLogLog 資料長度不符")
+        hll.registers = bytearray(registers)
+        return hll
@@ -0,0 +1,54 @@
+# ================================
+# 6. core/utils/json_codec.py - JSON 編解碼與請求內容快取
+# ================================
+
+import json
+import logging
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用依賴，未安裝時退回標準庫
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# 解析後的請求 JSON 存放在 request scope 的 state 中，供中間件與端點共用
+REQUEST_JSON_STATE_KEY = 'parsed_json_body'
+
+def loads(data) -> Any:
+    """解析 JSON（優先使用 orjson）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """序列化為緊湊 JSON 字串，保留非 ASCII 字元"""
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys)
+
+async def get_request_json(request) -> Any:
+    """讀取並解析請求 JSON，每個請求只解析一次
+
+    結果快取在 request.scope['state'] 中，同一請求的中間件與端點
+    （即使各自建立 Request 物件）都能直接取用。
+    """
+    state = request.scope.setdefault('state', {})
+    if REQUEST_JSON_STATE_KEY in state:
+        return state[REQUEST_JSON_STATE_KEY]
+
+    body = await request.body()
+    data = loads(body) if body else None
+    state[REQUEST_JSON_STATE_KEY] = data
+    return data
+
+def get_cached_request_json(scope) -> tuple:
+    """從 scope 取出已解析的請求 JSON，返回 (是否存在, 內容)"""
+    state = scope.get('state') or {}
+    if REQUEST_JSON_STATE_KEY in state:
+        return True, state[REQUEST_JSON_STATE_KEY]
+    return False, None
@@ -0,0 +1,104 @@
+# ================================
+# 9. core/utils/latency_sketch.py - 可合併的延遲分位數草圖
+# ================================
+
+import math
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+class LatencySketch:
+    """
+    對數分桶的延遲直方圖（HDR / DDSketch 式）
+
+    每個桶涵蓋 (gamma^(i-1), gamma^i]，gamma = (1 + α) / (1 - α)，
+    分位數估計的相對誤差不超過 α（預設 1%）。桶計數可直接相加，
+    因此每小時的草圖可合併成任意時間範圍的分位數，不需排序原始記錄。
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy 必須介於 0 與 1 之間")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, weight: int = 1):
+        """加入一個延遲值（毫秒）"""
+        if value is None:
+            return
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + weight
+        self.count += weight
+
+    def add_all(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def add_bucket(self, index: Optional[int], bucket_count: int):
+        """
+        直接加入一個桶的計數，供資料庫已依桶索引 GROUP BY 計數的查詢使用
+        （見 core.utils.sql_functions.latency_bucket_index）；index 為 None 表示 <= 0 的值
+        """
+        if index is None:
+            self.zero_count += bucket_count
+        else:
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        self.count += bucket_count
+
+    def merge(self, other: "LatencySketch"):
+        """合併另一個草圖（兩者精度必須相同）"""
+        if not math.isclose(self.relative_accuracy, other.relative_accuracy):
+            raise ValueError("無法合併精度不同的草圖")
+        for index, bucket_count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """估計第 q 分位數，沒有資料時返回 None"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # 桶的代表值，確保相對誤差不超過 α
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def percentiles(self, quantiles=DEFAULT_QUANTILES) -> Dict[str, Optional[float]]:
+        """返回 {'p50': ..., 'p90': ..., ...}"""
+        result = {}
+        for q in quantiles:
+            value = self.quantile(q)
+            result[f"p{q * 100:g}"] = round(value, 2) if value is not None else None
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化為 JSON 可存放的格式"""
+        return {
+            'a': self.relative_accuracy,
+            'n': self.count,
+            'z': self.zero_count,
+            'b': {str(index): bucket_count for index, bucket_count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        sketch = cls(data.get('a', DEFAULT_RELATIVE_ACCURACY))
+        sketch.count = data.get('n', 0)
+        sketch.zero_count = data.get('z', 0)
+        sketch.buckets = {int(index): bucket_count for index, bucket_count in data.get('b', {}).items()}
+        return sketch
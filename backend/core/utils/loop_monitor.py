@@ -0,0 +1,41 @@
+# ================================
+# 12. core/utils/loop_monitor.py - 事件迴圈延遲監控
+# ================================
+
+import asyncio
+import logging
+from core.utils.metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS, EVENT_LOOP_STALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 超過此延遲時另外記錄警告日誌
+STALL_WARNING_SECONDS = 1.0
+
+async def monitor_event_loop(interval: float = 0.1, stall_threshold: float = 0.1):
+    """
+    週期性 sleep 並量測實際喚醒時間超出預期的部分
+
+    同步的 pydub / OpenCC / 資料庫呼叫佔住事件迴圈時，延遲會直接反映在這裡；
+    超過門檻的延遲累計為停頓次數與秒數。
+    """
+    loop = asyncio.get_running_loop()
+    stalls = 0
+    stall_seconds = 0.0
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+        if lag < stall_threshold:
+            continue
+
+        stalls += 1
+        stall_seconds += lag
+        EVENT_LOOP_STALLS.set(stalls)
+        EVENT_LOOP_STALL_SECONDS.set(stall_seconds)
+        if lag >= STALL_WARNING_SECONDS:
+            logger.warning(f"🐢 事件迴圈停頓 {lag:.2f} 秒")
+
+def start_loop_monitor(interval: float = 0.1, stall_threshold: float = 0.1) -> asyncio.Task:
+    """啟動監控任務，返回 task 供關閉時取消"""
+    return asyncio.create_task(monitor_event_loop(interval, stall_threshold), name='event_loop_monitor')
@@ -0,0 +1,175 @@
+# ================================
+# 10. core/utils/metrics.py - Prometheus 指標
+# ================================
+
+import os
+import logging
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import (
+        Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+    )
+    from prometheus_client import multiprocess
+except ImportError:  # 選用依賴，未安裝時所有指標皆為空操作
+    Counter = Gauge = Histogram = None
+
+logger = logging.getLogger(__name__)
+
+class _NoopMetric:
+    """未安裝 prometheus_client 時的替代品，介面與 Counter / Gauge / Histogram 相同"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def observe(self, amount: float):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    @contextmanager
+    def time(self):
+        yield
+
+def _counter(name: str, documentation: str, labelnames=()):
+    if Counter is None:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+def _gauge(name: str, documentation: str, labelnames=(), multiprocess_mode: str = 'all'):
+    if Gauge is None:
+        return _NoopMetric()
+    return Gauge(name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+def _histogram(name: str, documentation: str, labelnames=(), buckets=None):
+    if Histogram is None:
+        return _NoopMetric()
+    if buckets is None:
+        return Histogram(name, documentation, labelnames)
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+# 音檔處理階段（秒）
+AUDIO_STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+# Whisper 單段延遲（秒）
+WHISPER_BUCKETS = (1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180)
+# 上傳位元組
+BYTES_BUCKETS = (64 * 1024, 256 * 1024, 1024 ** 2, 2 * 1024 ** 2, 4 * 1024 ** 2, 8 * 1024 ** 2,
+                 16 * 1024 ** 2, 25 * 1024 ** 2)
+# 連線池等待（秒）
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+AUDIO_PROBE_SECONDS = _histogram(
+    'audio_probe_seconds', 'AudioProcessor 取得音檔資訊耗時', buckets=AUDIO_STAGE_BUCKETS
+)
+AUDIO_COMPRESS_SECONDS = _histogram(
+    'audio_compress_seconds', 'AudioProcessor 壓縮耗時', ('mode',), buckets=AUDIO_STAGE_BUCKETS
+)
+AUDIO_SPLIT_SECONDS = _histogram(
+    'audio_split_seconds', 'AudioSplitter 分割耗時', ('strategy',), buckets=AUDIO_STAGE_BUCKETS
+)
+WHISPER_CHUNK_SECONDS = _histogram(
+    'whisper_chunk_seconds', '單一分段 Whisper 請求耗時', ('outcome',), buckets=WHISPER_BUCKETS
+)
+WHISPER_CHUNK_BYTES = _histogram(
+    'whisper_chunk_bytes', '送往 Whisper 的分段大小', buckets=BYTES_BUCKETS
+)
+RETRIES_TOTAL = _counter(
+    'retries_total', 'simple_retry 的重試次數', ('operation', 'reason')
+)
+CLAUDE_TTFT_SECONDS = _histogram(
+    'claude_time_to_first_token_seconds', 'Claude 串流首個 token 時間', ('generator',),
+    buckets=(0.25, 0.5, 1, 1.5, 2, 3, 5, 8, 13, 20, 30)
+)
+CLAUDE_TOKENS_PER_SECOND = _histogram(
+    'claude_output_tokens_per_second', 'Claude 串流輸出速度（首 token 之後）', ('generator',),
+    buckets=(5, 10, 20, 30, 40, 50, 60, 80, 100, 150, 200)
+)
+OPENCC_CONVERT_SECONDS = _histogram(
+    'opencc_convert_seconds', 'OpenCC 繁體轉換耗時',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+SSE_FRAMES_TOTAL = _counter(
+    'sse_frames_total', '送出的 SSE 幀數', ('type',)
+)
+DB_POOL_CHECKOUT_SECONDS = _histogram(
+    'db_pool_checkout_seconds', '自連線池取得連線的等待時間（含建立新連線）', ('pool',),
+    buckets=POOL_WAIT_BUCKETS
+)
+
+# 背景工作（秒）
+JOB_QUEUE_WAIT_SECONDS = _histogram(
+    'job_queue_wait_seconds', '工作自入列到開始執行的等待時間', ('kind',), buckets=AUDIO_STAGE_BUCKETS
+)
+JOB_RUN_SECONDS = _histogram(
+    'job_run_seconds', '工作執行時間', ('kind', 'status'), buckets=AUDIO_STAGE_BUCKETS
+)
+
+# 全主機上游呼叫限制的等待時間（秒）
+UPSTREAM_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+UPSTREAM_LIMIT_WAIT_SECONDS = _histogram(
+    'upstream_limit_wait_seconds', '等待全主機上游呼叫名額的時間', ('upstream', 'limit'),
+    buckets=UPSTREAM_WAIT_BUCKETS
+)
+# livesum：加總所有存活 worker，即全主機進行中的上游呼叫數
+UPSTREAM_IN_FLIGHT = _gauge(
+    'upstream_in_flight', '進行中的上游呼叫數', ('upstream',), multiprocess_mode='livesum'
+)
+
+# 上游 HTTP 連線池；連線重用率 = rate(...{connection="reused"}) / rate(...)
+UPSTREAM_CONNECTION_REQUESTS = _counter(
+    'upstream_connection_requests_total', '上游 HTTP 請求數（依是否重用連線）', ('upstream', 'connection')
+)
+UPSTREAM_POOL_WAIT_SECONDS = _histogram(
+    'upstream_pool_wait_seconds', '自上游連線池取得連線的等待時間（含建立新連線前的排隊）', ('upstream',),
+    buckets=POOL_WAIT_BUCKETS
+)
+
+# 記錄表預設分區中的筆數（> 0 表示月分區未預建，應發出告警）；每個 worker 各自檢查，取存活者最大值
+LOG_DEFAULT_PARTITION_ROWS = _gauge(
+    'api_usage_logs_default_partition_rows', 'api_usage_logs 預設分區中的記錄數（上限 100000）',
+    multiprocess_mode='livemax'
+)
+
+# 事件迴圈延遲（秒）
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+EVENT_LOOP_LAG_SECONDS = _histogram(
+    'event_loop_lag_seconds', '事件迴圈排程延遲（sleep 超出預期的時間）', buckets=LOOP_LAG_BUCKETS
+)
+# 多行程模式下 Gauge 依 pid 分開輸出，可看出個別 worker 的停頓
+EVENT_LOOP_STALLS = _gauge(
+    'event_loop_stalls', '事件迴圈延遲超過門檻的累計次數（每個 worker）'
+)
+EVENT_LOOP_STALL_SECONDS = _gauge(
+    'event_loop_stall_seconds', '事件迴圈延遲超過門檻的累計秒數（每個 worker）'
+)
+
+def render_metrics() -> tuple:
+    """
+    輸出 Prometheus 文字格式，返回 (內容, Content-Type)
+
+    設定 PROMETHEUS_MULTIPROC_DIR 時彙整所有 worker 寫入的指標檔，
+    否則只輸出本行程的指標。
+    """
+    if Counter is None:
+        return b'# prometheus_client not installed\n', 'text/plain; version=0.0.4; charset=utf-8'
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_worker_dead(pid: int):
+    """worker 結束時清除其即時指標檔"""
+    if Counter is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,103 @@
+# ================================
+# 7. core/utils/payload_policy.py - 請求內容記錄策略
+# ================================
+
+import zlib
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from core.utils.json_codec import dumps as json_dumps, loads as json_loads
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_VERSION = 1
+PAYLOAD_ENCODING = 'zlib'
+
+def canonical_bytes(data: Any) -> bytes:
+    """以排序鍵序列化，確保相同內容得到相同雜湊"""
+    return json_dumps(data, sort_keys=True).encode('utf-8')
+
+def summarize_payload(data: Any, max_section_items: int = 50) -> Optional[Dict[str, Any]]:
+    """
+    產生 data_payload 摘要，取代完整請求內容
+
+    Returns:
+        {
+            'v': 摘要格式版本,
+            'sha256': 完整內容雜湊,
+            'bytes': 完整內容位元組數,
+            'fields': {欄位: 字串長度 / 列表項數 / 物件鍵數},
+            'sections': {欄位: 字串列表}  # 例如 selectedSections
+        }
+    """
+    if data is None:
+        return None
+
+    raw = canonical_bytes(data)
+    summary = {
+        'v': SUMMARY_VERSION,
+        'sha256': hashlib.sha256(raw).hexdigest(),
+        'bytes': len(raw),
+    }
+
+    if not isinstance(data, dict):
+        return summary
+
+    fields = {}
+    sections = {}
+    for key, value in data.items():
+        if isinstance(value, (str, list, dict)):
+            fields[key] = len(value)
+        else:
+            fields[key] = value
+
+        # 章節 / 服務領域等短字串列表直接保留，供統計使用
+        if isinstance(value, list) and all(isinstance(item, str) and len(item) <= 100 for item in value):
+            sections[key] = value[:max_section_items]
+
+    summary['fields'] = fields
+    if sections:
+        summary['sections'] = sections
+    return summary
+
+def is_summary(data: Any) -> bool:
+    """判斷 data_payload 是否已是摘要格式"""
+    return isinstance(data, dict) and data.get('v') == SUMMARY_VERSION and 'sha256' in data
+
+def compress_payload(data: Any) -> tuple:
+    """壓縮完整請求內容，返回 (壓縮內容, 原始位元組數)"""
+    raw = canonical_bytes(data)
+    return zlib.compress(raw, 6), len(raw)
+
+def decompress_payload(blob: bytes, encoding: str = PAYLOAD_ENCODING) -> Any:
+    """還原完整請求內容"""
+    if encoding != PAYLOAD_ENCODING:
+        raise ValueError(f"不支援的內容編碼: {encoding}")
+    return json_loads(zlib.decompress(blob))
+
+def _try_purge_lock(db) -> bool:
+    """多個 worker 同時執行時，只讓一個進行清除（PostgreSQL advisory lock）"""
+    if db.bind.dialect.name != 'postgresql':
+        return True
+    from sqlalchemy import text
+
+    lock_key = zlib.crc32(b'api_usage_payloads_purge')
+    return bool(db.execute(text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': lock_key}).scalar())
+
+def purge_expired_payloads(db, retention_days: int) -> int:
+    """刪除超過保留期限的完整請求內容"""
+    from models.api_usage_payload import ApiUsagePayload
+
+    if not _try_purge_lock(db):
+        logger.info("⏭️ 其他 worker 正在清除完整請求內容，跳過")
+        return 0
+
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    deleted = db.query(ApiUsagePayload).filter(
+        ApiUsagePayload.created_at < cutoff
+    ).delete(synchronize_session=False)
+
+    if deleted:
+        logger.info(f"🗑️ 已清除 {deleted} 筆過期的完整請求內容")
+    return deleted
@@ -5,9 +5,17 @@
 import asyncio
 import logging
 from typing import Callable, Any
+from core.utils.metrics import RETRIES_TOTAL
+from core.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+async def _backoff(operation: str, reason: str, wait_time: float):
+    """重試前等待，並記錄重試指標與追蹤區段"""
+    RETRIES_TOTAL.labels(operation=operation, reason=reason).inc()
+    with span('retry.backoff', operation=operation, reason=reason, seconds=wait_time):
+        await asyncio.sleep(wait_time)
+
 async def simple_retry(
     func: Callable,
     *args,
@@ -17,10 +25,12 @@ async def simple_retry(
 ) -> Any:
     """簡單的重試機制"""
     last_error = None
+    operation = getattr(func, '__name__', 'unknown')
     
     for attempt in range(max_retries):
         try:
-            return await func(*args, **kwargs)
+            with span('retry.attempt', operation=operation, attempt=attempt + 1, max_retries=max_retries):
+                return await func(*args, **kwargs)
         except Exception as e:
             last_error = e
             error_str = str(e)
@@ -30,7 +40,7 @@ async def simple_retry(
                 if attempt < max_retries - 1:
                     wait_time = backoff_base ** attempt
                     logger.info(f"🔄 502 錯誤，{wait_time} 秒後重試...")
-                    await asyncio.sleep(wait_time)
+                    await _backoff(operation, 'bad_gateway', wait_time)
                     continue
             elif "413" in error_str or "too large" in error_str.lower():
                 logger.error(f"💥 檔案過大，跳過重試")
@@ -38,12 +48,12 @@ async def simple_retry(
             elif "timeout" in error_str.lower():
                 if attempt < max_retries - 1:
                     logger.info(f"⏰ 請求超時，重試...")
-                    await asyncio.sleep(3)
+                    await _backoff(operation, 'timeout', 3)
                     continue
             
             # 其他錯誤，短暫等待後重試
             if attempt < max_retries - 1:
-                await asyncio.sleep(1)
+                await _backoff(operation, 'other', 1)
                 continue
     
     # 所有重試都失敗
@@ -0,0 +1,89 @@
+# ================================
+# 16. core/utils/sql_functions.py - 跨資料庫的 SQL 函式
+# ================================
+
+import math
+from sqlalchemy import DateTime, Float, Integer, String, case, cast, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from core.utils.latency_sketch import DEFAULT_RELATIVE_ACCURACY
+
+# SQLite 沒有 date_trunc，改以 strftime 產生同格式的時間字串
+SQLITE_TRUNCATE_FORMATS = {
+    'minute': '%Y-%m-%d %H:%M:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+}
+
+class truncate_timestamp(FunctionElement):
+    """
+    時間欄位向下取整到分鐘 / 小時 / 日
+
+    PostgreSQL 編譯為 date_trunc，SQLite（本機測試）編譯為 strftime，
+    兩者結果皆為 DateTime。
+    """
+
+    type = DateTime()
+    name = 'truncate_timestamp'
+    inherit_cache = True
+    # 時間單位納入快取鍵，不同單位不會共用已編譯的 SQL
+    _traverse_internals = FunctionElement._traverse_internals + [('unit', InternalTraversal.dp_string)]
+
+    def __init__(self, unit: str, column):
+        if unit not in SQLITE_TRUNCATE_FORMATS:
+            raise ValueError(f"不支援的時間單位: {unit}")
+        self.unit = unit
+        super().__init__(column)
+
+@compiles(truncate_timestamp)
+def _compile_truncate_timestamp(element, compiler, **kw):
+    column, = element.clauses
+    return f"date_trunc('{element.unit}', {compiler.process(column, **kw)})"
+
+@compiles(truncate_timestamp, 'sqlite')
+def _compile_truncate_timestamp_sqlite(element, compiler, **kw):
+    column, = element.clauses
+    return f"strftime('{SQLITE_TRUNCATE_FORMATS[element.unit]}', {compiler.process(column, **kw)})"
+
+class byte_order_prefix(FunctionElement):
+    """
+    字串的前 N 個字元，以位元組順序比較（前綴範圍查詢用）
+
+    PostgreSQL 編譯為 left(col, N) COLLATE "C"，與錯誤訊息前綴索引的運算式相同才能使用索引；
+    SQLite 沒有 left()，編譯為 substr(col, 1, N)，其預設 BINARY 排序本來就是位元組順序。
+    N 直接寫入 SQL 而非參數綁定，預備語句的通用計畫才能對上索引運算式。
+    """
+
+    type = String()
+    name = 'byte_order_prefix'
+    inherit_cache = True
+    _traverse_internals = FunctionElement._traverse_internals + [('length', InternalTraversal.dp_plain_obj)]
+
+    def __init__(self, column, length: int):
+        self.length = int(length)
+        super().__init__(column)
+
+@compiles(byte_order_prefix)
+def _compile_byte_order_prefix(element, compiler, **kw):
+    column, = element.clauses
+    return f'left({compiler.process(column, **kw)}, {element.length}) COLLATE "C"'
+
+@compiles(byte_order_prefix, 'sqlite')
+def _compile_byte_order_prefix_sqlite(element, compiler, **kw):
+    column, = element.clauses
+    return f"substr({compiler.process(column, **kw)}, 1, {element.length})"
+
+def latency_bucket_index(column, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+    """
+    LatencySketch 的對數桶索引 ceil(ln(x) / ln(gamma))，x <= 0 時為 NULL
+
+    依此索引 GROUP BY 計數後以 LatencySketch.add_bucket 合併，
+    資料庫只需傳回每個桶一列，不必把每筆延遲值送到 Python。
+    SQLite 需 3.35 以上且啟用數學函式（官方發行版預設啟用）。
+    """
+    log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+    return case(
+        (column > 0, cast(func.ceil(func.ln(cast(column, Float)) / log_gamma), Integer)),
+        else_=None
+    )
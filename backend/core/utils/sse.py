@@ -5,6 +5,8 @@
 import json
 import time
 import logging
+from core.utils.metrics import SSE_FRAMES_TOTAL
+from core.utils.json_codec import loads as json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,7 @@ def send_sse_data(data_type: str, **kwargs) -> str:
     try:
         json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
         sse_message = f"data: {json_str}\n\n"
+        SSE_FRAMES_TOTAL.labels(type=data_type).inc()
         
         if data_type in ['progress', 'complete', 'error']:
             logger.debug(f"📤 發送 SSE: {data_type} - {data.get('progress', 0)}% - {data.get('message', '')}")
@@ -32,4 +35,45 @@ def send_sse_data(data_type: str, **kwargs) -> str:
             'error': f'服務器內部錯誤: {str(e)}',
             'timestamp': time.time()
         }
-        return f"data: {json.dumps(error_data)}\n\n"
\ No newline at end of file
+        SSE_FRAMES_TOTAL.labels(type='error').inc()
+        return f"data: {json.dumps(error_data)}\n\n"
+# 未完成幀的暫存上限；超過時捨棄該幀（最後的 complete / error 事件都很短）
+SSE_MAX_PENDING_BYTES = 64 * 1024
+
+class SSEEventTracker:
+    """
+    追蹤 SSE 回應最後一個完整資料幀的頂層 type
+
+    回應內容可能在任意位置被切成多個 body 訊息，未以空行結束的部分暫存到
+    下一個訊息；每批只解析最後一個完整幀的 data: JSON，巢狀欄位中的 type 不受影響。
+    """
+
+    def __init__(self, max_pending_bytes: int = SSE_MAX_PENDING_BYTES):
+        self.max_pending_bytes = max_pending_bytes
+        self.pending = b''
+        self.final_event_type = None
+
+    def feed(self, chunk: bytes):
+        """加入一段回應內容"""
+        *frames, self.pending = (self.pending + chunk).replace(b'\r\n', b'\n').split(b'\n\n')
+        if len(self.pending) > self.max_pending_bytes:
+            self.pending = b''
+
+        for frame in reversed(frames):
+            event_type = parse_event_type(frame)
+            if event_type is not None:
+                self.final_event_type = event_type
+                return
+
+def parse_event_type(frame: bytes):
+    """取出單一 SSE 幀 data: JSON 的頂層 type；非資料幀或格式不符返回 None"""
+    data_lines = [line[5:] for line in frame.split(b'\n') if line.startswith(b'data:')]
+    if not data_lines:
+        return None
+    payload = b'\n'.join(line[1:] if line.startswith(b' ') else line for line in data_lines)
+    try:
+        data = json_loads(payload)
+    except ValueError:
+        return None
+    event_type = data.get('type') if isinstance(data, dict) else None
+    return event_type if isinstance(event_type, str) else None
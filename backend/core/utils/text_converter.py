@@ -5,6 +5,7 @@
 import opencc
 import logging
 from typing import Optional
+from core.utils.metrics import OPENCC_CONVERT_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +53,8 @@ class TextConverter:
                 return text
             
             # 執行轉換
-            converted_text = self._converter.convert(text)
+            with OPENCC_CONVERT_SECONDS.time():
+                converted_text = self._converter.convert(text)
             
             if converted_text != text:
                 logger.info(f"🔄 文字轉換: {len(text)} 字 -> {len(converted_text)} 字")
@@ -0,0 +1,278 @@
+# ================================
+# 11. core/utils/tracing.py - 請求追蹤
+# ================================
+
+import os
+import time
+import uuid
+import json
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows：輪替時不跨行程加鎖
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 寫入執行緒的結束訊號與每批最多寫入的追蹤數
+_STOP = object()
+WRITE_BATCH_SIZE = 200
+
+class Span:
+    """單一追蹤區段"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start_time',
+                 '_started', 'duration_ms', 'attributes', 'status', 'error')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: Any):
+        self.status = 'error'
+        self.error = str(error)
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_time': self.start_time,
+            'duration_ms': self.duration_ms,
+            'attributes': self.attributes,
+            'status': self.status,
+            'error': self.error,
+        }
+
+class TraceExporter:
+    """
+    本機追蹤輸出：保留最近 max_traces 筆完整追蹤於記憶體，
+    並可逐筆附加到 JSONL 檔（每行一個追蹤），不需外部收集器
+
+    檔案寫入由背景執行緒批次處理，區段結束時只放入佇列，不在事件迴圈上做 I/O。
+    檔案超過 max_bytes 時輪替為 .1 ~ .N（保留 backup_count 份），
+    多個 worker 共用同一檔案時以旁邊的 .lock 檔序列化輪替。
+    """
+
+    def __init__(self, max_traces: int = 200, export_path: Optional[str] = None,
+                 max_bytes: int = 50 * 1024 * 1024, backup_count: int = 3):
+        self.max_traces = max_traces
+        self.export_path = export_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._open_spans: Dict[str, List[Dict[str, Any]]] = {}
+        self._traces: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    def on_end(self, span: Span):
+        """區段結束；根區段結束時整筆追蹤完成"""
+        with self._lock:
+            spans = self._open_spans.setdefault(span.trace_id, [])
+            spans.append(span.to_dict())
+            if span.parent_id is not None:
+                # 根區段已結束後才結束的孤兒區段不會被收集，限制暫存數量
+                while len(self._open_spans) > self.max_traces * 4:
+                    self._open_spans.pop(next(iter(self._open_spans)))
+                return
+            del self._open_spans[span.trace_id]
+            trace = {
+                'trace_id': span.trace_id,
+                'name': span.name,
+                'start_time': span.start_time,
+                'duration_ms': span.duration_ms,
+                'status': span.status,
+                'pid': os.getpid(),
+                'spans': sorted(spans, key=lambda item: item['start_time']),
+            }
+            self._traces[span.trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+            if self.export_path:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='trace-exporter', daemon=True)
+                    self._writer.start()
+                self._queue.put(trace)
+
+    # ---------- 檔案輸出（背景執行緒） ----------
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            traces = [item for item in batch if item is not _STOP]
+            if traces:
+                try:
+                    self._append(''.join(
+                        json.dumps(trace, ensure_ascii=False, default=str) + '\n' for trace in traces
+                    ))
+                except OSError as e:
+                    logger.error(f"❌ 寫入追蹤檔失敗: {e}")
+            if stop:
+                return
+
+    def _append(self, text: str):
+        lock_fd = None
+        if fcntl is not None:
+            lock_fd = os.open(self.export_path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            if self.max_bytes > 0 and self._file_size(self.export_path) >= self.max_bytes:
+                self._rotate()
+            with open(self.export_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+        finally:
+            if lock_fd is not None:
+                os.close(lock_fd)  # 關閉描述符同時釋放 flock
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _rotate(self):
+        """trace.jsonl -> .1 -> .2 ...，超過 backup_count 的最舊檔案刪除"""
+        if self.backup_count <= 0:
+            os.remove(self.export_path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.export_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.export_path}.{index + 1}")
+        os.replace(self.export_path, f"{self.export_path}.1")
+        logger.info(f"🔄 追蹤檔已輪替: {self.export_path}")
+
+    def close(self, timeout: float = 5):
+        """寫完佇列中的追蹤後停止寫入執行緒（關閉時呼叫）"""
+        writer = self._writer
+        if writer is None:
+            return
+        self._queue.put(_STOP)
+        writer.join(timeout)
+        self._writer = None
+
+    # ---------- 查詢 ----------
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近完成的追蹤摘要（新到舊）"""
+        with self._lock:
+            traces = list(self._traces.values())[-limit:]
+        return [
+            {
+                **{key: trace[key] for key in ('trace_id', 'name', 'start_time', 'duration_ms', 'status', 'pid')},
+                'span_count': len(trace['spans'])
+            }
+            for trace in reversed(traces)
+        ]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取得完整追蹤；本 worker 記憶體中沒有時改從 JSONL 檔（含輪替檔，新到舊）尋找
+
+        讀檔為阻塞 I/O，非同步呼叫端應以 asyncio.to_thread 執行。
+        """
+        with self._lock:
+            trace = self._traces.get(trace_id)
+        if trace is not None or not self.export_path:
+            return trace
+        paths = [self.export_path] + [f"{self.export_path}.{index}" for index in range(1, self.backup_count + 1)]
+        for path in paths:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        if trace_id in line:
+                            candidate = json.loads(line)
+                            if candidate.get('trace_id') == trace_id:
+                                trace = candidate
+            except FileNotFoundError:
+                continue
+            if trace is not None:
+                return trace
+        return None
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+_exporter = TraceExporter()
+
+def configure_tracing(max_traces: int = 200, export_path: Optional[str] = None,
+                      max_bytes: int = 50 * 1024 * 1024, backup_count: int = 3) -> TraceExporter:
+    """依設定重建輸出器（啟動時呼叫）"""
+    global _exporter
+    _exporter.close()
+    _exporter = TraceExporter(max_traces, export_path, max_bytes, backup_count)
+    if export_path:
+        logger.info(f"🧭 追蹤輸出至 {export_path}（超過 {max_bytes // (1024 * 1024)} MB 輪替，保留 {backup_count} 份）")
+    return _exporter
+
+def get_exporter() -> TraceExporter:
+    return _exporter
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def current_trace_id() -> Optional[str]:
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes):
+    """
+    開啟追蹤區段；沒有上層區段時即為新追蹤的根區段
+
+    區段以 contextvar 傳遞，asyncio.gather 建立的子任務與 asyncio.to_thread
+    都會繼承目前的區段，例外會記錄在區段上後照常拋出。
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id = parent.trace_id
+    elif trace_id is None:
+        trace_id = new_trace_id()
+
+    active = Span(name, trace_id, parent.span_id if parent else None, attributes)
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.set_error(e if str(e) else type(e).__name__)
+        raise
+    finally:
+        active.finish()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # 非同步產生器在不同 context 結束時無法 reset，直接還原為上層
+            _current_span.set(parent)
+        _exporter.on_end(active)
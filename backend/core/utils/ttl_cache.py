@@ -0,0 +1,66 @@
+# ================================
+# 8. core/utils/ttl_cache.py - TTL 結果快取
+# ================================
+
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from core.utils.json_codec import dumps as json_dumps
+
+logger = logging.getLogger(__name__)
+
+class CacheEntry:
+    """快取項目：結果、ETag 與到期時間（None 表示不會過期）"""
+
+    __slots__ = ('value', 'etag', 'expires_at')
+
+    def __init__(self, value: Any, etag: str, expires_at: Optional[float]):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+    def is_expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+    def remaining_seconds(self, now: float) -> Optional[int]:
+        """距離到期的整秒數（不小於 0）；不會過期則為 None"""
+        if self.expires_at is None:
+            return None
+        return max(0, int(self.expires_at - now))
+
+def compute_etag(value: Any) -> str:
+    """以內容雜湊產生 ETag，內容不變則 ETag 不變"""
+    digest = hashlib.sha1(json_dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+class TTLCache:
+    """進程內 LRU + TTL 快取（每個 worker 各自一份）"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.is_expired(time.monotonic()):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float]) -> CacheEntry:
+        """寫入快取；ttl 為 None 表示結果不可變，只會被 LRU 淘汰"""
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        entry = CacheEntry(value, compute_etag(value), expires_at)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,166 @@
+# ================================
+# 14. core/utils/upstream_limits.py - 跨 worker 上游呼叫限制
+# ================================
+
+import os
+import time
+import errno
+import struct
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from core.utils.metrics import UPSTREAM_LIMIT_WAIT_SECONDS, UPSTREAM_IN_FLIGHT
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 flock，限制停用
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 等待名額 / token 時的輪詢間隔上下限（秒）
+MIN_POLL_SECONDS = 0.01
+MAX_POLL_SECONDS = 0.25
+
+# token bucket 狀態：目前 token 數、上次補充時間（time.time()）
+BUCKET_STATE = struct.Struct('dd')
+
+class UpstreamLimiter:
+    """
+    同一主機所有 worker 共用的上游呼叫限制
+
+    - 並發上限：max_concurrent 個名額檔，以非阻塞 flock 取得其一；
+      行程結束時鎖由核心釋放，不會因 worker 當掉而遺失名額
+    - 速率上限：token bucket 狀態存在檔案中，每次存取先以非阻塞 flock 取得獨佔鎖，
+      鎖被其他 worker 持有時交回事件迴圈稍後重試，不會阻塞迴圈
+
+    目錄建議放在本機檔案系統（/tmp），NFS 上的 flock 行為不可靠。
+    """
+
+    def __init__(self, name: str, directory: str, max_concurrent: int = 0,
+                 requests_per_minute: float = 0, burst: Optional[int] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.rate = requests_per_minute / 60
+        self.burst = burst or max(1, max_concurrent)
+        os.makedirs(directory, exist_ok=True)
+        self.slot_paths = [os.path.join(directory, f"{name}.slot{index}") for index in range(max_concurrent)]
+        self.bucket_path = os.path.join(directory, f"{name}.bucket")
+
+    def _try_acquire_slot(self) -> Optional[int]:
+        """嘗試取得任一名額，返回持有鎖的檔案描述符"""
+        for path in self.slot_paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError as e:
+                os.close(fd)
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+        return None
+
+    @staticmethod
+    def _release_slot(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _try_take_token(self) -> float:
+        """取得一個 token 並返回 0；不足或狀態檔正被其他 worker 使用時返回需等待的秒數"""
+        fd = os.open(self.bucket_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                return MIN_POLL_SECONDS
+            now = time.time()
+            data = os.pread(fd, BUCKET_STATE.size, 0)
+            tokens, updated = BUCKET_STATE.unpack(data) if len(data) == BUCKET_STATE.size else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            os.pwrite(fd, BUCKET_STATE.pack(tokens, now), 0)
+            return wait
+        finally:
+            os.close(fd)  # 關閉描述符同時釋放 flock
+
+    async def _wait_for_slot(self) -> int:
+        poll = MIN_POLL_SECONDS
+        while True:
+            fd = self._try_acquire_slot()
+            if fd is not None:
+                return fd
+            await asyncio.sleep(poll)
+            poll = min(poll * 2, MAX_POLL_SECONDS)
+
+    async def _wait_for_token(self):
+        while True:
+            wait = self._try_take_token()
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(max(wait, MIN_POLL_SECONDS), MAX_POLL_SECONDS))
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        取得一次呼叫的名額（先取並發名額，再取速率 token），yield 總等待秒數
+        """
+        fd = None
+        started = time.perf_counter()
+        if self.max_concurrent > 0:
+            fd = await self._wait_for_slot()
+        slot_acquired = time.perf_counter()
+        UPSTREAM_LIMIT_WAIT_SECONDS.labels(upstream=self.name, limit='concurrency').observe(slot_acquired - started)
+        try:
+            if self.rate > 0:
+                await self._wait_for_token()
+                UPSTREAM_LIMIT_WAIT_SECONDS.labels(upstream=self.name, limit='rate').observe(
+                    time.perf_counter() - slot_acquired
+                )
+            waited = time.perf_counter() - started
+            if waited >= 1:
+                logger.info(f"⏳ {self.name} 等待上游名額 {waited:.1f} 秒")
+            UPSTREAM_IN_FLIGHT.labels(upstream=self.name).inc()
+            try:
+                yield waited
+            finally:
+                UPSTREAM_IN_FLIGHT.labels(upstream=self.name).dec()
+        finally:
+            if fd is not None:
+                self._release_slot(fd)
+
+_limiters: Dict[str, UpstreamLimiter] = {}
+
+def configure_upstream_limits(directory: str, limits: Dict[str, dict]):
+    """
+    依設定建立各上游的限制（啟動時呼叫）
+
+    limits 例如 {'whisper': {'max_concurrent': 4, 'requests_per_minute': 0}}，
+    兩項皆為 0 的上游不限制。
+    """
+    _limiters.clear()
+    if fcntl is None:
+        logger.warning("⚠️ 此平台不支援 flock，上游呼叫限制已停用")
+        return
+    for name, settings in limits.items():
+        if settings.get('max_concurrent', 0) <= 0 and settings.get('requests_per_minute', 0) <= 0:
+            continue
+        _limiters[name] = UpstreamLimiter(name, directory, **settings)
+        logger.info(f"🚦 {name} 全主機限制: 並發 {settings.get('max_concurrent', 0) or '不限'}，"
+                    f"每分鐘 {settings.get('requests_per_minute', 0) or '不限'} 次")
+
+@asynccontextmanager
+async def upstream_slot(name: str):
+    """取得上游呼叫名額；未設定限制時不等待，yield 等待秒數"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        yield 0.0
+        return
+    async with limiter.acquire() as waited:
+        yield waited
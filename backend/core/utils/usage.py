@@ -0,0 +1,144 @@
+# ================================
+# 13. core/utils/usage.py - 上游用量與成本記錄
+# ================================
+
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 背景工作的用量記錄（非 HTTP 請求）在 api_usage_logs 中的 method
+JOB_USAGE_METHOD = 'JOB'
+
+# 每百萬 token / 每分鐘音檔的美元價格；以模型名稱前綴比對（取最長者）
+DEFAULT_MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    'whisper-1': {'audio_per_minute': 0.006},
+    'gpt-4o-transcribe': {'audio_per_minute': 0.006},
+    'gpt-4o-mini-transcribe': {'audio_per_minute': 0.003},
+    'claude-sonnet-4': {'input': 3.0, 'output': 15.0, 'cache_read': 0.3, 'cache_write': 3.75},
+    'claude-4-sonnet': {'input': 3.0, 'output': 15.0, 'cache_read': 0.3, 'cache_write': 3.75},
+    'claude-3-7-sonnet': {'input': 3.0, 'output': 15.0, 'cache_read': 0.3, 'cache_write': 3.75},
+    'claude-3-5-sonnet': {'input': 3.0, 'output': 15.0, 'cache_read': 0.3, 'cache_write': 3.75},
+    'claude-3-5-haiku': {'input': 0.8, 'output': 4.0, 'cache_read': 0.08, 'cache_write': 1.0},
+    'claude-opus-4': {'input': 15.0, 'output': 75.0, 'cache_read': 1.5, 'cache_write': 18.75},
+}
+
+_pricing: Dict[str, Dict[str, float]] = dict(DEFAULT_MODEL_PRICING)
+
+def configure_pricing(overrides: Optional[Dict[str, Dict[str, float]]] = None):
+    """以設定覆寫 / 新增模型價格（啟動時呼叫）"""
+    global _pricing
+    _pricing = {**DEFAULT_MODEL_PRICING, **(overrides or {})}
+
+def get_model_pricing(model: Optional[str]) -> Optional[Dict[str, float]]:
+    if not model:
+        return None
+    matches = [name for name in _pricing if model.startswith(name)]
+    return _pricing[max(matches, key=len)] if matches else None
+
+def estimate_cost(model: Optional[str], audio_seconds: float = 0, input_tokens: int = 0,
+                  output_tokens: int = 0, cached_tokens: int = 0, cache_write_tokens: int = 0) -> Optional[float]:
+    """依價格表估算美元成本；未知模型返回 None"""
+    pricing = get_model_pricing(model)
+    if pricing is None:
+        return None
+    audio_cost = audio_seconds / 60 * pricing.get('audio_per_minute', 0)
+    token_cost = (
+        input_tokens * pricing.get('input', 0)
+        + output_tokens * pricing.get('output', 0)
+        + cached_tokens * pricing.get('cache_read', 0)
+        + cache_write_tokens * pricing.get('cache_write', 0)
+    ) / 1_000_000
+    return round(audio_cost + token_cost, 6)
+
+class UsageRecord:
+    """
+    單一 API 請求中所有上游呼叫的用量累計
+
+    由 ApiLoggingMiddleware 在請求開始時建立並放入 contextvar，
+    轉錄與生成流程呼叫 record_* 累加，請求結束後寫入使用記錄。
+    請求把上游工作交給背景工作時 job_id 為該工作，用量由工作結束時另行記錄。
+    """
+
+    __slots__ = ('model', 'audio_seconds', 'input_tokens', 'output_tokens', 'cached_tokens',
+                 'cache_write_tokens', 'upstream_ms', 'upstream_calls', 'cost_usd', 'job_id')
+
+    def __init__(self):
+        self.model = None
+        self.audio_seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+        self.upstream_ms = 0
+        self.upstream_calls = 0
+        self.cost_usd = None
+        self.job_id = None
+
+    def add_cost(self, cost: Optional[float]):
+        if cost is not None:
+            self.cost_usd = round((self.cost_usd or 0) + cost, 6)
+
+    def to_columns(self) -> Dict[str, Any]:
+        """ApiUsageLog 欄位；沒有上游呼叫時皆為 None"""
+        if not self.upstream_calls:
+            return {}
+        return {
+            'audio_seconds': round(self.audio_seconds, 3) if self.audio_seconds else None,
+            'input_tokens': self.input_tokens or None,
+            'output_tokens': self.output_tokens or None,
+            'cached_tokens': self.cached_tokens or None,
+            'upstream_ms': self.upstream_ms,
+            'cost_usd': self.cost_usd,
+        }
+
+_current_usage: ContextVar[Optional[UsageRecord]] = ContextVar('current_usage', default=None)
+
+def begin_usage() -> UsageRecord:
+    """開始記錄目前請求的用量（contextvar 中放的是同一個可變物件，子任務的累加也看得到）"""
+    record = UsageRecord()
+    _current_usage.set(record)
+    return record
+
+def current_usage() -> Optional[UsageRecord]:
+    return _current_usage.get()
+
+def record_transcription(model: str, audio_seconds: Optional[float], upstream_seconds: float):
+    """記錄一次轉錄呼叫（失敗的呼叫 audio_seconds 為 None，只累計上游時間）"""
+    record = _current_usage.get()
+    if record is None:
+        return
+    record.model = model
+    record.upstream_calls += 1
+    record.upstream_ms += int(upstream_seconds * 1000)
+    if audio_seconds:
+        record.audio_seconds += audio_seconds
+        record.add_cost(estimate_cost(model, audio_seconds=audio_seconds))
+
+def record_completion(model: str, input_tokens: int, output_tokens: int, upstream_seconds: float,
+                      cached_tokens: int = 0, cache_write_tokens: int = 0):
+    """記錄一次 Claude 呼叫的實際模型與 token 數"""
+    record = _current_usage.get()
+    if record is None:
+        return
+    record.model = model
+    record.upstream_calls += 1
+    record.upstream_ms += int(upstream_seconds * 1000)
+    record.input_tokens += input_tokens or 0
+    record.output_tokens += output_tokens or 0
+    record.cached_tokens += cached_tokens or 0
+    record.cache_write_tokens += cache_write_tokens or 0
+    record.add_cost(estimate_cost(
+        model,
+        input_tokens=input_tokens or 0,
+        output_tokens=output_tokens or 0,
+        cached_tokens=cached_tokens or 0,
+        cache_write_tokens=cache_write_tokens or 0
+    ))
+
+def defer_to_job(job_id: str):
+    """目前請求的上游工作交由背景工作執行（用量由 JobRunner 在工作結束時記錄）"""
+    record = _current_usage.get()
+    if record is not None:
+        record.job_id = job_id
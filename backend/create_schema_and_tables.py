@@ -5,6 +5,11 @@ import sys
 from datetime import datetime, timedelta
 import json
 import random
+from core.services.partition_maintenance import (
+    monthly_partition_ddl, default_partition_ddl, month_start, add_months
+)
+
+PARTITION_MONTHS_AHEAD = 3
 
 def create_schema_and_database():
     """創建數據庫、Schema 和表"""
@@ -90,30 +95,120 @@ def create_schema_and_database():
             model_used VARCHAR(50),
             file_size INTEGER,
             processing_time INTEGER,
+            ttfb_ms INTEGER,
+            bytes_sent INTEGER,
+            final_event_type VARCHAR(20),
+            audio_seconds DOUBLE PRECISION,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            cached_tokens INTEGER,
+            upstream_ms INTEGER,
+            cost_usd DOUBLE PRECISION,
             success VARCHAR(10) NOT NULL,
             error_message TEXT,
             data_payload JSON,
             user_agent TEXT,
-            PRIMARY KEY (id)
-        );
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
         
-        -- 創建索引以提高查詢性能
+        -- 創建索引以提高查詢性能（會自動套用到每個月分區）
         CREATE INDEX IF NOT EXISTS idx_api_usage_logs_timestamp 
         ON {SCHEMA_NAME}.api_usage_logs(timestamp);
         
-        CREATE INDEX IF NOT EXISTS idx_api_usage_logs_endpoint 
-        ON {SCHEMA_NAME}.api_usage_logs(endpoint);
+        CREATE INDEX IF NOT EXISTS idx_api_usage_logs_endpoint_timestamp
+        ON {SCHEMA_NAME}.api_usage_logs(endpoint, timestamp);
+
+        CREATE INDEX IF NOT EXISTS idx_api_usage_logs_errors_keyset
+        ON {SCHEMA_NAME}.api_usage_logs(timestamp, id)
+        WHERE success = 'error';
+
+        CREATE INDEX IF NOT EXISTS idx_api_usage_logs_errors_endpoint_keyset
+        ON {SCHEMA_NAME}.api_usage_logs(endpoint, timestamp, id)
+        WHERE success = 'error';
+
+        CREATE INDEX IF NOT EXISTS idx_api_usage_logs_errors_message_prefix
+        ON {SCHEMA_NAME}.api_usage_logs((left(error_message, 200) COLLATE "C"), timestamp, id)
+        WHERE success = 'error';
         
         CREATE INDEX IF NOT EXISTS idx_api_usage_logs_success 
         ON {SCHEMA_NAME}.api_usage_logs(success);
         
         CREATE INDEX IF NOT EXISTS idx_api_usage_logs_model_used 
         ON {SCHEMA_NAME}.api_usage_logs(model_used);
+
+        -- 完整請求內容旁表（壓縮存放，獨立保留期限）
+        CREATE TABLE IF NOT EXISTS {SCHEMA_NAME}.api_usage_payloads (
+            id SERIAL NOT NULL,
+            log_id INTEGER NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            content_hash VARCHAR(64) NOT NULL,
+            encoding VARCHAR(10) NOT NULL DEFAULT 'zlib',
+            original_size INTEGER,
+            payload BYTEA NOT NULL,
+            PRIMARY KEY (id)
+        );
+
+        CREATE INDEX IF NOT EXISTS ix_social_work_api_usage_payloads_log_id
+        ON {SCHEMA_NAME}.api_usage_payloads(log_id);
+
+        CREATE INDEX IF NOT EXISTS ix_social_work_api_usage_payloads_created_at
+        ON {SCHEMA_NAME}.api_usage_payloads(created_at);
+
+        -- 每日流量彙總與增量水位
+        CREATE TABLE IF NOT EXISTS {SCHEMA_NAME}.daily_api_stats (
+            day DATE NOT NULL,
+            total_requests INTEGER NOT NULL DEFAULT 0,
+            distinct_ips INTEGER NOT NULL DEFAULT 0,
+            transcribe_count INTEGER NOT NULL DEFAULT 0,
+            report_count INTEGER NOT NULL DEFAULT 0,
+            treatment_count INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            total_processing_time BIGINT NOT NULL DEFAULT 0,
+            processing_time_count INTEGER NOT NULL DEFAULT 0,
+            total_file_size BIGINT NOT NULL DEFAULT 0,
+            ip_hll BYTEA,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (day)
+        );
+
+        CREATE TABLE IF NOT EXISTS {SCHEMA_NAME}.rollup_watermarks (
+            name VARCHAR(50) NOT NULL,
+            last_log_id INTEGER NOT NULL DEFAULT 0,
+            covered_until TIMESTAMP WITHOUT TIME ZONE,
+            refreshed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (name)
+        );
+
+        -- 每小時分組彙總與延遲草圖（分位數由草圖合併而得）
+        CREATE TABLE IF NOT EXISTS {SCHEMA_NAME}.hourly_api_stats (
+            id SERIAL NOT NULL,
+            bucket_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            endpoint VARCHAR(255) NOT NULL,
+            model_used VARCHAR(50),
+            success VARCHAR(10) NOT NULL,
+            request_count INTEGER NOT NULL DEFAULT 0,
+            total_processing_time BIGINT NOT NULL DEFAULT 0,
+            processing_time_count INTEGER NOT NULL DEFAULT 0,
+            total_file_size BIGINT NOT NULL DEFAULT 0,
+            latency_sketch JSON,
+            PRIMARY KEY (id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_hourly_api_stats_bucket_start
+        ON {SCHEMA_NAME}.hourly_api_stats(bucket_start);
         """
         
         cursor.execute(create_table_sql)
         print("數據表和索引創建成功！")
         
+        # 建立上個月（供示例數據使用）至未來數月的月分區，之後由應用程式的維護任務持續預建
+        current_month = month_start(datetime.now().date())
+        for offset in range(-1, PARTITION_MONTHS_AHEAD + 1):
+            cursor.execute(monthly_partition_ddl(add_months(current_month, offset), SCHEMA_NAME))
+        cursor.execute(default_partition_ddl(SCHEMA_NAME))
+        print(f"已建立 {PARTITION_MONTHS_AHEAD + 2} 個月分區與預設分區")
+        
         # 4. 驗證創建結果
         cursor.execute(f"""
             SELECT column_name, data_type, is_nullable
@@ -0,0 +1,137 @@
+# migrate.py
+"""
+數據庫遷移執行器
+
+依檔名順序執行 migrations/ 目錄下尚未套用的遷移，並記錄於
+social_work.schema_migrations：
+- .sql 檔：直接執行；首行含 `-- migrate: no-transaction` 時以 autocommit 執行
+  （例如 CREATE INDEX CONCURRENTLY）
+- .py 檔：需定義 upgrade(conn)，conn 為 SQLAlchemy Connection；
+  模組設定 TRANSACTIONAL = False 時不包在單一交易中，upgrade 自行以
+  conn.commit() 分批提交（大量資料回填），全部完成後才記錄版本
+
+用法:
+    python migrate.py          # 套用所有未執行的遷移
+    python migrate.py --list   # 列出遷移狀態
+"""
+
+import os
+import sys
+import importlib.util
+import logging
+from sqlalchemy import text
+from core.database import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+SCHEMA_NAME = 'social_work'
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+
+def list_migrations():
+    """列出所有遷移檔案（依檔名排序）"""
+    return sorted(
+        name for name in os.listdir(MIGRATIONS_DIR)
+        if name.endswith(('.sql', '.py')) and not name.startswith('_')
+    )
+
+def ensure_migrations_table():
+    """確保遷移記錄表存在"""
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA_NAME}'))
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {SCHEMA_NAME}.schema_migrations (
+                version VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+
+def get_applied_versions() -> set:
+    """獲取已套用的遷移"""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f'SELECT version FROM {SCHEMA_NAME}.schema_migrations'))
+        return {row[0] for row in rows}
+
+def record_version(conn, version: str):
+    conn.execute(
+        text(f'INSERT INTO {SCHEMA_NAME}.schema_migrations (version) VALUES (:version)'),
+        {'version': version}
+    )
+
+def apply_sql_migration(path: str, version: str):
+    """執行 SQL 遷移"""
+    with open(path, 'r', encoding='utf-8') as f:
+        sql = f.read()
+
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        # CONCURRENTLY 等語句不能在交易中執行，逐句以 autocommit 執行
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for statement in split_sql_statements(sql):
+                conn.exec_driver_sql(statement)
+            record_version(conn, version)
+    else:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql)
+            record_version(conn, version)
+
+def apply_python_migration(path: str, version: str):
+    """執行 Python 遷移"""
+    spec = importlib.util.spec_from_file_location(f'migration_{version}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    if getattr(module, 'TRANSACTIONAL', True):
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            record_version(conn, version)
+    else:
+        with engine.connect() as conn:
+            module.upgrade(conn)
+            record_version(conn, version)
+            conn.commit()
+
+def split_sql_statements(sql: str) -> list:
+    """按分號拆分語句（遷移檔中不使用含分號的函數體）"""
+    statements = []
+    for statement in sql.split(';'):
+        lines = [line for line in statement.splitlines() if not line.strip().startswith('--')]
+        statement = '\n'.join(lines).strip()
+        if statement:
+            statements.append(statement)
+    return statements
+
+def migrate():
+    """套用所有未執行的遷移"""
+    ensure_migrations_table()
+    applied = get_applied_versions()
+    pending = [name for name in list_migrations() if os.path.splitext(name)[0] not in applied]
+
+    if not pending:
+        logger.info("✅ 沒有待執行的遷移")
+        return
+
+    for name in pending:
+        version = os.path.splitext(name)[0]
+        path = os.path.join(MIGRATIONS_DIR, name)
+        logger.info(f"🔧 執行遷移: {name}")
+        if name.endswith('.sql'):
+            apply_sql_migration(path, version)
+        else:
+            apply_python_migration(path, version)
+        logger.info(f"✅ 遷移完成: {name}")
+
+def show_status():
+    """列出遷移狀態"""
+    ensure_migrations_table()
+    applied = get_applied_versions()
+    for name in list_migrations():
+        version = os.path.splitext(name)[0]
+        status = '✅ 已套用' if version in applied else '⏳ 待執行'
+        print(f"  {status}  {name}")
+
+if __name__ == "__main__":
+    if '--list' in sys.argv:
+        show_status()
+    else:
+        migrate()
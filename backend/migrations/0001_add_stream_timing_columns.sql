@@ -0,0 +1,4 @@
+-- 記錄串流回應的完整時間與大小（ApiLoggingMiddleware 改為純 ASGI 實作）
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS ttfb_ms INTEGER;
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS bytes_sent INTEGER;
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS final_event_type VARCHAR(20);
@@ -0,0 +1,107 @@
+# migrations/0002_payload_summaries.py
+"""
+data_payload 改存摘要
+
+1. 建立 api_usage_payloads 旁表
+2. 分批將既有 data_payload 轉為摘要；設定 PAYLOAD_STORE_FULL=true 時，
+   保留期限內的完整內容會壓縮後搬到旁表
+
+每批在各自的交易中提交（TRANSACTIONAL = False），不會長時間持有鎖或累積
+大量未提交的更新；中斷後重新執行會略過已是摘要的記錄，從頭續跑即可。
+
+完成後可於離峰時段執行 VACUUM (FULL) social_work.api_usage_logs 回收 TOAST 空間。
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from core.utils.payload_policy import summarize_payload, compress_payload, is_summary
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# 由 migrate.py 以非交易模式執行，upgrade 自行逐批提交
+TRANSACTIONAL = False
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS social_work.api_usage_payloads (
+            id SERIAL NOT NULL,
+            log_id INTEGER NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            content_hash VARCHAR(64) NOT NULL,
+            encoding VARCHAR(10) NOT NULL DEFAULT 'zlib',
+            original_size INTEGER,
+            payload BYTEA NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_social_work_api_usage_payloads_log_id
+        ON social_work.api_usage_payloads(log_id)
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_social_work_api_usage_payloads_created_at
+        ON social_work.api_usage_payloads(created_at)
+    """))
+
+    store_full = os.getenv('PAYLOAD_STORE_FULL', 'false').lower() in ('1', 'true', 'yes')
+    retention_cutoff = datetime.now() - timedelta(days=int(os.getenv('PAYLOAD_RETENTION_DAYS', 30)))
+
+    last_id = 0
+    converted = 0
+    while True:
+        rows = conn.execute(text("""
+            SELECT id, timestamp, data_payload
+            FROM social_work.api_usage_logs
+            WHERE id > :last_id AND data_payload IS NOT NULL
+            ORDER BY id
+            LIMIT :batch_size
+        """), {'last_id': last_id, 'batch_size': BATCH_SIZE}).fetchall()
+
+        if not rows:
+            break
+
+        summaries = []
+        payloads = []
+        for row in rows:
+            last_id = row.id
+            data = row.data_payload
+            if isinstance(data, str):
+                data = json.loads(data)
+            if is_summary(data):
+                continue
+
+            summary = summarize_payload(data)
+
+            if store_full and row.timestamp >= retention_cutoff:
+                blob, original_size = compress_payload(data)
+                payloads.append({
+                    'log_id': row.id,
+                    'created_at': row.timestamp,
+                    'content_hash': summary['sha256'],
+                    'original_size': original_size,
+                    'payload': blob,
+                })
+
+            summaries.append({'summary': json.dumps(summary, ensure_ascii=False), 'id': row.id})
+
+        # 整批以 executemany 寫入，旁表與摘要在同一筆交易中提交
+        if payloads:
+            conn.execute(text("""
+                INSERT INTO social_work.api_usage_payloads
+                (log_id, created_at, content_hash, encoding, original_size, payload)
+                VALUES (:log_id, :created_at, :content_hash, 'zlib', :original_size, :payload)
+            """), payloads)
+        if summaries:
+            conn.execute(
+                text("UPDATE social_work.api_usage_logs SET data_payload = CAST(:summary AS JSON) WHERE id = :id"),
+                summaries
+            )
+        conn.commit()
+        converted += len(summaries)
+
+    logger.info(f"📦 已將 {converted} 筆 data_payload 轉為摘要")
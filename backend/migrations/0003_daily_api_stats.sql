@@ -0,0 +1,23 @@
+-- 每日流量彙總表（RollupService 增量維護）
+CREATE TABLE IF NOT EXISTS social_work.daily_api_stats (
+    day DATE NOT NULL,
+    total_requests INTEGER NOT NULL DEFAULT 0,
+    distinct_ips INTEGER NOT NULL DEFAULT 0,
+    transcribe_count INTEGER NOT NULL DEFAULT 0,
+    report_count INTEGER NOT NULL DEFAULT 0,
+    treatment_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    total_processing_time BIGINT NOT NULL DEFAULT 0,
+    processing_time_count INTEGER NOT NULL DEFAULT 0,
+    total_file_size BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (day)
+);
+
+CREATE TABLE IF NOT EXISTS social_work.rollup_watermarks (
+    name VARCHAR(50) NOT NULL,
+    last_log_id INTEGER NOT NULL DEFAULT 0,
+    covered_until TIMESTAMP WITHOUT TIME ZONE,
+    refreshed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (name)
+);
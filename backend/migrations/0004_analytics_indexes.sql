@@ -0,0 +1,13 @@
+-- migrate: no-transaction
+-- 分析查詢改用半開時間區間後所需的索引
+-- (endpoint, timestamp) 涵蓋原本的單欄 endpoint 索引，因此移除後者以降低寫入成本
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_api_usage_logs_endpoint_timestamp
+ON social_work.api_usage_logs(endpoint, timestamp);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_api_usage_logs_errors_timestamp
+ON social_work.api_usage_logs(timestamp)
+WHERE success = 'error';
+
+DROP INDEX CONCURRENTLY IF EXISTS social_work.idx_api_usage_logs_endpoint;
+
+ANALYZE social_work.api_usage_logs;
@@ -0,0 +1,159 @@
+# migrations/0005_partition_api_usage_logs.py
+"""
+api_usage_logs 改為按月範圍分區
+
+1. 原表改名為 api_usage_logs_legacy，並移除其索引（只剩複製用途）
+2. 建立以 RANGE (timestamp) 分區的新父表，沿用原本的 id 序列，保留既有 id
+3. 建立涵蓋既有資料到未來 LOG_PARTITION_MONTHS_AHEAD 個月的月分區與預設分區，
+   並在父表建立索引
+4. 以 id 順序分批將舊表記錄搬到新表（每批 DELETE ... RETURNING 後 INSERT，
+   各自提交），完成後刪除舊表
+
+步驟 1～3 在同一個交易中完成後，新記錄即寫入分區表；步驟 4 每批只鎖住該批記錄。
+中斷後重新執行會從舊表剩餘的記錄繼續搬移。
+"""
+
+import os
+import logging
+from datetime import date
+from sqlalchemy import text
+from core.services.partition_maintenance import (
+    create_month_partition, default_partition_ddl, month_start, add_months
+)
+
+logger = logging.getLogger(__name__)
+
+# 由 migrate.py 以非交易模式執行，upgrade 自行分段提交
+TRANSACTIONAL = False
+
+COPY_BATCH_SIZE = 50000
+
+COLUMNS = (
+    'id, timestamp, ip, endpoint, method, model_used, file_size, processing_time, '
+    'ttfb_ms, bytes_sent, final_event_type, success, error_message, data_payload, user_agent'
+)
+
+LEGACY_INDEXES = (
+    'idx_api_usage_logs_timestamp',
+    'idx_api_usage_logs_endpoint',
+    'idx_api_usage_logs_endpoint_timestamp',
+    'idx_api_usage_logs_errors_timestamp',
+    'idx_api_usage_logs_success',
+    'idx_api_usage_logs_model_used',
+)
+
+def _legacy_exists(conn) -> bool:
+    return conn.execute(text("SELECT to_regclass('social_work.api_usage_logs_legacy') IS NOT NULL")).scalar()
+
+def upgrade(conn):
+    relkind = conn.execute(text("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON c.relnamespace = n.oid
+        WHERE n.nspname = 'social_work' AND c.relname = 'api_usage_logs'
+    """)).scalar()
+    if relkind == 'p':
+        if _legacy_exists(conn):
+            logger.info("api_usage_logs 已是分區表，繼續搬移舊表剩餘的記錄")
+            copy_legacy_rows(conn)
+        else:
+            logger.info("api_usage_logs 已是分區表，跳過")
+        return
+
+    # 1. 保留舊表供複製
+    conn.execute(text("ALTER TABLE social_work.api_usage_logs RENAME TO api_usage_logs_legacy"))
+    conn.execute(text(
+        "ALTER TABLE social_work.api_usage_logs_legacy "
+        "RENAME CONSTRAINT api_usage_logs_pkey TO api_usage_logs_legacy_pkey"
+    ))
+    for index_name in LEGACY_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS social_work.{index_name}"))
+    conn.execute(text("ALTER SEQUENCE social_work.api_usage_logs_id_seq OWNED BY NONE"))
+    conn.execute(text("ALTER TABLE social_work.api_usage_logs_legacy ALTER COLUMN id DROP DEFAULT"))
+
+    # 2. 分區父表
+    conn.execute(text("""
+        CREATE TABLE social_work.api_usage_logs (
+            id INTEGER NOT NULL DEFAULT nextval('social_work.api_usage_logs_id_seq'),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            ip VARCHAR(45) NOT NULL,
+            endpoint VARCHAR(255) NOT NULL,
+            method VARCHAR(10) NOT NULL,
+            model_used VARCHAR(50),
+            file_size INTEGER,
+            processing_time INTEGER,
+            ttfb_ms INTEGER,
+            bytes_sent INTEGER,
+            final_event_type VARCHAR(20),
+            success VARCHAR(10) NOT NULL,
+            error_message TEXT,
+            data_payload JSON,
+            user_agent TEXT,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """))
+    conn.execute(text("ALTER SEQUENCE social_work.api_usage_logs_id_seq OWNED BY social_work.api_usage_logs.id"))
+
+    # 3. 月分區、預設分區與索引（搬移期間新表已開始接收寫入，索引先建好）
+    earliest = conn.execute(text("SELECT min(timestamp) FROM social_work.api_usage_logs_legacy")).scalar()
+    current = month_start(date.today())
+    month = month_start(earliest.date()) if earliest else current
+    last_month = add_months(current, int(os.getenv('LOG_PARTITION_MONTHS_AHEAD', 3)))
+    partition_count = 0
+    while month <= last_month:
+        create_month_partition(conn, month)
+        month = add_months(month, 1)
+        partition_count += 1
+    conn.execute(text(default_partition_ddl()))
+
+    conn.execute(text("""
+        CREATE INDEX idx_api_usage_logs_timestamp
+        ON social_work.api_usage_logs(timestamp)
+    """))
+    conn.execute(text("""
+        CREATE INDEX idx_api_usage_logs_endpoint_timestamp
+        ON social_work.api_usage_logs(endpoint, timestamp)
+    """))
+    conn.execute(text("""
+        CREATE INDEX idx_api_usage_logs_errors_timestamp
+        ON social_work.api_usage_logs(timestamp)
+        WHERE success = 'error'
+    """))
+    conn.execute(text("""
+        CREATE INDEX idx_api_usage_logs_success
+        ON social_work.api_usage_logs(success)
+    """))
+    conn.execute(text("""
+        CREATE INDEX idx_api_usage_logs_model_used
+        ON social_work.api_usage_logs(model_used)
+    """))
+    conn.commit()
+    logger.info(f"🗂️ 已建立 {partition_count} 個月分區與預設分區")
+
+    # 4. 分批搬移
+    copy_legacy_rows(conn)
+
+def copy_legacy_rows(conn):
+    """依 id 順序分批把舊表記錄搬到分區表，每批各自提交，搬完後刪除舊表"""
+    copied = 0
+    while True:
+        moved = conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM social_work.api_usage_logs_legacy
+                WHERE id IN (
+                    SELECT id FROM social_work.api_usage_logs_legacy ORDER BY id LIMIT :batch_size
+                )
+                RETURNING {COLUMNS}
+            )
+            INSERT INTO social_work.api_usage_logs ({COLUMNS})
+            SELECT {COLUMNS} FROM moved
+        """), {'batch_size': COPY_BATCH_SIZE}).rowcount
+        conn.commit()
+        if not moved:
+            break
+        copied += moved
+        logger.info(f"🚚 已搬移 {copied} 筆記錄")
+
+    conn.execute(text("DROP TABLE social_work.api_usage_logs_legacy"))
+    conn.execute(text("ANALYZE social_work.api_usage_logs"))
+    conn.commit()
+    logger.info(f"🗂️ 舊表記錄已全部搬移（本次 {copied} 筆）")
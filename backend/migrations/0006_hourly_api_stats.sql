@@ -0,0 +1,20 @@
+-- 每小時分組彙總與延遲草圖（p50/p90/p95/p99 由草圖合併而得）
+CREATE TABLE IF NOT EXISTS social_work.hourly_api_stats (
+    id SERIAL NOT NULL,
+    bucket_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    endpoint VARCHAR(255) NOT NULL,
+    model_used VARCHAR(50),
+    success VARCHAR(10) NOT NULL,
+    request_count INTEGER NOT NULL DEFAULT 0,
+    total_processing_time BIGINT NOT NULL DEFAULT 0,
+    processing_time_count INTEGER NOT NULL DEFAULT 0,
+    total_file_size BIGINT NOT NULL DEFAULT 0,
+    latency_sketch JSON,
+    PRIMARY KEY (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_hourly_api_stats_bucket_start
+ON social_work.hourly_api_stats(bucket_start);
+
+-- 重新彙總所有記錄，讓既有的小時也有草圖
+UPDATE social_work.rollup_watermarks SET last_log_id = 0 WHERE name = 'daily_api_stats';
@@ -0,0 +1,5 @@
+-- 每日客戶端 IP 的 HyperLogLog 草圖，支援跨日期範圍的不重複客戶端估計
+ALTER TABLE social_work.daily_api_stats ADD COLUMN IF NOT EXISTS ip_hll BYTEA;
+
+-- 重新彙總所有記錄以回填草圖
+UPDATE social_work.rollup_watermarks SET last_log_id = 0 WHERE name = 'daily_api_stats';
@@ -0,0 +1,19 @@
+-- 錯誤記錄 keyset 分頁索引：(timestamp, id) 與 (endpoint, timestamp, id)，皆只含錯誤記錄
+-- 錯誤訊息前綴以 left(..., 200) COLLATE "C" 建索引，範圍條件即可使用且不受過長訊息影響
+-- api_usage_logs 已是分區表，父表不支援 CONCURRENTLY；錯誤記錄為部分索引，建立時間很短
+CREATE INDEX IF NOT EXISTS idx_api_usage_logs_errors_keyset
+ON social_work.api_usage_logs(timestamp, id)
+WHERE success = 'error';
+
+CREATE INDEX IF NOT EXISTS idx_api_usage_logs_errors_endpoint_keyset
+ON social_work.api_usage_logs(endpoint, timestamp, id)
+WHERE success = 'error';
+
+CREATE INDEX IF NOT EXISTS idx_api_usage_logs_errors_message_prefix
+ON social_work.api_usage_logs((left(error_message, 200) COLLATE "C"), timestamp, id)
+WHERE success = 'error';
+
+-- (timestamp, id) 已涵蓋原本的錯誤時間索引
+DROP INDEX IF EXISTS social_work.idx_api_usage_logs_errors_timestamp;
+
+ANALYZE social_work.api_usage_logs;
@@ -0,0 +1,8 @@
+-- 上游用量與成本：實際模型由應用回報，另記錄音檔秒數、token 數、上游耗時與估算成本
+-- 新增可為 NULL 的欄位只修改目錄，分區表上也不需重寫資料
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS audio_seconds DOUBLE PRECISION;
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS input_tokens INTEGER;
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS output_tokens INTEGER;
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS cached_tokens INTEGER;
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS upstream_ms INTEGER;
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS cost_usd DOUBLE PRECISION;
@@ -0,0 +1,3 @@
+-- 記錄寫入時間：timestamp 為請求開始時間，彙總水位改以寫入時間判斷記錄是否已提交
+-- now() 在 ALTER 時只求值一次（快速預設值），既有分區不需重寫資料
+ALTER TABLE social_work.api_usage_logs ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now();
@@ -2,7 +2,7 @@
 # 1. 數據庫模型 - models/api_usage_log.py
 # ================================
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index, Float, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -11,20 +11,55 @@ Base = declarative_base()
 
 class ApiUsageLog(Base):
     __tablename__ = 'api_usage_logs'
-    __table_args__ = {'schema': 'social_work'}  # 可以改成您想要的 schema
+    __table_args__ = (
+        # 端點 + 時間範圍查詢
+        Index('idx_api_usage_logs_endpoint_timestamp', 'endpoint', 'timestamp'),
+        # 只索引錯誤記錄，供 get_recent_errors 的 (timestamp, id) keyset 分頁使用
+        Index(
+            'idx_api_usage_logs_errors_keyset', 'timestamp', 'id',
+            postgresql_where=text("success = 'error'")
+        ),
+        Index(
+            'idx_api_usage_logs_errors_endpoint_keyset', 'endpoint', 'timestamp', 'id',
+            postgresql_where=text("success = 'error'")
+        ),
+        # 錯誤訊息前綴查詢（C 排序規則才能以範圍條件比對前綴）
+        Index(
+            'idx_api_usage_logs_errors_message_prefix',
+            text('(left(error_message, 200) COLLATE "C")'), 'timestamp', 'id',
+            postgresql_where=text("success = 'error'")
+        ),
+        {
+            'schema': 'social_work',  # 可以改成您想要的 schema
+            # 按月範圍分區，分區由 core.services.partition_maintenance 維護
+            'postgresql_partition_by': 'RANGE (timestamp)'
+        }
+    )
 
+    # 分區表的主鍵必須包含分區鍵
     id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime, nullable=False, default=func.now())
+    timestamp = Column(DateTime, primary_key=True, nullable=False, default=func.now())
     ip = Column(String(45), nullable=False)
     endpoint = Column(String(255), nullable=False)
     method = Column(String(10), nullable=False)  # GET, POST, etc.
-    model_used = Column(String(50))  # whisper-1, claude-3-sonnet, etc.
+    model_used = Column(String(50))  # 上游實際回報的模型，例如 whisper-1
     file_size = Column(Integer)  # 文件大小（bytes）
-    processing_time = Column(Integer)  # 處理時間（毫秒）
+    processing_time = Column(Integer)  # 處理時間（毫秒，至回應串流結束）
+    ttfb_ms = Column(Integer)  # 首個回應位元組時間（毫秒）
+    bytes_sent = Column(Integer)  # 回應內容位元組數
+    final_event_type = Column(String(20))  # SSE 最後事件類型：complete, error, etc.
+    audio_seconds = Column(Float)  # 計費音檔秒數（Whisper 回報的 duration 總和）
+    input_tokens = Column(Integer)  # Claude 輸入 token（不含快取）
+    output_tokens = Column(Integer)  # Claude 輸出 token
+    cached_tokens = Column(Integer)  # 自提示快取讀取的 token
+    upstream_ms = Column(Integer)  # 上游 API 呼叫耗時總和（毫秒，並行呼叫會重複計算）
+    cost_usd = Column(Float)  # 依記錄當下價格表估算的成本（美元）
     success = Column(String(10), nullable=False)  # success, error
     error_message = Column(Text)  # 錯誤訊息
     data_payload = Column(JSON)  # 請求數據
     user_agent = Column(Text)
+    # 寫入時間（資料庫時間）；timestamp 是請求開始時間，長串流的記錄會晚很久才寫入
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
     
     def __repr__(self):
         return f"<ApiUsageLog(id={self.id}, endpoint={self.endpoint}, ip={self.ip})>"
\ No newline at end of file
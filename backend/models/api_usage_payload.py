@@ -0,0 +1,27 @@
+# ================================
+# 2. 數據庫模型 - models/api_usage_payload.py
+# ================================
+
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from models.api_usage_log import Base
+
+class ApiUsagePayload(Base):
+    """完整請求內容（壓縮後）的旁表
+
+    api_usage_logs.data_payload 只保留摘要；完整內容可選擇性存於此表，
+    並依 PAYLOAD_RETENTION_DAYS 獨立清除，因此 log_id 不設外鍵。
+    """
+    __tablename__ = 'api_usage_payloads'
+    __table_args__ = {'schema': 'social_work'}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    log_id = Column(Integer, nullable=False, index=True)  # 對應 api_usage_logs.id
+    created_at = Column(DateTime, nullable=False, default=func.now(), index=True)
+    content_hash = Column(String(64), nullable=False)  # 與摘要中的 sha256 相同
+    encoding = Column(String(10), nullable=False, default='zlib')
+    original_size = Column(Integer)  # 壓縮前位元組數
+    payload = Column(LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<ApiUsagePayload(id={self.id}, log_id={self.log_id}, size={self.original_size})>"
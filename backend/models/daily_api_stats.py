@@ -0,0 +1,63 @@
+# ================================
+# 3. 數據庫模型 - models/daily_api_stats.py
+# ================================
+
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, JSON, Index, LargeBinary
+from sqlalchemy.sql import func
+from models.api_usage_log import Base
+
+class DailyApiStats(Base):
+    """每日流量彙總（由 RollupService 增量維護）"""
+    __tablename__ = 'daily_api_stats'
+    __table_args__ = {'schema': 'social_work'}
+
+    day = Column(Date, primary_key=True)
+    total_requests = Column(Integer, nullable=False, default=0)
+    distinct_ips = Column(Integer, nullable=False, default=0)
+    transcribe_count = Column(Integer, nullable=False, default=0)
+    report_count = Column(Integer, nullable=False, default=0)
+    treatment_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    total_processing_time = Column(BigInteger, nullable=False, default=0)  # 毫秒總和
+    processing_time_count = Column(Integer, nullable=False, default=0)  # 有處理時間的請求數
+    total_file_size = Column(BigInteger, nullable=False, default=0)
+    ip_hll = Column(LargeBinary)  # 當日客戶端 IP 的 HyperLogLog 草圖
+    updated_at = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DailyApiStats(day={self.day}, total_requests={self.total_requests})>"
+
+class HourlyApiStats(Base):
+    """每小時、每個 (endpoint, model_used, success) 的彙總與延遲草圖"""
+    __tablename__ = 'hourly_api_stats'
+    __table_args__ = (
+        Index('idx_hourly_api_stats_bucket_start', 'bucket_start'),
+        {'schema': 'social_work'}
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket_start = Column(DateTime, nullable=False)  # 整點
+    endpoint = Column(String(255), nullable=False)
+    model_used = Column(String(50))
+    success = Column(String(10), nullable=False)
+    request_count = Column(Integer, nullable=False, default=0)
+    total_processing_time = Column(BigInteger, nullable=False, default=0)
+    processing_time_count = Column(Integer, nullable=False, default=0)
+    total_file_size = Column(BigInteger, nullable=False, default=0)
+    latency_sketch = Column(JSON)  # LatencySketch.to_dict()
+
+    def __repr__(self):
+        return f"<HourlyApiStats(bucket_start={self.bucket_start}, endpoint={self.endpoint})>"
+
+class RollupWatermark(Base):
+    """彙總表的增量水位：已處理到的最大 log id 與涵蓋時間"""
+    __tablename__ = 'rollup_watermarks'
+    __table_args__ = {'schema': 'social_work'}
+
+    name = Column(String(50), primary_key=True)
+    last_log_id = Column(Integer, nullable=False, default=0)
+    covered_until = Column(DateTime)  # 此時間之前的記錄都已彙總
+    refreshed_at = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        return f"<RollupWatermark(name={self.name}, last_log_id={self.last_log_id})>"
@@ -1,6 +1,14 @@
 # run.py
+import os
+import shutil
+import tempfile
+
+# 多 worker 時 Prometheus 指標寫入共享目錄，須在匯入 prometheus_client 之前設定
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'social_work_prometheus')
+)
+
 import uvicorn
-from app.main import app
 
 if __name__ == "__main__":
     #dev
@@ -13,11 +21,14 @@ if __name__ == "__main__":
     #     access_log=True
     # )
     #production
+    # 清除上次執行留下的指標檔
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=5174,
-        workers=4,  # 🔑 指定進程數
+        workers=int(os.getenv('WEB_CONCURRENCY', 4)),  # 🔑 指定進程數（core.database 依此分配連線池）
         # reload=True,  # ❌ 多進程模式下不能用 reload
         log_level="info",
         access_log=True
@@ -0,0 +1,52 @@
+# ================================
+# tests/conftest.py - 測試共用設定
+# ================================
+
+import os
+import sys
+import types
+import asyncio
+import pytest
+
+# 與 run.py 相同，以 backend 目錄為匯入根目錄（core.*、app.*）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# file_utils 在匯入時需要 aiofiles，但測試只用到同步的 cleanup_files；
+# 未安裝時放入空模組，讓背景工作佇列的測試不會被略過
+try:
+    import aiofiles  # noqa: F401
+except ImportError:
+    sys.modules['aiofiles'] = types.ModuleType('aiofiles')
+
+@pytest.fixture
+def usage_db(tmp_path, monkeypatch):
+    """
+    api_usage_logs 與彙總表建在 SQLite 檔案上，返回 (Session 工廠, AsyncSession 工廠)
+
+    SQLite 沒有 schema，social_work 以 schema_translate_map 對應到預設資料庫；
+    分區表的複合主鍵在 SQLite 無法自動遞增，測試資料需自行指定 id。
+    只建立資料表，不建立索引（前綴索引使用 PostgreSQL 語法）。
+    """
+    pytest.importorskip('sqlalchemy')
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.schema import CreateTable
+    from models.api_usage_log import ApiUsageLog, Base
+    import models.daily_api_stats  # noqa: F401
+    import models.api_usage_payload  # noqa: F401
+
+    monkeypatch.setattr(ApiUsageLog.__table__.c.id, 'autoincrement', False)
+    path = tmp_path / 'usage.sqlite3'
+    options = {'schema_translate_map': {'social_work': None}}
+    engine = create_engine(f'sqlite:///{path}', execution_options=options)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            conn.execute(CreateTable(table))
+    async_engine = create_async_engine(f'sqlite+aiosqlite:///{path}', execution_options=options)
+
+    yield sessionmaker(engine), async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    engine.dispose()
+    asyncio.run(async_engine.dispose())
@@ -0,0 +1,84 @@
+# ================================
+# tests/test_analytics_errors.py - 錯誤記錄 keyset 分頁與前綴查詢測試
+# ================================
+
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from models.api_usage_log import ApiUsageLog
+from core.services.analytics_service import AnalyticsService, ERROR_PREFIX_INDEX_CHARS
+from core.utils.sql_functions import byte_order_prefix
+
+START = datetime(2026, 1, 5, 9, 0)
+LONG_MESSAGE = 'x' * ERROR_PREFIX_INDEX_CHARS
+
+MESSAGES = [
+    'Timeout calling whisper',
+    'Timeout calling claude',
+    'Rate limited by upstream',
+    'Timeout calling whisper',  # 與下一筆同一時間，以 id 決定順序
+    'Timeout calling whisper',
+    LONG_MESSAGE + 'A tail',
+    LONG_MESSAGE + 'B tail',
+    'Timeouts are fine',
+]
+
+@pytest.fixture
+def error_db(usage_db):
+    session_factory, async_session_factory = usage_db
+    with session_factory() as db:
+        for log_id, message in enumerate(MESSAGES, start=1):
+            db.add(ApiUsageLog(
+                id=log_id,
+                timestamp=START + timedelta(minutes=min(log_id, 4)),
+                ip='10.0.0.1',
+                endpoint='/backend/transcribe' if log_id % 2 else '/backend/generate-report',
+                method='POST',
+                success='error',
+                error_message=message
+            ))
+        db.add(ApiUsageLog(
+            id=100, timestamp=START, ip='10.0.0.1', endpoint='/backend/transcribe',
+            method='POST', success='success', error_message='Timeout calling whisper'
+        ))
+        db.commit()
+    return async_session_factory
+
+def fetch_all(async_session_factory, limit, **filters):
+    """依 next_cursor 翻完所有頁，返回每頁的 id 列表"""
+    async def run():
+        pages, cursor = [], None
+        async with async_session_factory() as db:
+            service = AnalyticsService(db, columnar_store=None)
+            while True:
+                page = await service.get_recent_errors(limit=limit, cursor=cursor, **filters)
+                pages.append([error['id'] for error in page['errors']])
+                cursor = page['next_cursor']
+                if cursor is None:
+                    return pages
+    return asyncio.run(run())
+
+def test_keyset_pages_cover_every_error_once(error_db):
+    pages = fetch_all(error_db, limit=3)
+    assert pages == [[8, 7, 6], [5, 4, 3], [2, 1]]
+
+def test_prefix_filter_uses_byte_order_range(error_db):
+    assert fetch_all(error_db, limit=2, error_prefix='Timeout calling') == [[5, 4], [2, 1]]
+    assert fetch_all(error_db, limit=10, error_prefix='Timeout') == [[8, 5, 4, 2, 1]]
+
+def test_prefix_longer_than_index(error_db):
+    assert fetch_all(error_db, limit=10, error_prefix=LONG_MESSAGE + 'B') == [[7]]
+
+def test_prefix_with_endpoint(error_db):
+    pages = fetch_all(error_db, limit=10, error_prefix='Timeout', endpoint='/backend/transcribe')
+    assert pages == [[5, 1]]
+
+def test_prefix_compiles_to_indexed_expression_on_postgres():
+    query = select(ApiUsageLog.id).where(byte_order_prefix(ApiUsageLog.error_message, 200) >= 'a')
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert 'left(social_work.api_usage_logs.error_message, 200) COLLATE "C"' in sql
@@ -0,0 +1,115 @@
+# ================================
+# tests/test_columnar_store.py - 列式歷史資料庫測試
+# ================================
+
+import csv
+from datetime import date, datetime, timedelta
+import pytest
+
+pytest.importorskip('duckdb')
+
+from core.services import columnar_store
+from core.services.columnar_store import ARCHIVE_COLUMNS, ColumnarStore
+from core.utils.latency_sketch import LatencySketch
+from core.utils.usage import JOB_USAGE_METHOD
+
+DAY = date(2026, 1, 5)
+START = datetime(2026, 1, 5, 10, 0)
+
+ROWS = [
+    {'id': 1, 'timestamp': START, 'ip': '10.0.0.1', 'endpoint': '/backend/transcribe', 'method': 'POST',
+     'model_used': 'whisper-1', 'processing_time': 120, 'success': 'success', 'audio_seconds': 30.0,
+     'cost_usd': 0.003},
+    {'id': 2, 'timestamp': START + timedelta(minutes=5), 'ip': '10.0.0.2', 'endpoint': '/backend/transcribe',
+     'method': 'POST', 'model_used': 'whisper-1', 'processing_time': 480, 'success': 'success',
+     'audio_seconds': 90.0, 'cost_usd': 0.009},
+    {'id': 3, 'timestamp': START + timedelta(hours=1), 'ip': '10.0.0.1', 'endpoint': '/backend/generate-report',
+     'method': 'POST', 'success': 'error', 'error_message': 'Timeout'},
+    # 背景工作記錄：計入模型用量，但不計入流量統計與不重複 IP
+    {'id': 4, 'timestamp': START + timedelta(hours=1, minutes=2), 'ip': '10.0.0.9',
+     'endpoint': '/backend/jobs/report', 'method': JOB_USAGE_METHOD, 'model_used': 'claude-sonnet',
+     'processing_time': 9000, 'success': 'success', 'input_tokens': 1200, 'output_tokens': 800,
+     'upstream_ms': 8500, 'cost_usd': 0.02},
+]
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(ARCHIVE_COLUMNS)
+        for row in rows:
+            writer.writerow(['' if row.get(name) is None else row[name] for name in ARCHIVE_COLUMNS])
+    return str(path)
+
+@pytest.fixture
+def store(tmp_path):
+    store = ColumnarStore(str(tmp_path / 'archive'))
+    assert store.archive_csv(DAY, write_csv(tmp_path / 'day.csv', ROWS)) == len(ROWS)
+    store.mark_archived(DAY)
+    return store
+
+def day_range():
+    return datetime(2026, 1, 5), datetime(2026, 1, 6)
+
+def test_cold_range_stops_at_archived_until(tmp_path, store):
+    assert store.archived_until() == DAY + timedelta(days=1)
+    assert store.cold_range(datetime(2026, 1, 4), datetime(2026, 1, 8)) == (datetime(2026, 1, 4), datetime(2026, 1, 6))
+    assert store.cold_range(datetime(2026, 1, 6), datetime(2026, 1, 8)) is None
+    assert ColumnarStore(str(tmp_path / 'empty')).cold_range(*day_range()) is None
+
+def test_distinct_ips_exclude_job_rows(store):
+    assert store.distinct_ips(*day_range()) == {'10.0.0.1', '10.0.0.2'}
+
+def test_model_usage_includes_job_rows(store):
+    usage = store.model_usage(*day_range())
+    assert set(usage) == {'whisper-1', 'claude-sonnet'}
+    count, total_time, timed, input_tokens, output_tokens, cached, audio, cost, upstream = usage['claude-sonnet']
+    assert (count, total_time, timed, input_tokens, output_tokens, upstream) == (1, 9000, 1, 1200, 800, 8500)
+    assert usage['whisper-1'][6] == pytest.approx(120.0)
+    assert usage['whisper-1'][7] == pytest.approx(0.012)
+
+def test_daily_endpoint_usage(store):
+    rows = {(row[1], row[2]): row for row in store.daily_endpoint_usage(*day_range())}
+    assert set(rows) == {('/backend/transcribe', 'whisper-1'), ('/backend/jobs/report', 'claude-sonnet')}
+    assert rows[('/backend/transcribe', 'whisper-1')][0] == DAY
+    assert rows[('/backend/transcribe', 'whisper-1')][3] == 2
+
+def test_bucket_rows_match_latency_sketch(store):
+    rows = store.bucket_rows(*day_range(), 'hour')
+    assert {row['endpoint'] for row in rows} == {'/backend/transcribe', '/backend/generate-report'}
+
+    transcribe = next(row for row in rows if row['endpoint'] == '/backend/transcribe')
+    assert transcribe['bucket'] == START
+    assert (transcribe['request_count'], transcribe['total_processing_time'], transcribe['processing_time_count']) == (2, 600, 2)
+
+    from_buckets = LatencySketch()
+    for index, bucket_count in transcribe['latency_buckets']:
+        from_buckets.add_bucket(index, bucket_count)
+    expected = LatencySketch()
+    expected.add_all([120, 480])
+    assert from_buckets.buckets == expected.buckets
+
+    report = next(row for row in rows if row['endpoint'] == '/backend/generate-report')
+    assert report['processing_time_count'] == 0
+    assert report['latency_buckets'] == []
+
+def test_range_filter_excludes_other_hours(store):
+    rows = store.bucket_rows(START, START + timedelta(hours=1), 'hour')
+    assert [row['endpoint'] for row in rows] == ['/backend/transcribe']
+
+def test_export_day_from_postgres_archives_copied_csv(tmp_path, monkeypatch):
+    copied = []
+
+    def fake_copy(conn, day, csv_file):
+        copied.append((conn, day))
+        writer = csv.writer(csv_file)
+        writer.writerow(ARCHIVE_COLUMNS)
+        for row in ROWS[:2]:
+            writer.writerow(['' if row.get(name) is None else row[name] for name in ARCHIVE_COLUMNS])
+
+    monkeypatch.setattr(columnar_store, 'copy_day_to_csv', fake_copy)
+    store = ColumnarStore(str(tmp_path / 'archive'))
+    assert store.export_day_from_postgres('conn', DAY) == 2
+    assert copied == [('conn', DAY)]
+
+    store.mark_archived(DAY)
+    assert store.distinct_ips(*day_range()) == {'10.0.0.1', '10.0.0.2'}
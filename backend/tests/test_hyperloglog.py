@@ -0,0 +1,41 @@
+# ================================
+# tests/test_hyperloglog.py - HyperLogLog 測試
+# ================================
+
+import pytest
+from core.utils.hyperloglog import HyperLogLog
+
+def test_small_cardinality_is_nearly_exact():
+    hll = HyperLogLog()
+    hll.add_all(f"10.0.0.{index}" for index in range(200))
+    hll.add_all(f"10.0.0.{index}" for index in range(200))  # 重複值不影響估計
+    assert hll.estimate() == pytest.approx(200, abs=2)
+
+def test_large_cardinality_within_error():
+    hll = HyperLogLog()
+    hll.add_all(f"user-{index}" for index in range(100_000))
+    # 標準誤差約 0.81%，4 倍標準誤差內
+    assert hll.estimate() == pytest.approx(100_000, rel=4 * hll.standard_error)
+
+def test_merge_is_union():
+    first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    first.add_all(f"ip-{index}" for index in range(0, 6000))
+    second.add_all(f"ip-{index}" for index in range(4000, 10000))
+    union.add_all(f"ip-{index}" for index in range(10000))
+    first.merge(second)
+    assert first.registers == union.registers
+
+def test_merge_rejects_different_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(14))
+
+def test_bytes_round_trip():
+    hll = HyperLogLog(10)
+    hll.add_all(str(index) for index in range(500))
+    restored = HyperLogLog.from_bytes(hll.to_bytes())
+    assert restored.precision == 10
+    assert restored.registers == hll.registers
+
+def test_invalid_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
@@ -0,0 +1,144 @@
+# ================================
+# tests/test_job_queue.py - 背景工作佇列測試
+# ================================
+
+import asyncio
+import pytest
+from core.services.job_queue import JobRunner, JobStore, register_job_handler
+from core.utils.sse import send_sse_data
+from core.utils.usage import record_transcription
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.sqlite3'), replay_progress_events=3)
+
+def set_column(store, job_id, column, value):
+    with store._transaction() as conn:
+        conn.execute(f"UPDATE jobs SET {column} = ? WHERE id = ?", (value, job_id))
+
+def test_claim_respects_host_cap(store):
+    job_ids = [store.enqueue('transcription', {'index': index}) for index in range(3)]
+    first = store.claim(['transcription'], 'w1', max_running=2)
+    second = store.claim(['transcription'], 'w2', max_running=2)
+    assert [first['id'], second['id']] == job_ids[:2]
+    assert first['status'] == 'running' and first['worker'] == 'w1'
+    assert store.claim(['transcription'], 'w1', max_running=2) is None
+
+    store.finish(first['id'], 'completed')
+    assert store.claim(['transcription'], 'w1', max_running=2)['id'] == job_ids[2]
+
+def test_claim_ignores_other_kinds(store):
+    store.enqueue('transcription', {})
+    assert store.claim(['other'], 'w1', max_running=2) is None
+    assert store.claim([], 'w1', max_running=2) is None
+
+def test_queue_position(store):
+    job_ids = [store.enqueue('transcription', {}) for _ in range(3)]
+    assert [store.get(job_id)['queue_position'] for job_id in job_ids] == [0, 1, 2]
+
+def test_fail_stale_skips_jobs_with_recent_heartbeat(store):
+    store.enqueue('transcription', {})
+    store.enqueue('transcription', {})
+    stale = store.claim(['transcription'], 'w1', 2)
+    alive = store.claim(['transcription'], 'w2', 2)
+    for job in (stale, alive):
+        set_column(store, job['id'], 'heartbeat_at', 0)
+    store.heartbeat([alive['id']])
+
+    assert store.fail_stale(stale_seconds=60) == 1
+    failed = store.get(stale['id'])
+    assert failed['status'] == 'failed'
+    assert failed['error'] == 'worker 無回應'
+    assert '"type":"error"' in store.events_after(stale['id'], 0)[-1][1]
+    assert store.get(alive['id'])['status'] == 'running'
+
+def test_purge_removes_expired_jobs_and_files(store, tmp_path):
+    upload = tmp_path / 'upload.mp3'
+    upload.write_bytes(b'audio')
+    expired = store.enqueue('transcription', {}, files=[str(upload)])
+    recent = store.enqueue('transcription', {})
+    queued = store.enqueue('transcription', {})
+    for job_id in (expired, recent):
+        store.append_event(job_id, send_sse_data('complete'))
+        store.finish(job_id, 'completed')
+    set_column(store, expired, 'finished_at', 0)
+
+    assert store.purge(retention_seconds=3600) == 1
+    assert store.get(expired) is None
+    assert store.events_after(expired, 0) == []
+    assert not upload.exists()
+    assert store.get(recent)['status'] == 'completed'
+    assert store.get(queued)['status'] == 'queued'
+
+def test_purge_uses_per_job_retention(store):
+    job = store.create_running('report', 'w1', retention_seconds=10)
+    store.finish(job['id'], 'completed')
+    set_column(store, job['id'], 'finished_at', job['started_at'] - 11)
+    assert store.purge(retention_seconds=3600) == 1
+
+def test_append_events_keeps_recent_progress_and_is_idempotent(store):
+    job = store.create_running('report', 'w1')
+    events = [(seq, send_sse_data('progress', progress=seq, message=f'step {seq}')) for seq in range(1, 7)]
+    events.append((7, send_sse_data('chunk', text='內容')))
+    store.append_events(job['id'], events[:4])
+    store.append_events(job['id'], events[2:])  # 重疊的序號被忽略
+
+    stored = store.events_after(job['id'], 0)
+    assert [seq for seq, _ in stored] == [4, 5, 6, 7]
+    current = store.get(job['id'])
+    assert current['last_seq'] == 7
+    assert current['progress'] == 6
+    assert current['message'] == 'step 6'
+
+async def collect(runner, job_id, after_seq=0):
+    return [frame async for frame in runner.subscribe(job_id, after_seq)]
+
+def test_subscribe_replays_after_sequence(store):
+    job = store.create_running('report', 'w1')
+    for index in range(5):
+        store.append_event(job['id'], send_sse_data('chunk', text=str(index)))
+    store.append_event(job['id'], send_sse_data('complete'))
+    store.finish(job['id'], 'completed')
+
+    frames = asyncio.run(collect(JobRunner(store, poll_interval=0.01), job['id'], after_seq=3))
+    assert [frame.split('\n', 1)[0] for frame in frames] == ['id: 4', 'id: 5', 'id: 6']
+    assert '"type":"complete"' in frames[-1]
+
+def test_runner_records_usage_and_events(store, tmp_path):
+    upload = tmp_path / 'upload.mp3'
+    upload.write_bytes(b'audio')
+
+    async def handler(payload):
+        yield send_sse_data('progress', progress=50)
+        record_transcription('whisper-1', 120, 3.0)
+        yield send_sse_data('complete', text='逐字稿')
+
+    register_job_handler('test_transcription', handler)
+    recorded = []
+
+    async def usage_recorder(columns):
+        recorded.append(columns)
+
+    runner = JobRunner(store, poll_interval=0.01, usage_recorder=usage_recorder, flush_interval=0.01)
+    job_id = store.enqueue('test_transcription', {'file_size': 5, 'origin': {'ip': '10.0.0.1'}}, files=[str(upload)])
+    job = store.claim(['test_transcription'], runner.worker_id, 1)
+
+    async def run():
+        subscriber = asyncio.create_task(collect(runner, job_id))
+        await runner._run(job)
+        return await subscriber
+
+    frames = asyncio.run(run())
+    assert [frame.split('\n', 1)[0] for frame in frames] == ['id: 1', 'id: 2']
+    finished = store.get(job_id)
+    assert finished['status'] == 'completed'
+    assert finished['usage']['model'] == 'whisper-1'
+    assert not upload.exists()
+
+    columns, = recorded
+    assert columns['endpoint'] == '/backend/jobs/test_transcription'
+    assert columns['method'] == 'JOB'
+    assert columns['ip'] == '10.0.0.1'
+    assert columns['success'] == 'success'
+    assert columns['audio_seconds'] == 120
+    assert columns['cost_usd'] == pytest.approx(0.012)
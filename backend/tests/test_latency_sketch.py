@@ -0,0 +1,80 @@
+# ================================
+# tests/test_latency_sketch.py - LatencySketch 測試
+# ================================
+
+import math
+import random
+import pytest
+from core.utils.latency_sketch import LatencySketch
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+@pytest.fixture
+def latencies():
+    rng = random.Random(42)
+    return [rng.lognormvariate(6, 1) for _ in range(5000)]
+
+def test_quantiles_within_relative_accuracy(latencies):
+    sketch = LatencySketch(0.01)
+    sketch.add_all(latencies)
+    assert sketch.count == len(latencies)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        expected = exact_quantile(latencies, q)
+        assert sketch.quantile(q) == pytest.approx(expected, rel=0.01)
+
+def test_merge_equals_single_sketch(latencies):
+    whole = LatencySketch()
+    whole.add_all(latencies)
+    first, second = LatencySketch(), LatencySketch()
+    first.add_all(latencies[:1000])
+    second.add_all(latencies[1000:])
+    first.merge(second)
+    assert first.buckets == whole.buckets
+    assert first.count == whole.count
+    assert first.percentiles() == whole.percentiles()
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        LatencySketch(0.01).merge(LatencySketch(0.02))
+
+def test_add_bucket_matches_add(latencies):
+    """資料庫依桶索引計數後以 add_bucket 合併，結果與逐筆 add 相同"""
+    values = latencies + [0, 0, -1]
+    direct = LatencySketch()
+    direct.add_all(values)
+
+    log_gamma = math.log(direct.gamma)
+    counts = {}
+    for value in values:
+        index = math.ceil(math.log(value) / log_gamma) if value > 0 else None
+        counts[index] = counts.get(index, 0) + 1
+    grouped = LatencySketch()
+    for index, bucket_count in counts.items():
+        grouped.add_bucket(index, bucket_count)
+
+    assert grouped.buckets == direct.buckets
+    assert grouped.zero_count == direct.zero_count == 3
+    assert grouped.count == direct.count
+
+def test_zero_and_empty():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.percentiles() == {'p50': None, 'p90': None, 'p95': None, 'p99': None}
+    sketch.add(None)
+    sketch.add(0)
+    assert sketch.count == 1
+    assert sketch.quantile(0.5) == 0.0
+
+def test_dict_round_trip(latencies):
+    sketch = LatencySketch()
+    sketch.add_all(latencies)
+    restored = LatencySketch.from_dict(sketch.to_dict())
+    assert restored.buckets == sketch.buckets
+    assert restored.count == sketch.count
+    assert restored.percentiles() == sketch.percentiles()
+
+def test_invalid_accuracy():
+    with pytest.raises(ValueError):
+        LatencySketch(1)
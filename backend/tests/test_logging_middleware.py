@@ -0,0 +1,72 @@
+# ================================
+# tests/test_logging_middleware.py - API 使用記錄中間件測試
+# ================================
+
+import asyncio
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('psycopg2')  # core.database 在匯入時建立 PostgreSQL 引擎
+
+from core.middleware.logging_middleware import ApiLoggingMiddleware
+
+class RecordingMiddleware(ApiLoggingMiddleware):
+    """不寫入資料庫，只保留要記錄的欄位"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.records = []
+
+    async def log_to_database(self, data_payload=None, **kwargs):
+        self.records.append(kwargs)
+
+def sse_app(chunks, status=200):
+    async def app(scope, receive, send):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/event-stream; charset=utf-8')],
+        })
+        for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    return app
+
+def call(middleware, path='/backend/generate-report'):
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': path, 'headers': [(b'content-type', b'application/json')],
+        'client': ('10.0.0.1', 1234),
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'{}', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+def test_error_frame_split_across_body_messages():
+    frame = b'data: {"type":"error","error":"timeout"}\n\n'
+    middleware = RecordingMiddleware(sse_app([b'data: {"type":"progress"}\n\n' + frame[:10], frame[10:]]))
+    sent = call(middleware)
+
+    record = middleware.records[0]
+    assert record['final_event_type'] == 'error'
+    assert record['success'] == 'error'
+    assert record['bytes_sent'] == sum(len(message.get('body', b'')) for message in sent[1:])
+    assert record['ttfb_ms'] is not None
+
+def test_nested_type_does_not_override_final_event():
+    middleware = RecordingMiddleware(sse_app([b'data: {"type":"complete","items":[{"type":"error"}]}\n\n']))
+    call(middleware)
+    assert middleware.records[0]['final_event_type'] == 'complete'
+    assert middleware.records[0]['success'] == 'success'
+
+def test_excluded_paths_are_not_logged():
+    middleware = RecordingMiddleware(sse_app([b'data: {"type":"complete"}\n\n']))
+    call(middleware, path='/health')
+    assert middleware.records == []
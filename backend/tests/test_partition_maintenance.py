@@ -0,0 +1,104 @@
+# ================================
+# tests/test_partition_maintenance.py - 分區維護測試
+# ================================
+
+from datetime import date
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from core.services.partition_maintenance import (
+    DEFAULT_PARTITION, add_months, apply_retention, default_partition_ddl, ensure_future_partitions,
+    maintain_partitions, monthly_partition_ddl, partition_name
+)
+
+class FakeResult:
+    def __init__(self, value=None, rows=(), rowcount=0):
+        self.value = value
+        self.rows = list(rows)
+        self.rowcount = rowcount
+
+    def scalar(self):
+        return self.value
+
+    def fetchall(self):
+        return self.rows
+
+class FakeConnection:
+    """記錄執行的 SQL，並依語句回應目錄查詢"""
+
+    def __init__(self, partitions=(), default_exists=True, default_has_rows=False, locked=True):
+        self.partitions = list(partitions)
+        self.default_exists = default_exists
+        self.default_has_rows = default_has_rows
+        self.locked = locked
+        self.statements = []
+
+    def execute(self, clause, params=None):
+        sql = ' '.join(str(clause).split())
+        self.statements.append(sql)
+        if 'pg_try_advisory_xact_lock' in sql:
+            return FakeResult(self.locked)
+        if 'pg_inherits' in sql:
+            return FakeResult(rows=[(name,) for name in self.partitions])
+        if 'to_regclass' in sql:
+            return FakeResult(self.default_exists)
+        if sql.startswith('SELECT EXISTS'):
+            return FakeResult(self.default_has_rows)
+        if sql.startswith('SELECT count(*)'):
+            return FakeResult(0)
+        if sql.startswith('WITH moved'):
+            return FakeResult(rowcount=3)
+        return FakeResult()
+
+    def matching(self, prefix):
+        return [sql for sql in self.statements if sql.startswith(prefix)]
+
+def test_month_helpers():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name(date(2026, 3, 1)) == 'api_usage_logs_y2026m03'
+    assert monthly_partition_ddl(date(2026, 12, 15)) == (
+        "CREATE TABLE IF NOT EXISTS social_work.api_usage_logs_y2026m12 "
+        "PARTITION OF social_work.api_usage_logs FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+    assert default_partition_ddl().endswith('PARTITION OF social_work.api_usage_logs DEFAULT')
+
+def test_ensure_future_partitions_creates_missing_months():
+    conn = FakeConnection(partitions=['api_usage_logs_y2026m01', DEFAULT_PARTITION])
+    created = ensure_future_partitions(conn, months_ahead=2, today=date(2026, 1, 20))
+    assert created == ['api_usage_logs_y2026m02', 'api_usage_logs_y2026m03']
+    assert len(conn.matching('CREATE TABLE IF NOT EXISTS social_work.api_usage_logs_y')) == 2
+    assert conn.matching('ALTER TABLE') == []
+
+def test_rows_in_default_partition_are_moved_before_attach():
+    conn = FakeConnection(partitions=['api_usage_logs_y2026m01'], default_has_rows=True)
+    ensure_future_partitions(conn, months_ahead=1, today=date(2026, 1, 20))
+    assert conn.matching('CREATE TABLE social_work.api_usage_logs_y2026m02 (LIKE')
+    assert len(conn.matching('WITH moved')) == 1
+    attach = conn.matching('ALTER TABLE social_work.api_usage_logs ATTACH PARTITION')
+    assert attach == [
+        "ALTER TABLE social_work.api_usage_logs ATTACH PARTITION social_work.api_usage_logs_y2026m02 "
+        "FOR VALUES FROM ('2026-02-01') TO ('2026-03-01')"
+    ]
+
+@pytest.mark.parametrize('mode, drops', [('detach', 0), ('drop', 2)])
+def test_apply_retention(mode, drops):
+    partitions = ['api_usage_logs_y2025m10', 'api_usage_logs_y2025m11', 'api_usage_logs_y2025m12', DEFAULT_PARTITION]
+    conn = FakeConnection(partitions=partitions)
+    expired = apply_retention(conn, retention_months=2, mode=mode, today=date(2026, 1, 5))
+    assert expired == ['api_usage_logs_y2025m10', 'api_usage_logs_y2025m11']
+    assert len(conn.matching('ALTER TABLE social_work.api_usage_logs DETACH PARTITION')) == 2
+    assert len(conn.matching('DROP TABLE')) == drops
+
+def test_apply_retention_disabled_and_invalid_mode():
+    conn = FakeConnection(partitions=['api_usage_logs_y2000m01'])
+    assert apply_retention(conn, retention_months=0) == []
+    with pytest.raises(ValueError):
+        apply_retention(conn, retention_months=1, mode='truncate')
+
+def test_maintain_partitions_skips_ddl_without_lock():
+    conn = FakeConnection(locked=False)
+    maintain_partitions(conn, months_ahead=3, retention_months=1)
+    assert conn.matching('CREATE') == []
+    assert conn.matching('SELECT count(*)')
@@ -0,0 +1,89 @@
+# ================================
+# tests/test_payload_policy.py - 請求內容記錄策略測試
+# ================================
+
+import pytest
+from core.utils.payload_policy import (
+    compress_payload, decompress_payload, is_summary, summarize_payload
+)
+
+PAYLOAD = {
+    'transcript': '個案自述近期睡眠不佳',
+    'selectedSections': ['主述議題', '家庭狀況'],
+    'temperature': 0.3,
+    'options': {'a': 1, 'b': 2},
+}
+
+def test_summary_keeps_sizes_and_sections():
+    summary = summarize_payload(PAYLOAD)
+    assert is_summary(summary)
+    assert summary['fields'] == {'transcript': 10, 'selectedSections': 2, 'temperature': 0.3, 'options': 2}
+    assert summary['sections'] == {'selectedSections': ['主述議題', '家庭狀況']}
+    assert 'transcript' not in summary.get('sections', {})
+
+def test_summary_hash_ignores_key_order():
+    reordered = dict(reversed(list(PAYLOAD.items())))
+    assert summarize_payload(reordered)['sha256'] == summarize_payload(PAYLOAD)['sha256']
+
+def test_summary_of_non_dict_and_none():
+    assert summarize_payload(None) is None
+    summary = summarize_payload(['a', 'b'])
+    assert is_summary(summary)
+    assert 'fields' not in summary
+
+def test_section_items_are_capped():
+    summary = summarize_payload({'selectedSections': [str(index) for index in range(80)]}, max_section_items=50)
+    assert len(summary['sections']['selectedSections']) == 50
+    assert summary['fields']['selectedSections'] == 80
+
+def test_full_payload_is_not_a_summary():
+    assert not is_summary(PAYLOAD)
+
+def test_compress_round_trip():
+    blob, raw_bytes = compress_payload(PAYLOAD)
+    assert raw_bytes == summarize_payload(PAYLOAD)['bytes']
+    assert decompress_payload(blob) == PAYLOAD
+
+def test_unknown_encoding_is_rejected():
+    blob, _ = compress_payload(PAYLOAD)
+    with pytest.raises(ValueError):
+        decompress_payload(blob, 'gzip')
+
+def test_purge_removes_only_expired_payloads(usage_db):
+    from datetime import datetime, timedelta
+    from models.api_usage_payload import ApiUsagePayload
+    from core.utils.payload_policy import purge_expired_payloads
+
+    session_factory, _ = usage_db
+    blob, size = compress_payload(PAYLOAD)
+    with session_factory() as db:
+        for log_id, age_days in ((1, 40), (2, 10)):
+            db.add(ApiUsagePayload(
+                log_id=log_id, created_at=datetime.now() - timedelta(days=age_days),
+                content_hash='0' * 64, original_size=size, payload=blob
+            ))
+        db.commit()
+
+        assert purge_expired_payloads(db, retention_days=30) == 1
+        db.commit()
+        assert [row.log_id for row in db.query(ApiUsagePayload)] == [2]
+
+def test_purge_skips_when_another_worker_holds_the_lock():
+    pytest.importorskip('sqlalchemy')
+    from types import SimpleNamespace
+    from core.utils.payload_policy import purge_expired_payloads
+
+    executed = []
+
+    class LockedSession:
+        bind = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'))
+
+        def execute(self, clause, params):
+            executed.append(str(clause))
+            return SimpleNamespace(scalar=lambda: False)
+
+        def query(self, *args):
+            raise AssertionError("未取得鎖時不應刪除")
+
+    assert purge_expired_payloads(LockedSession(), retention_days=30) == 0
+    assert executed == ['SELECT pg_try_advisory_xact_lock(:key)']
@@ -0,0 +1,123 @@
+# ================================
+# tests/test_rollup_service.py - 彙總與統計查詢一致性測試
+# ================================
+
+import asyncio
+from datetime import date, datetime, timedelta
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from models.api_usage_log import ApiUsageLog
+from models.daily_api_stats import DailyApiStats, HourlyApiStats, RollupWatermark
+from core.services.rollup_service import RollupService
+from core.services.analytics_service import AnalyticsService
+from core.utils.usage import JOB_USAGE_METHOD
+
+DAY = date.today() - timedelta(days=2)
+
+def log_row(log_id, minute, endpoint, method='POST', success='success', processing_time=100, **columns):
+    timestamp = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=10, minutes=minute)
+    # 預設在請求開始後不久寫入；不指定 created_at=None 時由資料庫填入目前時間
+    columns.setdefault('created_at', timestamp + timedelta(minutes=1))
+    if columns['created_at'] is None:
+        del columns['created_at']
+    return ApiUsageLog(
+        id=log_id,
+        timestamp=timestamp,
+        ip=columns.pop('ip', '10.0.0.1'),
+        endpoint=endpoint,
+        method=method,
+        success=success,
+        processing_time=processing_time,
+        **columns
+    )
+
+@pytest.fixture
+def seeded_db(usage_db):
+    """一個轉錄請求與其背景工作的用量記錄，加上一個失敗的報告請求"""
+    session_factory, async_session_factory = usage_db
+    with session_factory() as db:
+        db.add_all([
+            log_row(1, 5, '/backend/transcribe', processing_time=80, file_size=1000),
+            log_row(2, 6, '/backend/jobs/transcription', method=JOB_USAGE_METHOD, processing_time=45000,
+                    model_used='whisper-1', audio_seconds=600, file_size=1000),
+            log_row(3, 70, '/backend/generate-report', success='error', processing_time=300, ip='10.0.0.2'),
+        ])
+        db.commit()
+    return usage_db
+
+def refresh(session_factory):
+    with session_factory() as db:
+        RollupService(db).refresh()
+        db.commit()
+
+def run(async_session_factory, method, *args, **kwargs):
+    async def call():
+        async with async_session_factory() as db:
+            return await getattr(AnalyticsService(db, columnar_store=None), method)(*args, **kwargs)
+    return asyncio.run(call())
+
+def test_daily_and_hourly_rollups_count_the_same_requests(seeded_db):
+    session_factory, _ = seeded_db
+    refresh(session_factory)
+
+    with session_factory() as db:
+        daily = db.get(DailyApiStats, DAY)
+        hourly = db.query(HourlyApiStats).all()
+
+    assert daily.total_requests == 2
+    assert daily.transcribe_count == 1
+    assert daily.error_count == 1
+    assert sum(row.request_count for row in hourly) == daily.total_requests
+    assert sum(row.total_processing_time for row in hourly) == daily.total_processing_time
+    assert {row.endpoint for row in hourly} == {'/backend/transcribe', '/backend/generate-report'}
+
+def test_raw_and_rollup_paths_agree(seeded_db):
+    session_factory, async_session_factory = seeded_db
+    range_start = datetime.combine(DAY, datetime.min.time())
+    range_end = range_start + timedelta(days=1)
+
+    raw_traffic = run(async_session_factory, 'get_traffic_stats', DAY, DAY)
+    raw_buckets = run(async_session_factory, 'get_bucketed_stats', range_start, range_end, 'hour', ['endpoint'])
+    refresh(session_factory)
+    rollup_traffic = run(async_session_factory, 'get_traffic_stats', DAY, DAY)
+    rollup_buckets = run(async_session_factory, 'get_bucketed_stats', range_start, range_end, 'hour', ['endpoint'])
+
+    assert raw_buckets['sources'] == ['raw'] and rollup_buckets['sources'] == ['rollup']
+    assert raw_traffic == rollup_traffic
+    assert raw_traffic[0]['total_requests'] == 2
+    assert set(raw_traffic[0]['latency_percentiles']) == {'/backend/transcribe', '/backend/generate-report'}
+    assert raw_buckets['buckets'] == rollup_buckets['buckets']
+    assert sum(bucket['request_count'] for bucket in raw_buckets['buckets']) == 2
+
+def test_model_latency_includes_job_usage(seeded_db):
+    session_factory, async_session_factory = seeded_db
+    refresh(session_factory)
+    stats = run(async_session_factory, 'get_model_usage_stats', days=7)
+    assert stats['whisper-1']['latency_percentiles']['p50'] == pytest.approx(45000, rel=0.01)
+
+def test_watermark_waits_for_recently_inserted_rows(usage_db):
+    """長串流的記錄請求時間很早、寫入很晚：在安全延遲內不推進水位，也不宣稱已涵蓋其請求時間"""
+    session_factory, _ = usage_db
+    with session_factory() as db:
+        db.add_all([
+            log_row(1, 0, '/backend/transcribe'),
+            log_row(2, 30, '/backend/generate-report', created_at=None),
+        ])
+        db.commit()
+
+    refresh(session_factory)
+    with session_factory() as db:
+        watermark = db.get(RollupWatermark, RollupService.ROLLUP_NAME)
+        assert watermark.last_log_id == 1
+        assert watermark.covered_until == log_row(2, 30, '').timestamp
+
+        db.query(ApiUsageLog).filter(ApiUsageLog.id == 2).update({'created_at': datetime(2000, 1, 1)})
+        db.commit()
+
+    refresh(session_factory)
+    with session_factory() as db:
+        assert db.get(RollupWatermark, RollupService.ROLLUP_NAME).last_log_id == 2
+        assert db.get(DailyApiStats, DAY).total_requests == 2
+        assert sum(row.request_count for row in db.query(HourlyApiStats)) == 2
@@ -0,0 +1,48 @@
+# ================================
+# tests/test_sse.py - SSE 事件類型追蹤測試
+# ================================
+
+from core.utils.sse import SSEEventTracker, parse_event_type, send_sse_data
+
+def feed_all(chunks, **kwargs):
+    tracker = SSEEventTracker(**kwargs)
+    for chunk in chunks:
+        tracker.feed(chunk)
+    return tracker
+
+def test_reads_top_level_type_not_nested_field():
+    frame = b'data: {"type":"complete","result":{"sections":[{"type":"error"}]}}\n\n'
+    assert feed_all([frame]).final_event_type == 'complete'
+
+def test_frame_split_across_chunks():
+    frame = send_sse_data('error', error='上游逾時').encode('utf-8')
+    chunks = [send_sse_data('progress', progress=90).encode('utf-8') + frame[:7], frame[7:20], frame[20:]]
+    tracker = SSEEventTracker()
+    tracker.feed(chunks[0])
+    assert tracker.final_event_type == 'progress'
+    tracker.feed(chunks[1])
+    assert tracker.final_event_type == 'progress'
+    tracker.feed(chunks[2])
+    assert tracker.final_event_type == 'error'
+    assert tracker.pending == b''
+
+def test_incomplete_last_frame_is_ignored():
+    chunks = [b'data: {"type":"chunk","text":"a"}\n\ndata: {"type":"err']
+    assert feed_all(chunks).final_event_type == 'chunk'
+
+def test_comments_and_keepalives_keep_last_event():
+    chunks = [b'data: {"type":"complete"}\n\n', b': keepalive\n\n', b'\r\n\r\n']
+    assert feed_all(chunks).final_event_type == 'complete'
+
+def test_oversized_pending_frame_is_dropped():
+    tracker = feed_all([b'data: {"type":"chunk","text":"' + b'x' * 100], max_pending_bytes=64)
+    assert tracker.pending == b''
+    assert tracker.final_event_type is None
+
+def test_parse_event_type():
+    assert parse_event_type(b'event: message\ndata: {"type":"done"}') == 'done'
+    assert parse_event_type(b'data:{"type":"done"}') == 'done'
+    assert parse_event_type(b'data: {"type":\ndata: "multi"}') == 'multi'
+    assert parse_event_type(b'data: not json') is None
+    assert parse_event_type(b'data: ["type"]') is None
+    assert parse_event_type(b'data: {"type": 1}') is None
@@ -0,0 +1,59 @@
+# ================================
+# tests/test_ttl_cache.py - TTLCache 測試
+# ================================
+
+import pytest
+from core.utils import ttl_cache
+from core.utils.ttl_cache import TTLCache, compute_etag
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手動推進的 time.monotonic"""
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_entry_expires_after_ttl(clock):
+    cache = TTLCache()
+    cache.set('key', {'total': 1}, ttl=60)
+    assert cache.get('key').value == {'total': 1}
+    clock[0] += 59
+    assert cache.get('key') is not None
+    clock[0] += 1
+    assert cache.get('key') is None
+
+def test_remaining_seconds_counts_down(clock):
+    cache = TTLCache()
+    entry = cache.set('key', {'total': 1}, ttl=60)
+    assert entry.remaining_seconds(clock[0]) == 60
+    clock[0] += 45.5
+    assert cache.get('key').remaining_seconds(clock[0]) == 14
+    assert entry.remaining_seconds(clock[0] + 100) == 0
+    assert cache.set('immutable', 1, ttl=None).remaining_seconds(clock[0]) is None
+
+def test_entry_without_ttl_never_expires(clock):
+    cache = TTLCache()
+    cache.set('key', [1, 2], ttl=None)
+    clock[0] += 10 ** 9
+    assert cache.get('key').value == [1, 2]
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1, ttl=None)
+    cache.set('b', 2, ttl=None)
+    cache.get('a')
+    cache.set('c', 3, ttl=None)
+    assert cache.get('b') is None
+    assert cache.get('a').value == 1
+    assert cache.get('c').value == 3
+
+def test_etag_depends_only_on_content():
+    assert compute_etag({'a': 1, 'b': 2}) == compute_etag({'b': 2, 'a': 1})
+    assert compute_etag({'a': 1}) != compute_etag({'a': 2})
+    assert TTLCache().set('key', {'a': 1}, ttl=None).etag == compute_etag({'a': 1})
+
+def test_clear():
+    cache = TTLCache()
+    cache.set('key', 1, ttl=None)
+    cache.clear()
+    assert cache.get('key') is None
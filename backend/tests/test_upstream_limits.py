@@ -0,0 +1,80 @@
+# ================================
+# tests/test_upstream_limits.py - 跨 worker 上游呼叫限制測試
+# ================================
+
+import os
+import asyncio
+import pytest
+
+fcntl = pytest.importorskip('fcntl')  # Windows 沒有 flock，限制停用
+
+from core.utils import upstream_limits
+from core.utils.upstream_limits import (
+    MIN_POLL_SECONDS, UpstreamLimiter, configure_upstream_limits, upstream_slot
+)
+
+def test_concurrency_slots_are_shared_across_limiters(tmp_path):
+    """兩個 limiter 實例模擬兩個 worker，共用同一組名額檔"""
+    first = UpstreamLimiter('claude', str(tmp_path), max_concurrent=1)
+    second = UpstreamLimiter('claude', str(tmp_path), max_concurrent=1)
+    fd = first._try_acquire_slot()
+    assert fd is not None
+    assert second._try_acquire_slot() is None
+    first._release_slot(fd)
+    fd = second._try_acquire_slot()
+    assert fd is not None
+    second._release_slot(fd)
+
+def test_token_bucket_refills_at_rate(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(upstream_limits.time, 'time', lambda: now[0])
+    limiter = UpstreamLimiter('whisper', str(tmp_path), requests_per_minute=60, burst=2)
+    assert limiter._try_take_token() == 0
+    assert limiter._try_take_token() == 0
+    assert limiter._try_take_token() == pytest.approx(1.0)
+    now[0] += 0.5
+    assert limiter._try_take_token() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert limiter._try_take_token() == 0
+
+def test_busy_bucket_lock_does_not_block(tmp_path):
+    """狀態檔被其他 worker 鎖住時立即返回輪詢間隔，而不是等待鎖"""
+    limiter = UpstreamLimiter('whisper', str(tmp_path), requests_per_minute=60)
+    fd = os.open(limiter.bucket_path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        assert limiter._try_take_token() == MIN_POLL_SECONDS
+    finally:
+        os.close(fd)
+    assert limiter._try_take_token() == 0
+
+def test_acquire_waits_for_a_released_slot(tmp_path):
+    limiter = UpstreamLimiter('claude', str(tmp_path), max_concurrent=1)
+    order = []
+
+    async def call(name, hold):
+        async with limiter.acquire():
+            order.append(f'{name}:start')
+            await asyncio.sleep(hold)
+            order.append(f'{name}:end')
+
+    async def run():
+        await asyncio.gather(call('a', 0.05), call('b', 0))
+
+    asyncio.run(run())
+    assert order == ['a:start', 'a:end', 'b:start', 'b:end']
+
+def test_unconfigured_upstream_is_not_limited(tmp_path):
+    configure_upstream_limits(str(tmp_path), {
+        'whisper': {'max_concurrent': 0, 'requests_per_minute': 0},
+        'claude': {'max_concurrent': 2, 'requests_per_minute': 0},
+    })
+
+    async def waited(name):
+        async with upstream_slot(name) as seconds:
+            return seconds
+
+    assert set(upstream_limits._limiters) == {'claude'}
+    assert asyncio.run(waited('whisper')) == 0.0
+    assert asyncio.run(waited('claude')) >= 0.0
+    configure_upstream_limits(str(tmp_path), {})
@@ -0,0 +1,41 @@
+# ================================
+# tests/test_usage.py - 上游用量與成本測試
+# ================================
+
+import pytest
+from core.utils import usage
+from core.utils.usage import configure_pricing, estimate_cost
+
+@pytest.fixture(autouse=True)
+def default_pricing():
+    configure_pricing()
+    yield
+    configure_pricing()
+
+def test_audio_cost_per_minute():
+    assert estimate_cost('whisper-1', audio_seconds=90) == pytest.approx(0.009)
+
+def test_token_cost_per_million():
+    cost = estimate_cost('claude-sonnet-4-20250514', input_tokens=1_000_000, output_tokens=100_000,
+                         cached_tokens=200_000, cache_write_tokens=10_000)
+    assert cost == pytest.approx(3.0 + 1.5 + 0.06 + 0.0375)
+
+def test_longest_prefix_wins():
+    configure_pricing({'claude-sonnet-4-special': {'input': 1.0}})
+    assert estimate_cost('claude-sonnet-4-special-v2', input_tokens=1_000_000) == pytest.approx(1.0)
+    assert estimate_cost('claude-sonnet-4-20250514', input_tokens=1_000_000) == pytest.approx(3.0)
+
+def test_unknown_model_has_no_cost():
+    assert estimate_cost('some-other-model', input_tokens=1000) is None
+    assert estimate_cost(None) is None
+
+def test_usage_record_accumulates_within_context():
+    record = usage.begin_usage()
+    usage.record_completion('claude-3-5-haiku-20241022', 1000, 500, 1.25)
+    usage.record_completion('claude-3-5-haiku-20241022', 1000, 500, 0.75)
+    columns = record.to_columns()
+    assert usage.current_usage() is record
+    assert columns['input_tokens'] == 2000
+    assert columns['output_tokens'] == 1000
+    assert columns['upstream_ms'] == 2000
+    assert columns['cost_usd'] == pytest.approx(2 * estimate_cost('claude-3-5-haiku', input_tokens=1000, output_tokens=500))
@@ -53,6 +53,123 @@ apiClient.interceptors.response.use(
   }
 )
 
+// 串流中斷後以 X-Job-Id 重新訂閱的次數上限與等待間隔（毫秒，依次數遞增）
+const MAX_RESUME_ATTEMPTS = 5
+const RESUME_DELAY_MS = 1000
+
+/**
+ * 讀取一個 SSE 回應，逐一把 data: 事件交給 onEvent
+ * onEvent 返回 true 表示收到結束事件；每處理完一個事件以 onEventId 回報其 id: 序號
+ * 返回 true 表示已收到結束事件，false 表示伺服器關閉了連線
+ */
+async function readEventStream(
+  response: Response,
+  onEvent: (data: SSEData) => boolean,
+  onEventId: (eventId: number) => void
+): Promise<boolean> {
+  const reader = response.body?.getReader()
+  if (!reader) {
+    throw new Error('無法讀取響應數據')
+  }
+
+  const decoder = new TextDecoder()
+  let buffer = '' // 緩衝區處理不完整的數據
+  let eventId: number | null = null
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) {
+      return false
+    }
+
+    buffer += decoder.decode(value, { stream: true })
+    // 按行分割處理，保留最後一個可能不完整的行
+    const lines = buffer.split('\n')
+    buffer = lines.pop() || ''
+
+    for (const line of lines) {
+      if (line.startsWith('id:')) {
+        // 事件序號在同一事件的 data: 之前
+        eventId = Number(line.slice(3).trim())
+      } else if (line.startsWith('data: ')) {
+        const jsonStr = line.slice(6).trim()
+        if (jsonStr === '') continue // 跳過空數據
+
+        let data: SSEData
+        try {
+          data = JSON.parse(jsonStr)
+        } catch (parseError) {
+          console.warn('⚠️ 解析 SSE 數據失敗:', line, parseError)
+          continue
+        }
+        const finished = onEvent(data)
+        if (eventId !== null) {
+          onEventId(eventId)
+          eventId = null
+        }
+        if (finished) {
+          reader.cancel().catch(() => undefined)
+          return true
+        }
+      } else if (line.trim() && !line.startsWith(':')) {
+        // : 開頭為 keepalive 註解
+        console.log('📋 非 SSE 數據:', line)
+      }
+    }
+  }
+}
+
+/**
+ * 跟隨背景工作的 SSE 串流直到結束事件
+ * 連線中斷（或伺服器在結束事件前關閉連線）時，以回應標頭 X-Job-Id 與最後收到的序號
+ * 向 /backend/jobs/{id}/events?after= 重新訂閱，只補送之後的事件；工作本身不受斷線影響
+ */
+async function followJobStream(response: Response, onEvent: (data: SSEData) => boolean): Promise<void> {
+  const jobId = response.headers.get('X-Job-Id')
+  let lastEventId = 0
+  let attempts = 0
+  let current: Response | null = response
+
+  while (true) {
+    if (current) {
+      try {
+        const finished = await readEventStream(current, onEvent, (eventId) => {
+          lastEventId = eventId
+          attempts = 0
+        })
+        if (finished || !jobId) return
+      } catch (streamError) {
+        if (!jobId) throw streamError
+        console.warn('⚠️ 串流中斷，準備重新連線:', streamError)
+      }
+    }
+
+    attempts += 1
+    if (attempts > MAX_RESUME_ATTEMPTS) {
+      throw new Error('串流中斷，重新連線失敗')
+    }
+    await new Promise((resume) => setTimeout(resume, RESUME_DELAY_MS * attempts))
+
+    console.log(`🔄 重新連線工作 ${jobId}（第 ${attempts} 次，從事件 ${lastEventId} 之後）`)
+    try {
+      current = await fetch(`${API_BASE_URL}/backend/jobs/${jobId}/events?after=${lastEventId}`, {
+        headers: { Accept: 'text/event-stream' }
+      })
+    } catch (fetchError) {
+      console.warn('⚠️ 重新連線失敗:', fetchError)
+      current = null
+      continue
+    }
+    if (current.status === 404) {
+      throw new Error('工作已不存在（可能已超過保留時間），請重新嘗試')
+    }
+    if (!current.ok) {
+      console.warn('⚠️ 重新連線失敗:', current.status)
+      current = null
+    }
+  }
+}
+
 export const apiService = {
   // ==================== 音檔轉逐字稿 ====================
   async transcribeAudio(
@@ -66,6 +183,8 @@ export const apiService = {
     console.log('🚀 開始音頻轉換，文件大小:', (audioFile.size / 1024 / 1024).toFixed(2), 'MB')
 
     return new Promise((resolve, reject) => {
+      let transcript = ''
+
       fetch(`${API_BASE_URL}/backend/transcribe`, {
         method: 'POST',
         body: formData,
@@ -85,95 +204,46 @@ export const apiService = {
           const contentType = response.headers.get('content-type')
           console.log('📄 Content-Type:', contentType)
 
-          const reader = response.body?.getReader()
-          if (!reader) {
-            throw new Error('無法讀取響應數據')
-          }
-
-          const decoder = new TextDecoder()
-          let transcript = ''
-          let buffer = '' // 添加緩衝區處理不完整的數據
-
-          function readStream(): void {
-            if (!reader) {
-              throw new Error('reader 尚未初始化')
-            }
-            reader
-              .read()
-              .then(({ done, value }) => {
-                if (done) {
-                  console.log('✅ 串流完成，最終文字長度:', transcript.length)
-                  resolve(transcript)
-                  return
-                }
-
-                // 解碼新數據並添加到緩衝區
-                const chunk = decoder.decode(value, { stream: true })
-                buffer += chunk
-
-                // 按行分割處理
-                const lines = buffer.split('\n')
-                // 保留最後一個可能不完整的行
-                buffer = lines.pop() || ''
-
-                for (const line of lines) {
-                  if (line.trim() === '') continue // 跳過空行
-
-                  if (line.startsWith('data: ')) {
-                    try {
-                      const jsonStr = line.slice(6).trim()
-                      if (jsonStr === '') continue // 跳過空數據
-
-                      const data: SSEData = JSON.parse(jsonStr)
-                      console.log('📨 收到 SSE 數據:', data.type, data.progress || 0, '%')
-
-                      switch (data.type) {
-                        case 'progress':
-                          onProgress?.(data.progress || 0, data.message)
-                          break
-
-                        case 'chunk':
-                          const text = data.text || ''
-                          if (text) {
-                            transcript += text
-                            console.log('📝 收到文字片段:', text.substring(0, 50) + '...')
-                            onChunk?.(text) // 調用新的 onChunk 回調
-                            onProgress?.(data.progress || 0, `接收中... ${transcript.length} 字`)
-                          }
-                          break
-
-                        case 'complete':
-                          console.log('🎉 轉換完成!')
-                          onProgress?.(100, '轉換完成')
-                          resolve(transcript)
-                          return
-
-                        case 'error':
-                          console.error('❌ 轉換錯誤:', data.error)
-                          reject(new Error(data.error || '轉換失敗'))
-                          return
-                      }
-                    } catch (parseError) {
-                      console.warn('⚠️ 解析 SSE 數據失敗:', line, parseError)
-                    }
-                  } else if (line.trim()) {
-                    console.log('📋 非 SSE 數據:', line)
-                  }
+          return followJobStream(response, (data) => {
+            console.log('📨 收到 SSE 數據:', data.type, data.progress || 0, '%')
+
+            switch (data.type) {
+              case 'progress':
+                onProgress?.(data.progress || 0, data.message)
+                return false
+
+              case 'chunk': {
+                const text = data.text || ''
+                if (text) {
+                  transcript += text
+                  console.log('📝 收到文字片段:', text.substring(0, 50) + '...')
+                  onChunk?.(text) // 調用新的 onChunk 回調
+                  onProgress?.(data.progress || 0, `接收中... ${transcript.length} 字`)
                 }
-
-                readStream()
-              })
-              .catch((streamError) => {
-                console.error('❌ 串流讀取錯誤:', streamError)
-                reject(streamError)
-              })
-          }
-
-          readStream()
+                return false
+              }
+
+              case 'complete':
+                console.log('🎉 轉換完成!')
+                onProgress?.(100, '轉換完成')
+                resolve(transcript)
+                return true
+
+              case 'error':
+                console.error('❌ 轉換錯誤:', data.error)
+                reject(new Error(data.error || '轉換失敗'))
+                return true
+            }
+            return false
+          })
         })
-        .catch((fetchError) => {
-          console.error('❌ 請求錯誤:', fetchError)
-          reject(fetchError)
+        .then(() => {
+          console.log('✅ 串流完成，最終文字長度:', transcript.length)
+          resolve(transcript)
+        })
+        .catch((streamError) => {
+          console.error('❌ 串流讀取錯誤:', streamError)
+          reject(streamError)
         })
     })
   },
@@ -184,6 +254,8 @@ export const apiService = {
     onProgress?: (progress: number, partialReport?: string) => void
   ): Promise<string> {
     return new Promise((resolve, reject) => {
+      let reportContent = ''
+
       fetch(`${API_BASE_URL}/backend/generate-report`, {
         method: 'POST',
         headers: {
@@ -196,59 +268,23 @@ export const apiService = {
             throw new Error(`HTTP error! status: ${response.status}`)
           }
 
-          const reader = response.body?.getReader()
-          if (!reader) {
-            throw new Error('無法讀取響應數據')
-          }
-
-          const decoder = new TextDecoder()
-          let reportContent = ''
-
-          function readStream(): void {
-            if (!reader) {
-              throw new Error('reader 尚未初始化')
+          return followJobStream(response, (data) => {
+            if (data.type === 'progress') {
+              onProgress?.(data.progress || 0)
+            } else if (data.type === 'chunk') {
+              reportContent += data.text || ''
+              onProgress?.(data.progress || 0, reportContent)
+            } else if (data.type === 'complete') {
+              resolve(reportContent)
+              return true
+            } else if (data.type === 'error') {
+              reject(new Error(data.error || '生成失敗'))
+              return true
             }
-            reader
-              .read()
-              .then(({ done, value }) => {
-                if (done) {
-                  resolve(reportContent)
-                  return
-                }
-
-                const chunk = decoder.decode(value, { stream: true })
-                const lines = chunk.split('\n')
-
-                for (const line of lines) {
-                  if (line.startsWith('data: ')) {
-                    try {
-                      const data: SSEData = JSON.parse(line.slice(6))
-
-                      if (data.type === 'progress') {
-                        onProgress?.(data.progress || 0)
-                      } else if (data.type === 'chunk') {
-                        reportContent += data.text || ''
-                        onProgress?.(data.progress || 0, reportContent)
-                      } else if (data.type === 'complete') {
-                        resolve(reportContent)
-                        return
-                      } else if (data.type === 'error') {
-                        reject(new Error(data.error || '生成失敗'))
-                        return
-                      }
-                    } catch (e) {
-                      console.warn('Failed to parse SSE data:', line)
-                    }
-                  }
-                }
-
-                readStream()
-              })
-              .catch(reject)
-          }
-
-          readStream()
+            return false
+          })
         })
+        .then(() => resolve(reportContent))
         .catch(reject)
     })
   },
@@ -259,6 +295,8 @@ export const apiService = {
     onProgress?: (progress: number, partialPlan?: string) => void
   ): Promise<string> {
     return new Promise((resolve, reject) => {
+      let planContent = ''
+
       fetch(`${API_BASE_URL}/backend/generate-treatment-plan`, {
         method: 'POST',
         headers: {
@@ -271,59 +309,23 @@ export const apiService = {
             throw new Error(`HTTP error! status: ${response.status}`)
           }
 
-          const reader = response.body?.getReader()
-          if (!reader) {
-            throw new Error('無法讀取響應數據')
-          }
-
-          const decoder = new TextDecoder()
-          let planContent = ''
-
-          function readStream(): void {
-            if (!reader) {
-              throw new Error('reader 尚未初始化')
+          return followJobStream(response, (data) => {
+            if (data.type === 'progress') {
+              onProgress?.(data.progress || 0)
+            } else if (data.type === 'chunk') {
+              planContent += data.text || ''
+              onProgress?.(data.progress || 0, planContent)
+            } else if (data.type === 'complete') {
+              resolve(planContent)
+              return true
+            } else if (data.type === 'error') {
+              reject(new Error(data.error || '生成失敗'))
+              return true
             }
-            reader
-              .read()
-              .then(({ done, value }) => {
-                if (done) {
-                  resolve(planContent)
-                  return
-                }
-
-                const chunk = decoder.decode(value, { stream: true })
-                const lines = chunk.split('\n')
-
-                for (const line of lines) {
-                  if (line.startsWith('data: ')) {
-                    try {
-                      const data: SSEData = JSON.parse(line.slice(6))
-
-                      if (data.type === 'progress') {
-                        onProgress?.(data.progress || 0)
-                      } else if (data.type === 'chunk') {
-                        planContent += data.text || ''
-                        onProgress?.(data.progress || 0, planContent)
-                      } else if (data.type === 'complete') {
-                        resolve(planContent)
-                        return
-                      } else if (data.type === 'error') {
-                        reject(new Error(data.error || '生成失敗'))
-                        return
-                      }
-                    } catch (e) {
-                      console.warn('Failed to parse SSE data:', line)
-                    }
-                  }
-                }
-
-                readStream()
-              })
-              .catch(reject)
-          }
-
-          readStream()
+            return false
+          })
         })
+        .then(() => resolve(planContent))
         .catch(reject)
     })
   }